@@ -1,20 +1,99 @@
 #!/usr/bin/env python3
-"""Fetch engagement metrics from Buffer and upsert analytics/metrics.json."""
+"""Fetch engagement metrics from Buffer and upsert them into the partitioned store under analytics/metrics/.
+
+Profiles and pages are fetched concurrently on a bounded thread pool sharing one
+connection pool. Requests to each host go through a token bucket, and 429/5xx
+responses are retried after Retry-After or an exponential backoff.
+
+Each profile keeps a sync cursor (newest sent_at seen, window start) in
+analytics/metrics_cursor.json. Later runs only ask Buffer for updates since
+min(cursor, now - REFRESH_DAYS), so new posts arrive and recent stats are
+refreshed without refetching the whole month. Only changed records are written,
+and only to their month/service partitions (see metrics_store.py).
+"""
 
 from __future__ import annotations
 
+import argparse
 import json
+import math
 import os
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from atomic_io import write_json  # noqa: E402
+from metrics_store import STORE_DIR, MetricsStore  # noqa: E402
+
+API_ROOT = os.getenv("BUFFER_API_ROOT", "https://api.bufferapp.com/1")
+# single-file layouts read once to seed the partitioned store
+LEGACY_PATHS = ("analytics/metrics.jsonl", "analytics/metrics.json")
+CURSOR_PATH = "analytics/metrics_cursor.json"
+INITIAL_DAYS = 30
+# engagement keeps moving for a while after a post goes out; refetch that window every run
+REFRESH_DAYS = int(os.getenv("METRICS_REFRESH_DAYS", "7"))
+PAGE_SIZE = 100
+WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+# Buffer allows 60 requests/minute per token: refill at 1/s with a burst of 10.
+MAX_RPS = float(os.getenv("BUFFER_MAX_RPS", "1.0"))
+BURST = int(os.getenv("BUFFER_BURST", "10"))
+MAX_RETRIES = 4
+RETRY_STATUS = {429, 500, 502, 503, 504}
 
-API_ROOT = "https://api.bufferapp.com/1"
-OUTPUT_PATH = "analytics/metrics.json"
 SESSION = requests.Session()
 SESSION.headers.update({"User-Agent": "cf-autopost-feed/metrics"})
+SESSION.mount("https://", HTTPAdapter(pool_maxsize=WORKERS))
+SESSION.mount("http://", HTTPAdapter(pool_maxsize=WORKERS))
+
+
+class FetchError(Exception):
+    """A Buffer request that failed for good (non-retryable status or retries exhausted)."""
+
+
+class RateLimiter:
+    """Token bucket per host, shared by all worker threads."""
+
+    def __init__(self, rate: float = MAX_RPS, burst: int = BURST) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Tuple[float, float, float]] = {}  # host -> (tokens, updated, paused_until)
+
+    def _state(self, host: str, now: float) -> Tuple[float, float]:
+        tokens, updated, until = self._hosts.get(host, (float(self.burst), now, 0.0))
+        return min(self.burst, tokens + (now - updated) * self.rate), until
+
+    def acquire(self, host: str) -> None:
+        """Block until a request to host is allowed."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, until = self._state(host, now)
+                if now >= until and tokens >= 1:
+                    self._hosts[host] = (tokens - 1, now, until)
+                    return
+                self._hosts[host] = (tokens, now, until)
+                delay = max(until - now, (1 - tokens) / self.rate)
+            time.sleep(delay)
+
+    def defer(self, host: str, seconds: float) -> None:
+        """Hold every request to host for seconds (server asked us to back off)."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, until = self._state(host, now)
+            self._hosts[host] = (0.0 if self.rate > 0 else tokens, now, max(until, now + seconds))
+        if self.rate <= 0:
+            time.sleep(seconds)
 
 
 def die(msg: str) -> None:
@@ -46,66 +125,171 @@ def generate_sample_metrics(days: int = 7) -> List[Dict[str, object]]:
     return records
 
 
-def load_existing() -> Dict[str, Dict[str, object]]:
-    if not os.path.exists(OUTPUT_PATH):
-        return {}
-    try:
-        with open(OUTPUT_PATH, "r", encoding="utf-8") as fh:
-            items = json.load(fh)
-    except (OSError, ValueError) as exc:
-        die(f"Unable to read {OUTPUT_PATH}: {exc}")
-    if not isinstance(items, list):
-        die(f"{OUTPUT_PATH} must contain a JSON array.")
+def load_legacy() -> Dict[str, Dict[str, object]]:
+    """Records from the old single-file metrics.jsonl log or metrics.json array, if present."""
     store: Dict[str, Dict[str, object]] = {}
-    for entry in items:
-        if isinstance(entry, dict) and entry.get("id"):
-            store[str(entry["id"])] = entry
+    for path in LEGACY_PATHS:
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                if path.endswith(".jsonl"):
+                    items = [json.loads(line) for line in fh if line.strip()]
+                else:
+                    items = json.load(fh)
+        except (OSError, ValueError) as exc:
+            die(f"Unable to read {path}: {exc}")
+        if not isinstance(items, list):
+            die(f"{path} must contain a JSON array.")
+        for entry in items:
+            if isinstance(entry, dict) and entry.get("id"):
+                store[str(entry["id"])] = entry
+        return store
     return store
 
 
-def fetch_updates(token: str, profile_id: str, since_ts: int) -> Iterable[dict]:
-    page = 1
-    while True:
-        try:
-            resp = SESSION.get(
-                f"{API_ROOT}/profiles/{profile_id}/updates/sent.json",
-                params={
-                    "access_token": token,
-                    "page": page,
-                    "count": 100,
-                    "since": since_ts,
-                },
-                timeout=30,
-            )
-        except requests.RequestException as exc:
-            die(f"Network error for profile {profile_id}: {exc}")
+def open_store() -> MetricsStore:
+    """Open the partitioned store, seeding it from a legacy metrics file on first use."""
+    store = MetricsStore(STORE_DIR)
+    if not store.exists():
+        legacy = load_legacy()
+        if legacy:
+            store.replace_all(legacy.values())
+            print(f"Migrated {len(legacy)} records into {STORE_DIR}")
+    return store
 
-        if resp.status_code != 200:
-            die(
-                f"Buffer API error for profile {profile_id}: "
-                f"{resp.status_code} {resp.text}"
-            )
 
-        try:
-            payload = resp.json()
-        except ValueError as exc:
-            die(f"JSON decode error for profile {profile_id}: {exc}")
+def load_cursor() -> Dict[str, Dict[str, object]]:
+    try:
+        with open(CURSOR_PATH, "r", encoding="utf-8") as fh:
+            cursor = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return cursor if isinstance(cursor, dict) else {}
 
-        updates = payload.get("updates")
-        if updates is None:
-            # some responses may return the list directly
-            updates = payload if isinstance(payload, list) else []
 
-        if not updates:
-            break
+def save_cursor(cursor: Dict[str, Dict[str, object]]) -> None:
+    write_json(CURSOR_PATH, cursor, indent=2, sort_keys=True)
+
+
+def sync_since(cursor: Dict[str, Dict[str, object]], profile_id: str, now_ts: int) -> int:
+    """Oldest sent_at to ask for: everything new since the cursor, plus the refresh window."""
+    first_sync = now_ts - INITIAL_DAYS * 86400
+    last_sent = (cursor.get(profile_id) or {}).get("last_sent_at")
+    if not isinstance(last_sent, int):
+        return first_sync
+    return max(first_sync, min(last_sent, now_ts - REFRESH_DAYS * 86400))
+
+
+def retry_delay(resp: Optional[requests.Response], attempt: int) -> float:
+    """Seconds to wait before retrying: Retry-After when the server sent one, else 2^attempt."""
+    if resp is not None:
+        value = resp.headers.get("Retry-After", "")
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+    return float(2 ** attempt)
 
-        for update in updates:
-            yield update
 
-        # stop if fewer than requested (no more pages)
-        if len(updates) < 100:
+def get_json(url: str, params: Dict[str, object], limiter: RateLimiter, retries: int = MAX_RETRIES) -> object:
+    host = urlsplit(url).netloc
+    for attempt in range(retries + 1):
+        limiter.acquire(host)
+        resp = None
+        try:
+            resp = SESSION.get(url, params=params, timeout=30)
+        except requests.RequestException as exc:
+            error = f"network error: {exc}"
+        else:
+            if resp.status_code == 200:
+                try:
+                    return resp.json()
+                except ValueError as exc:
+                    raise FetchError(f"JSON decode error: {exc}") from exc
+            error = f"{resp.status_code} {resp.text[:200]}"
+            if resp.status_code not in RETRY_STATUS:
+                raise FetchError(error)
+        if attempt == retries:
             break
-        page += 1
+        delay = retry_delay(resp, attempt)
+        if resp is not None and resp.status_code == 429:
+            limiter.defer(host, delay)
+        else:
+            time.sleep(delay)
+    raise FetchError(f"{error} (after {retries + 1} attempts)")
+
+
+def fetch_page(token: str, profile_id: str, page: int, since_ts: int,
+               limiter: RateLimiter) -> Tuple[List[dict], Optional[int]]:
+    """One page of sent updates for a profile, plus the total Buffer reports (if any)."""
+    payload = get_json(
+        f"{API_ROOT}/profiles/{profile_id}/updates/sent.json",
+        {"access_token": token, "page": page, "count": PAGE_SIZE, "since": since_ts},
+        limiter,
+    )
+    if isinstance(payload, list):
+        # some responses may return the list directly
+        return payload, None
+    try:
+        total = int(payload["total"])
+    except (KeyError, TypeError, ValueError):
+        total = None
+    return payload.get("updates") or [], total
+
+
+def fetch_all(token: str, profile_ids: List[str], since_ts: int, workers: int = WORKERS,
+              limiter: Optional[RateLimiter] = None,
+              since_by_profile: Optional[Dict[str, int]] = None) -> Tuple[Dict[str, List[dict]], Dict[str, str]]:
+    """
+    Fetch sent updates for every profile concurrently (since since_by_profile[p], else since_ts).
+
+    Page 1 of each profile goes out at once. When it reports a total, the remaining pages
+    are fetched in parallel; otherwise pages follow one another until a short page.
+
+    Returns:
+        (updates per profile in page order, error message per profile that failed)
+    """
+    limiter = limiter or RateLimiter()
+    pages: Dict[str, Dict[int, List[dict]]] = {p: {} for p in profile_ids}
+    errors: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        def submit(profile_id: str, page: int) -> None:
+            since = (since_by_profile or {}).get(profile_id, since_ts)
+            pending[pool.submit(fetch_page, token, profile_id, page, since, limiter)] = (profile_id, page)
+
+        pending: Dict[object, Tuple[str, int]] = {}
+        for profile_id in profile_ids:
+            submit(profile_id, 1)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                profile_id, page = pending.pop(fut)
+                try:
+                    updates, total = fut.result()
+                except FetchError as exc:
+                    errors.setdefault(profile_id, f"page {page}: {exc}")
+                    continue
+                pages[profile_id][page] = updates
+                if profile_id in errors or len(updates) < PAGE_SIZE:
+                    continue
+                if total is None:
+                    submit(profile_id, page + 1)
+                elif page == 1:
+                    for nxt in range(2, math.ceil(total / PAGE_SIZE) + 1):
+                        submit(profile_id, nxt)
+    updates = {p: [u for n in sorted(got) for u in got[n]] for p, got in pages.items()}
+    return updates, errors
+
+
+def sent_ts(update: dict) -> Optional[int]:
+    sent_at = (
+        update.get("sent_at")
+        or update.get("updated_at")
+        or update.get("created_at")
+        or update.get("due_at")
+    )
+    return int(sent_at) if isinstance(sent_at, (int, float)) else None
 
 
 def normalize_update(update: dict, profile_id: str) -> Dict[str, object]:
@@ -124,13 +308,8 @@ def normalize_update(update: dict, profile_id: str) -> Dict[str, object]:
     shares = int(stats.get("shares") or stats.get("retweets") or 0)
     comments = int(stats.get("comments") or 0)
 
-    sent_at = (
-        update.get("sent_at")
-        or update.get("updated_at")
-        or update.get("created_at")
-        or update.get("due_at")
-    )
-    if isinstance(sent_at, (int, float)):
+    sent_at = sent_ts(update)
+    if sent_at is not None:
         dt = datetime.fromtimestamp(sent_at, tz=timezone.utc)
     else:
         dt = datetime.now(tz=timezone.utc)
@@ -156,17 +335,20 @@ def normalize_update(update: dict, profile_id: str) -> Dict[str, object]:
 
 
 def write_output(records: Iterable[Dict[str, object]]) -> None:
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    data = sorted(
-        records,
-        key=lambda r: (r.get("day", ""), r.get("id", "")),
-    )
-    with open(OUTPUT_PATH, "w", encoding="utf-8") as fh:
-        json.dump(data, fh, indent=2, sort_keys=True)
-    print(f"Wrote {len(data)} records to {OUTPUT_PATH}")
-
+    """Replace the whole store with records."""
+    count = MetricsStore(STORE_DIR).replace_all(records)
+    print(f"Wrote {count} records to {STORE_DIR}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Fetch Buffer engagement metrics into analytics/metrics/.")
+    ap.add_argument("--compact", action="store_true", help="only compact every partition and exit")
+    args = ap.parse_args(argv)
+    if args.compact:
+        dropped = open_store().compact()
+        print(f"Compacted {STORE_DIR}: dropped {dropped} superseded lines")
+        return
 
-def main() -> None:
     token = os.getenv("BUFFER_TOKEN")
     profile_env = os.getenv("PROFILE_IDS")
     if not token or not profile_env:
@@ -180,18 +362,36 @@ def main() -> None:
         write_output(generate_sample_metrics())
         return
 
-    since_ts = int((datetime.utcnow() - timedelta(days=30)).timestamp())
-    existing = load_existing()
+    now_ts = int(time.time())
+    cursor = load_cursor()
+    since = {p: sync_since(cursor, p, now_ts) for p in profile_ids}
+    store = open_store()
 
+    fetched, errors = fetch_all(token, profile_ids, now_ts - INITIAL_DAYS * 86400, since_by_profile=since)
+    records: List[Dict[str, object]] = []
     for profile_id in profile_ids:
-        for raw in fetch_updates(token, profile_id, since_ts):
+        for raw in fetched[profile_id]:
             normalized = normalize_update(raw, profile_id)
             if not normalized:
                 continue
-            existing[normalized["id"]] = normalized
-
-    write_output(existing.values())
-
+            records.append(normalized)
+        if profile_id in errors:
+            continue  # leave the cursor where it was so the next run retries the gap
+        prev = cursor.get(profile_id) or {}
+        seen = [t for t in map(sent_ts, fetched[profile_id]) if t is not None]
+        cursor[profile_id] = {
+            "last_sent_at": max(seen + [prev.get("last_sent_at") or 0]) or None,
+            "since": since[profile_id],
+            "synced_at": now_ts,
+        }
+
+    for profile_id, error in errors.items():
+        print(f"Warning: Buffer fetch failed for profile {profile_id}: {error}", file=sys.stderr)
+    if errors and len(errors) == len(profile_ids):
+        die("Buffer fetch failed for every profile.")
+    appended = store.upsert(records)
+    print(f"Upserted {appended} changed records into {STORE_DIR}")
+    save_cursor(cursor)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Month/service partitioned store for Buffer engagement metrics.
+
+Records live in analytics/metrics/<YYYY-MM>/<service>.jsonl. Each partition is
+append-only: the last line for an id is its current value. A partition is
+compacted (rewritten one sorted line per id) once its superseded lines outnumber
+live ones. analytics/metrics/manifest.json lists every partition with its day
+range and size, so readers such as dashboard.html fetch only the months they
+show. A write touches only the partitions of the records it changes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from atomic_io import append_lines, atomic_open, write_json
+
+STORE_DIR = "analytics/metrics"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def partition_of(record: Dict[str, object]) -> str:
+    """Relative partition path for a record: <YYYY-MM>/<service>.jsonl."""
+    day = str(record.get("day") or "")
+    month = day[:7] if len(day) >= 7 else "unknown"
+    service = str(record.get("service") or "unknown").lower().replace("/", "_")
+    return f"{month}/{service}.jsonl"
+
+
+def _dump(record: Dict[str, object]) -> str:
+    return json.dumps(record, sort_keys=True) + "\n"
+
+
+class MetricsStore:
+    """Partitioned JSONL metrics with a manifest of partitions."""
+
+    def __init__(self, root: str = STORE_DIR) -> None:
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.partitions: Dict[str, Dict[str, object]] = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as fh:
+                manifest = json.load(fh)
+            self.partitions = {p["path"]: p for p in manifest.get("partitions", [])}
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def read_partition(self, rel: str) -> Tuple[Dict[str, Dict[str, object]], int]:
+        """Current record per id in one partition, plus its line count."""
+        store: Dict[str, Dict[str, object]] = {}
+        lines = 0
+        path = os.path.join(self.root, rel)
+        if not os.path.exists(path):
+            return store, lines
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                if not line.endswith("\n"):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn by a crash mid-append; the next append cuts it off
+                else:
+                    entry = json.loads(line)
+                lines += 1
+                if isinstance(entry, dict) and entry.get("id"):
+                    store[str(entry["id"])] = entry
+        return store, lines
+
+    def records(self) -> Iterator[Dict[str, object]]:
+        """Every current record, partition by partition."""
+        for rel in sorted(self.partitions):
+            yield from self.read_partition(rel)[0].values()
+
+    def upsert(self, records: Iterable[Dict[str, object]]) -> int:
+        """
+        Append new or changed records to their partitions.
+
+        Returns:
+            Number of records appended.
+        """
+        grouped: Dict[str, List[Dict[str, object]]] = {}
+        for record in records:
+            grouped.setdefault(partition_of(record), []).append(record)
+        appended = 0
+        for rel, batch in sorted(grouped.items()):
+            current, lines = self.read_partition(rel)
+            changed = [r for r in batch if current.get(str(r["id"])) != r]
+            if not changed:
+                continue
+            for record in changed:
+                current[str(record["id"])] = record
+            lines += len(changed)
+            if lines > 2 * len(current):
+                self._rewrite(rel, current)
+            else:
+                append_lines(os.path.join(self.root, rel), [_dump(r) for r in changed])
+                self._describe(rel, current, lines)
+            appended += len(changed)
+        self.save_manifest()
+        return appended
+
+    def compact(self, rels: Optional[Iterable[str]] = None) -> int:
+        """
+        Rewrite partitions (all by default) with one sorted line per id.
+
+        Returns:
+            Number of superseded lines dropped.
+        """
+        dropped = 0
+        for rel in sorted(rels if rels is not None else list(self.partitions)):
+            current, lines = self.read_partition(rel)
+            if lines > len(current):
+                dropped += lines - len(current)
+                self._rewrite(rel, current)
+        self.save_manifest()
+        return dropped
+
+    def replace_all(self, records: Iterable[Dict[str, object]]) -> int:
+        """Drop every partition and write records from scratch (migration and sample data)."""
+        for rel in list(self.partitions):
+            path = os.path.join(self.root, rel)
+            if os.path.exists(path):
+                os.remove(path)
+        self.partitions = {}
+        grouped: Dict[str, Dict[str, Dict[str, object]]] = {}
+        for record in records:
+            if record.get("id"):
+                grouped.setdefault(partition_of(record), {})[str(record["id"])] = record
+        for rel, current in grouped.items():
+            self._rewrite(rel, current)
+        self.save_manifest()
+        return sum(len(c) for c in grouped.values())
+
+    def save_manifest(self) -> None:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "partitions": [self.partitions[rel] for rel in sorted(self.partitions)],
+        }
+        write_json(self.manifest_path, manifest, indent=2, sort_keys=True)
+
+    def _rewrite(self, rel: str, current: Dict[str, Dict[str, object]]) -> None:
+        with atomic_open(os.path.join(self.root, rel)) as fh:
+            fh.writelines(_dump(r) for r in sorted(current.values(), key=lambda r: (r.get("day", ""), r.get("id", ""))))
+        self._describe(rel, current, len(current))
+
+    def _describe(self, rel: str, current: Dict[str, Dict[str, object]], lines: int) -> None:
+        days = sorted(str(r.get("day") or "") for r in current.values())
+        month, service = rel[:-len(".jsonl")].split("/", 1)
+        self.partitions[rel] = {
+            "path": rel,
+            "month": month,
+            "service": service,
+            "records": len(current),
+            "lines": lines,
+            "bytes": os.path.getsize(os.path.join(self.root, rel)),
+            "first_day": days[0] if days else "",
+            "last_day": days[-1] if days else "",
+        }
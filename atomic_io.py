@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Crash-safe writers for feed, CSV and JSON artifacts.
+
+Every write goes to a temp file next to the target, is fsynced, and is renamed
+over the target, so a crashed or cancelled job leaves either the old file or
+the new one, never a truncated mix. If the new bytes match what is already on
+disk, the target is left alone (no rename, no mtime change), so unchanged
+outputs cause no git churn.
+
+Append-only logs (the feed item log, metrics partitions) grow through
+append_lines() instead: each append is fsynced, and a torn last line left by
+a crash mid-append is cut off before the next one lands.
+"""
+
+import contextlib
+import json
+import os
+from typing import IO, Any, Iterable, Iterator, Union
+
+READ_BLOCK = 64 * 1024
+
+
+def _tmp_path(path: str) -> str:
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def _fsync_dir(directory: str) -> None:
+    """Persist the rename itself; not every platform lets a directory be opened."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _same_bytes(path: str, data: bytes) -> bool:
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def _same_file(a: str, b: str) -> bool:
+    try:
+        if os.path.getsize(a) != os.path.getsize(b):
+            return False
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            while True:
+                block = fa.read(READ_BLOCK)
+                if block != fb.read(READ_BLOCK):
+                    return False
+                if not block:
+                    return True
+    except OSError:
+        return False
+
+
+def write_atomic(path: str, data: Union[bytes, str], encoding: str = "utf-8",
+                 skip_unchanged: bool = True) -> bool:
+    """
+    Replace path with data in one atomic step.
+
+    Args:
+        path: Target file
+        data: Full new content (str is encoded with `encoding`)
+        encoding: Text encoding for str data
+        skip_unchanged: Leave the target untouched when it already holds data
+
+    Returns:
+        True if the file was written, False if it was already up to date
+    """
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    if skip_unchanged and _same_bytes(path, data):
+        return False
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp = _tmp_path(path)
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+    _fsync_dir(directory)
+    return True
+
+
+@contextlib.contextmanager
+def atomic_open(path: str, mode: str = "w", encoding: str = "utf-8", newline: Any = None,
+                skip_unchanged: bool = True) -> Iterator[IO]:
+    """
+    Stream into a temp file that replaces path only if the block exits cleanly.
+
+    Args:
+        path: Target file
+        mode: "w" (text) or "wb"
+        encoding: Text encoding (text mode)
+        newline: As for open() (pass "" for csv writers)
+        skip_unchanged: Keep the existing file when the streamed bytes are identical
+    """
+    if mode not in ("w", "wb"):
+        raise ValueError(f"atomic_open supports 'w' and 'wb', not {mode!r}")
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp = _tmp_path(path)
+    if mode == "wb":
+        f = open(tmp, "wb")
+    else:
+        f = open(tmp, "w", encoding=encoding, newline=newline)
+    try:
+        with f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if skip_unchanged and _same_file(tmp, path):
+            os.remove(tmp)
+            return
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+    _fsync_dir(directory)
+
+
+def write_json(path: str, obj: Any, skip_unchanged: bool = True, **dump_kwargs: Any) -> bool:
+    """
+    Atomically write obj as JSON (same bytes json.dump would produce with dump_kwargs).
+
+    Returns:
+        True if the file was written, False if it was already up to date
+    """
+    return write_atomic(path, json.dumps(obj, **dump_kwargs), skip_unchanged=skip_unchanged)
+
+
+def _complete_length(f: IO[bytes], size: int) -> int:
+    """Length of the file up to and including its last newline (0 if it has none)."""
+    pos = size
+    while pos > 0:
+        step = min(READ_BLOCK, pos)
+        pos -= step
+        f.seek(pos)
+        cut = f.read(step).rfind(b"\n")
+        if cut >= 0:
+            return pos + cut + 1
+    return 0
+
+
+def append_lines(path: str, lines: Iterable[str], encoding: str = "utf-8") -> int:
+    """
+    Durably append newline-terminated lines to a log file.
+
+    If the file does not end in a newline, its last line was torn by a crash
+    mid-append; that partial line is truncated away first, so the log only ever
+    holds complete lines.
+
+    Returns:
+        Number of bytes of torn tail dropped (0 normally)
+    """
+    data = "".join(lines).encode(encoding)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    created = not os.path.exists(path)
+    dropped = 0
+    with open(path, "a+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                keep = _complete_length(f, size)
+                f.truncate(keep)
+                dropped = size - keep
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    if created:
+        _fsync_dir(directory)
+    return dropped
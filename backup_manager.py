@@ -2,19 +2,43 @@
 """
 Backup and rollback manager for RSS feeds.
 Maintains rolling backups to enable recovery from bad content generation.
+
+Backups are content-addressed. A file is cut into chunks (one per <item> for
+feeds, fixed blocks otherwise); each chunk is gzipped once into
+backups/objects/<aa>/<sha256>.gz and shared by every snapshot that contains it.
+A snapshot is a small recipe, backups/snapshots/<id>.json, listing its chunks.
+Since a post adds one item to rss.xml, a backup writes only the new chunks plus
+two small JSON files, and the store grows with what changed rather than with
+the feed size.
+
+backups/manifest.json is the catalog: per backed-up file, its snapshots in
+sequence order (seq, id, time, size, sha256), plus a reference count per chunk.
+list/latest/prune queries are answered from it without scanning the directory,
+and pruning touches only the snapshots it drops. The catalog is replaced
+atomically (atomic_io) after every change. Plain-copy backups and v1
+manifests left by earlier versions are folded into it once, on first load.
 """
 
-import os
-import shutil
 import glob
+import gzip
+import hashlib
+import json
+import os
+import re
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Iterator, List, Optional, Tuple
+from atomic_io import write_atomic, write_json
 from logger_config import get_logger
 
 logger = get_logger(__name__)
 
 BACKUP_DIR = "backups"
 DEFAULT_KEEP_COUNT = 30
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2  # v1 listed snapshots flat, without sequence numbers or chunk refs
+BLOCK_SIZE = 64 * 1024  # chunk size for files without <item> boundaries
+ITEM_RE = re.compile(rb"<item[\s>]")
+LEGACY_NAME_RE = re.compile(r"^(?P<name>.+)_\d{8}_\d{6}(?:_\d+)?(?P<ext>\.[^.]*)?$")
 
 
 def ensure_backup_dir() -> None:
@@ -24,36 +48,188 @@ def ensure_backup_dir() -> None:
         logger.info(f"Created backup directory: {BACKUP_DIR}")
 
 
+def split_chunks(data: bytes) -> Iterator[bytes]:
+    """Cut a file before every <item> (the channel header is its own chunk), or into fixed blocks."""
+    starts = [m.start() for m in ITEM_RE.finditer(data)]
+    if not starts:
+        for i in range(0, len(data), BLOCK_SIZE):
+            yield data[i:i + BLOCK_SIZE]
+        return
+    bounds = [0] + starts + [len(data)]
+    for a, b in zip(bounds, bounds[1:]):
+        if b > a:
+            yield data[a:b]
+
+
+def _object_path(digest: str) -> str:
+    return os.path.join(BACKUP_DIR, "objects", digest[:2], f"{digest}.gz")
+
+
+def _recipe_path(snapshot_id: str) -> str:
+    return os.path.join(BACKUP_DIR, "snapshots", f"{snapshot_id}.json")
+
+
+def _put_chunk(chunk: bytes) -> str:
+    """Store a chunk unless an identical one is already there; returns its sha256."""
+    digest = hashlib.sha256(chunk).hexdigest()
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        write_atomic(path, gzip.compress(chunk, mtime=0), skip_unchanged=False)
+    return digest
+
+
+def _recipe(snapshot_id: str) -> List[str]:
+    path = _recipe_path(snapshot_id)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh).get("chunks", [])
+
+
+def _empty_catalog() -> Dict:
+    return {"version": MANIFEST_VERSION, "files": {}, "refs": {}}
+
+
+def load_catalog() -> Dict:
+    """
+    Load backups/manifest.json, upgrading older layouts.
+
+    Returns:
+        {"version", "files": {basename: {"next_seq", "snapshots": [...]}}, "refs": {sha256: count}}
+    """
+    path = os.path.join(BACKUP_DIR, MANIFEST_NAME)
+    old = None
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as fh:
+            old = json.load(fh)
+        if old.get("version") == MANIFEST_VERSION:
+            return old
+    elif not os.path.isdir(BACKUP_DIR):
+        return _empty_catalog()
+    return _migrate(old)
+
+
+def save_catalog(catalog: Dict) -> None:
+    write_json(os.path.join(BACKUP_DIR, MANIFEST_NAME), catalog, indent=2, sort_keys=True)
+
+
+def _migrate(old: Optional[Dict]) -> Dict:
+    """Fold a v1 manifest and plain-copy backups into a catalog (the only directory scan)."""
+    found: Dict[str, List[Dict]] = {}
+    for snap in (old or {}).get("snapshots", []):
+        found.setdefault(snap["file"], []).append(dict(snap))
+    for path in glob.glob(os.path.join(BACKUP_DIR, "*")):
+        m = LEGACY_NAME_RE.match(os.path.basename(path))
+        if m and os.path.isfile(path):
+            found.setdefault(m.group("name") + (m.group("ext") or ""), []).append({
+                "id": os.path.basename(path),
+                "legacy": True,
+                "created": datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds"),
+                "size": os.path.getsize(path),
+            })
+
+    catalog = _empty_catalog()
+    for name, snaps in found.items():
+        snaps.sort(key=lambda s: s["id"])
+        for seq, snap in enumerate(snaps, 1):
+            snap["seq"] = seq
+            for digest in set(_recipe(snap["id"])) if not snap.get("legacy") else ():
+                catalog["refs"][digest] = catalog["refs"].get(digest, 0) + 1
+        catalog["files"][name] = {"next_seq": len(snaps) + 1, "snapshots": snaps}
+    if found:
+        save_catalog(catalog)
+        logger.info(f"Indexed {sum(len(s) for s in found.values())} existing backups into {MANIFEST_NAME}")
+    return catalog
+
+
+def _prune(catalog: Dict, file_name: str, keep_count: int) -> Tuple[List[Dict], List[str]]:
+    """
+    Drop the oldest snapshots beyond keep_count from the catalog.
+
+    Returns:
+        (dropped snapshots, chunk digests no longer referenced), for deletion after the catalog is saved
+    """
+    entry = catalog["files"].get(file_name)
+    excess = len(entry["snapshots"]) - max(keep_count, 0) if entry else 0
+    if excess <= 0:
+        return [], []
+    dropped, entry["snapshots"] = entry["snapshots"][:excess], entry["snapshots"][excess:]
+    orphans = []
+    refs = catalog["refs"]
+    for snap in dropped:
+        if snap.get("legacy"):
+            continue
+        for digest in set(_recipe(snap["id"])):
+            refs[digest] = refs.get(digest, 1) - 1
+            if refs[digest] <= 0:
+                del refs[digest]
+                orphans.append(digest)
+    return dropped, orphans
+
+
+def _delete(dropped: List[Dict], orphans: List[str]) -> None:
+    for digest in orphans:
+        try:
+            os.remove(_object_path(digest))
+        except FileNotFoundError:
+            pass
+    for snap in dropped:
+        path = os.path.join(BACKUP_DIR, snap["id"]) if snap.get("legacy") else _recipe_path(snap["id"])
+        try:
+            os.remove(path)
+            logger.info(f"Deleted old backup: {os.path.join(BACKUP_DIR, snap['id'])}")
+        except Exception as e:
+            logger.warning(f"Failed to delete old backup {snap['id']}: {e}")
+
+
 def backup_file(file_path: str, keep_count: int = DEFAULT_KEEP_COUNT) -> Optional[str]:
     """
-    Create a timestamped backup of the specified file.
+    Snapshot the specified file into the deduplicated backup store.
 
     Args:
         file_path: Path to file to backup
         keep_count: Number of recent backups to retain
 
     Returns:
-        Path to backup file, or None if backup failed
+        Backup path (snapshot id) to pass to restore_backup, or None if backup failed
     """
     if not os.path.exists(file_path):
         logger.warning(f"Cannot backup non-existent file: {file_path}")
         return None
 
     ensure_backup_dir()
-
-    # Create timestamped backup filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     file_basename = os.path.basename(file_path)
     file_name, file_ext = os.path.splitext(file_basename)
-    backup_filename = f"{file_name}_{timestamp}{file_ext}"
-    backup_path = os.path.join(BACKUP_DIR, backup_filename)
 
     try:
-        shutil.copy2(file_path, backup_path)
+        with open(file_path, "rb") as fh:
+            data = fh.read()
+        chunks = [_put_chunk(c) for c in split_chunks(data)]
+
+        catalog = load_catalog()
+        entry = catalog["files"].setdefault(file_basename, {"next_seq": 1, "snapshots": []})
+        seq = entry["next_seq"]
+        entry["next_seq"] = seq + 1
+        now = datetime.now()
+        snapshot_id = f"{file_name}_{now.strftime('%Y%m%d_%H%M%S')}_{seq:05d}{file_ext}"
+        write_json(_recipe_path(snapshot_id), {"chunks": chunks})
+        for digest in set(chunks):
+            catalog["refs"][digest] = catalog["refs"].get(digest, 0) + 1
+        entry["snapshots"].append({
+            "seq": seq,
+            "id": snapshot_id,
+            "created": now.isoformat(timespec="seconds"),
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "chunks": len(chunks),
+        })
+        dropped, orphans = _prune(catalog, file_basename, keep_count)
+        save_catalog(catalog)
+        backup_path = os.path.join(BACKUP_DIR, snapshot_id)
         logger.info(f"Created backup: {backup_path}")
 
         # Cleanup old backups
-        cleanup_old_backups(file_basename, keep_count)
+        _delete(dropped, orphans)
 
         return backup_path
     except Exception as e:
@@ -65,24 +241,17 @@ def cleanup_old_backups(file_pattern: str, keep_count: int) -> None:
     """
     Remove old backups, keeping only the most recent ones.
 
+    Chunks are deleted only once no remaining snapshot refers to them.
+
     Args:
         file_pattern: Base filename to match (e.g., "rss.xml")
         keep_count: Number of recent backups to retain
     """
-    file_name, file_ext = os.path.splitext(file_pattern)
-    pattern = os.path.join(BACKUP_DIR, f"{file_name}_*{file_ext}")
-    backups = sorted(glob.glob(pattern), reverse=True)
-
-    if len(backups) <= keep_count:
-        return
-
-    # Delete old backups
-    for old_backup in backups[keep_count:]:
-        try:
-            os.remove(old_backup)
-            logger.info(f"Deleted old backup: {old_backup}")
-        except Exception as e:
-            logger.warning(f"Failed to delete old backup {old_backup}: {e}")
+    catalog = load_catalog()
+    dropped, orphans = _prune(catalog, file_pattern, keep_count)
+    if dropped:
+        save_catalog(catalog)
+        _delete(dropped, orphans)
 
 
 def list_backups(file_pattern: str) -> List[str]:
@@ -93,11 +262,20 @@ def list_backups(file_pattern: str) -> List[str]:
         file_pattern: Base filename to match (e.g., "rss.xml")
 
     Returns:
-        List of backup file paths, newest first
+        List of backup paths, newest first
     """
-    file_name, file_ext = os.path.splitext(file_pattern)
-    pattern = os.path.join(BACKUP_DIR, f"{file_name}_*{file_ext}")
-    return sorted(glob.glob(pattern), reverse=True)
+    entry = load_catalog()["files"].get(file_pattern, {"snapshots": []})
+    return [os.path.join(BACKUP_DIR, s["id"]) for s in reversed(entry["snapshots"])]
+
+
+def _find_snapshot(catalog: Dict, snapshot_id: str) -> Optional[Dict]:
+    m = LEGACY_NAME_RE.match(snapshot_id)
+    names = [m.group("name") + (m.group("ext") or "")] if m else []
+    for name in names + [n for n in catalog["files"] if n not in names]:
+        for snap in reversed(catalog["files"].get(name, {}).get("snapshots", [])):
+            if snap["id"] == snapshot_id:
+                return snap
+    return None
 
 
 def restore_backup(backup_path: str, target_path: str) -> bool:
@@ -105,22 +283,36 @@ def restore_backup(backup_path: str, target_path: str) -> bool:
     Restore a backup file to the target location.
 
     Args:
-        backup_path: Path to backup file
+        backup_path: Backup path as returned by backup_file or list_backups
         target_path: Path where file should be restored
 
     Returns:
         True if successful, False otherwise
     """
-    if not os.path.exists(backup_path):
+    snap = _find_snapshot(load_catalog(), os.path.basename(backup_path))
+    if snap is None:
         logger.error(f"Backup file not found: {backup_path}")
         return False
 
     try:
+        if snap.get("legacy"):
+            with open(os.path.join(BACKUP_DIR, snap["id"]), "rb") as fh:
+                data = fh.read()
+        else:
+            parts = []
+            for digest in _recipe(snap["id"]):
+                with open(_object_path(digest), "rb") as fh:
+                    parts.append(gzip.decompress(fh.read()))
+            data = b"".join(parts)
+            if hashlib.sha256(data).hexdigest() != snap["sha256"]:
+                logger.error(f"Backup {backup_path} failed its checksum; not restoring")
+                return False
+
         # Create backup of current file before restoring
         if os.path.exists(target_path):
             backup_file(target_path, keep_count=DEFAULT_KEEP_COUNT)
 
-        shutil.copy2(backup_path, target_path)
+        write_atomic(target_path, data)
         logger.info(f"Restored backup {backup_path} to {target_path}")
         return True
     except Exception as e:
@@ -138,5 +330,5 @@ def get_latest_backup(file_pattern: str) -> Optional[str]:
     Returns:
         Path to most recent backup, or None if no backups exist
     """
-    backups = list_backups(file_pattern)
-    return backups[0] if backups else None
+    snaps = load_catalog()["files"].get(file_pattern, {}).get("snapshots")
+    return os.path.join(BACKUP_DIR, snaps[-1]["id"]) if snaps else None
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Thompson-sampling bandit over (style, CTA) arms, persisted in ops/bandit.json.
+
+Each arm keeps the sufficient statistics (n, sum, sum of squares) of the
+engagement scores of posts published with it. A ledger remembers which arm
+and score each post last contributed. A post whose score grows as engagement
+comes in replaces its old observation, so an update costs O(changed posts)
+and the posterior never double counts.
+
+Once enough posts carry a posting context (hour bucket, weekend, number in
+title), a disjoint LinUCB model over the same arms takes over the choice. Its
+per-arm inverse design matrices are kept current with Sherman-Morrison rank-1
+updates, and every arm is scored in one vectorized pass.
+"""
+
+import json
+import math
+import random
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from atomic_io import write_json
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+BANDIT_PATH = "ops/bandit.json"
+BANDIT_VERSION = 2  # v1 held only softmax style_weights/cta_weights
+PRIOR_N = 2.0       # pseudo-observations at the pooled mean shrinking sparse arms
+MIN_VAR = 1.0       # variance floor so untested arms keep exploring
+WIN_RATE_DRAWS = 1000
+
+# ---- Contextual (LinUCB) ----
+CONTEXT_TZ = ZoneInfo("America/Phoenix")  # same clock as scripts/build_analytics.py
+HOUR_BUCKETS = ["early-morning", "morning", "early-afternoon", "late-afternoon", "evening", "night"]
+CONTEXT_FEATURES = ["bias"] + [f"hour:{b}" for b in HOUR_BUCKETS] + ["weekend", "has_number"]
+LINUCB_ALPHA = 1.0
+LINUCB_MIN_OBS = 20  # below this, Thompson sampling over the flat posteriors decides
+NUMBER_RE = re.compile(r"\b\d+%?|\$\d+")  # same test as build_analytics.has_number
+
+
+def arm_key(style: str, cta: str) -> str:
+    return f"{style}|{cta}"
+
+
+def split_arm(key: str) -> Tuple[str, str]:
+    style, _, cta = key.partition("|")
+    return style, cta
+
+
+def hour_bucket(hour: int) -> str:
+    """Posting-time bucket, matching hour_bucket() in scripts/build_analytics.py."""
+    if 5 <= hour < 9: return "early-morning"
+    if 9 <= hour < 12: return "morning"
+    if 12 <= hour < 15: return "early-afternoon"
+    if 15 <= hour < 18: return "late-afternoon"
+    if 18 <= hour < 22: return "evening"
+    return "night"
+
+
+def has_number(title: str) -> bool:
+    """The "has_number" context feature: the published title carries a number, % or $ figure."""
+    return bool(NUMBER_RE.search(title or ""))
+
+
+def context_vector(bucket: str, weekend: bool, has_number: bool) -> np.ndarray:
+    """Feature vector laid out as CONTEXT_FEATURES."""
+    x = np.zeros(len(CONTEXT_FEATURES))
+    x[0] = 1.0
+    if bucket in HOUR_BUCKETS:
+        x[1 + HOUR_BUCKETS.index(bucket)] = 1.0
+    x[-2] = float(weekend)
+    x[-1] = float(has_number)
+    return x
+
+
+def context_at(when: Optional[datetime] = None, has_number: bool = False) -> np.ndarray:
+    """Context for a post going out at `when` (default: now)."""
+    local = (when or datetime.now(CONTEXT_TZ)).astimezone(CONTEXT_TZ)
+    return context_vector(hour_bucket(local.hour), local.weekday() >= 5, has_number)
+
+
+def context_tag(when: Optional[datetime] = None, has_number: bool = False) -> str:
+    """
+    Compact label of the context an arm is chosen for, e.g. "evening/weekend/number".
+
+    Drafts carry it into the feed (a "context" category), so the post is later
+    credited under the context it was chosen for. A queued draft is tagged with
+    the publish slot it is queued for, not the time it was drafted.
+    """
+    local = (when or datetime.now(CONTEXT_TZ)).astimezone(CONTEXT_TZ)
+    return "/".join([hour_bucket(local.hour), "weekend" if local.weekday() >= 5 else "weekday",
+                     "number" if has_number else "plain"])
+
+
+def context_from_tag(tag: str) -> Optional[np.ndarray]:
+    """Vector for a context_tag() label; None if the label is missing or malformed."""
+    parts = (tag or "").split("/")
+    if len(parts) != 3 or parts[0] not in HOUR_BUCKETS:
+        return None
+    return context_vector(parts[0], parts[1] == "weekend", parts[2] == "number")
+
+
+class LinUCB:
+    """
+    Disjoint LinUCB: a ridge regression of reward on the context for every arm.
+
+    A_k = I + sum(x x^T) and b_k = sum(r x); the score of arm k for context x is
+    theta_k . x + alpha * sqrt(x^T A_k^-1 x) with theta_k = A_k^-1 b_k.
+    """
+
+    def __init__(self, arms: Iterable[str] = (), alpha: float = LINUCB_ALPHA,
+                 A: Optional[np.ndarray] = None, b: Optional[np.ndarray] = None,
+                 ledger: Optional[Dict[str, list]] = None):
+        self.d = len(CONTEXT_FEATURES)
+        self.alpha = alpha
+        self.arms: List[str] = list(arms)
+        self.index = {arm: i for i, arm in enumerate(self.arms)}
+        k = len(self.arms)
+        self.A = np.array(A, dtype=float) if A is not None else np.tile(np.eye(self.d), (k, 1, 1))
+        self.b = np.array(b, dtype=float) if b is not None else np.zeros((k, self.d))
+        self.A_inv = np.linalg.inv(self.A) if k else np.zeros((0, self.d, self.d))
+        self.ledger: Dict[str, list] = dict(ledger or {})
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> "LinUCB":
+        """Model from bandit.json's "linucb" section; a different feature layout starts fresh."""
+        if not data or data.get("features") != CONTEXT_FEATURES or not data.get("arms"):
+            return cls()
+        return cls(data["arms"], float(data.get("alpha", LINUCB_ALPHA)), data["A"], data["b"], data.get("ledger"))
+
+    def to_dict(self) -> Dict:
+        return {"features": CONTEXT_FEATURES, "alpha": self.alpha, "arms": self.arms,
+                "A": np.round(self.A, 6).tolist(), "b": np.round(self.b, 6).tolist(), "ledger": self.ledger}
+
+    def __len__(self) -> int:
+        return len(self.ledger)
+
+    def _arm(self, arm: str) -> int:
+        k = self.index.get(arm)
+        if k is None:
+            k = self.index[arm] = len(self.arms)
+            self.arms.append(arm)
+            eye = np.eye(self.d)[None]
+            self.A = np.concatenate([self.A, eye])
+            self.A_inv = np.concatenate([self.A_inv, eye])
+            self.b = np.concatenate([self.b, np.zeros((1, self.d))])
+        return k
+
+    def _update(self, k: int, x: np.ndarray, reward: float, sign: int) -> None:
+        # Sherman-Morrison: (A + s x x^T)^-1 = A^-1 - s (A^-1 x)(A^-1 x)^T / (1 + s x^T A^-1 x)
+        self.A[k] += sign * np.outer(x, x)
+        ax = self.A_inv[k] @ x
+        self.A_inv[k] -= sign * np.outer(ax, ax) / (1.0 + sign * (x @ ax))
+        self.b[k] += sign * reward * x
+
+    def observe(self, key: str, arm: str, reward: float, x: np.ndarray) -> bool:
+        """
+        Record (or revise) one post's reward under its posting context.
+
+        Returns:
+            True if the model changed
+        """
+        x = np.asarray(x, dtype=float)
+        prev = self.ledger.get(key)
+        if prev is not None:
+            p_arm, p_reward, p_x = prev
+            if p_arm == arm and p_reward == reward and p_x == x.tolist():
+                return False
+            pk = self._arm(p_arm)
+            if p_arm == arm and p_x == x.tolist():
+                self.b[pk] += (reward - p_reward) * x  # same design row, only the reward moved
+                self.ledger[key] = [arm, reward, p_x]
+                return True
+            self._update(pk, np.asarray(p_x), p_reward, -1)
+        self._update(self._arm(arm), x, reward, +1)
+        self.ledger[key] = [arm, reward, x.tolist()]
+        return True
+
+    def scores(self, x: np.ndarray, candidates: List[str]) -> np.ndarray:
+        """Upper confidence bound of every candidate for context x (unseen arms get the prior's)."""
+        x = np.asarray(x, dtype=float)
+        idx = np.array([self.index.get(arm, -1) for arm in candidates])
+        known = idx >= 0
+        out = np.full(len(candidates), self.alpha * math.sqrt(x @ x))  # A = I, b = 0
+        if known.any():
+            k = idx[known]
+            A_inv = self.A_inv[k]
+            theta = np.einsum("kij,kj->ki", A_inv, self.b[k])
+            width = np.sqrt(np.einsum("i,kij,j->k", x, A_inv, x))
+            out[known] = theta @ x + self.alpha * width
+        return out
+
+    def choose(self, x: np.ndarray, candidates: List[str], rng: random.Random = random) -> str:
+        """Highest-UCB candidate; ties broken at random."""
+        s = self.scores(x, candidates)
+        best = np.flatnonzero(s >= s.max() - 1e-12)
+        return candidates[int(best[rng.randrange(len(best))])]
+
+
+class BanditEngine:
+    """Gaussian Thompson sampling with per-arm running sums, plus the contextual LinUCB model."""
+
+    def __init__(self, arms: Optional[Dict[str, List[float]]] = None,
+                 ledger: Optional[Dict[str, list]] = None, prior_n: float = PRIOR_N,
+                 contextual: Optional[LinUCB] = None):
+        self.arms: Dict[str, List[float]] = {k: list(v) for k, v in (arms or {}).items()}
+        self.ledger: Dict[str, list] = dict(ledger or {})
+        self.prior_n = prior_n
+        self.contextual = contextual or LinUCB()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BanditEngine":
+        """Engine from a loaded bandit.json; a v1 file (weights only) starts empty."""
+        if data.get("version") != BANDIT_VERSION:
+            return cls()
+        return cls(data.get("arms"), data.get("ledger"), float(data.get("prior_n", PRIOR_N)),
+                   LinUCB.from_dict(data.get("linucb")))
+
+    @classmethod
+    def load(cls, path: str = BANDIT_PATH) -> "BanditEngine":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return cls()
+
+    def to_dict(self, styles: Iterable[str] = (), ctas: Iterable[str] = ()) -> Dict:
+        """
+        Serializable state plus style_weights/cta_weights: how often each style and CTA
+        wins a Thompson draw over the catalog (for humans and the reroll weights).
+        """
+        data = {"version": BANDIT_VERSION, "prior_n": self.prior_n, "arms": self.arms, "ledger": self.ledger,
+                "linucb": self.contextual.to_dict()}
+        candidates = [arm_key(s, c) for s in styles for c in ctas]
+        if candidates:
+            rates = self.win_rates(candidates, rng=random.Random(0))
+            style_w: Dict[str, float] = {}
+            cta_w: Dict[str, float] = {}
+            for key, p in rates.items():
+                style, cta = split_arm(key)
+                style_w[style] = style_w.get(style, 0.0) + p
+                cta_w[cta] = cta_w.get(cta, 0.0) + p
+            data["style_weights"] = {k: round(v, 3) for k, v in style_w.items()}
+            data["cta_weights"] = {k: round(v, 3) for k, v in cta_w.items()}
+        return data
+
+    def save(self, path: str = BANDIT_PATH, styles: Iterable[str] = (), ctas: Iterable[str] = ()) -> None:
+        write_json(path, self.to_dict(styles, ctas), ensure_ascii=False, indent=2, sort_keys=True)
+
+    def _add(self, arm: str, reward: float, sign: int) -> None:
+        n, s, ss = self.arms.get(arm, [0.0, 0.0, 0.0])
+        self.arms[arm] = [n + sign, s + sign * reward, ss + sign * reward * reward]
+
+    def observe(self, key: str, arm: str, reward: float, context: Optional[np.ndarray] = None) -> bool:
+        """
+        Record (or revise) the reward of one post.
+
+        Args:
+            key: post GUID
+            arm: arm_key(style, cta) the post was published with
+            reward: its current engagement score
+            context: its posting context (context_vector), which also trains LinUCB
+
+        Returns:
+            True if either model changed
+        """
+        changed = context is not None and self.contextual.observe(key, arm, reward, context)
+        prev = self.ledger.get(key)
+        if prev is not None:
+            if prev[0] == arm and prev[1] == reward:
+                return changed
+            self._add(prev[0], prev[1], -1)
+        self._add(arm, reward, +1)
+        self.ledger[key] = [arm, reward]
+        return True
+
+    def recorded(self, key: str, arm: str, reward: float) -> bool:
+        """
+        True if the post is already in both models with this arm and reward.
+
+        A post's context is fixed once it is published, so such a post needs no observe().
+        """
+        return self.ledger.get(key) == [arm, reward] and key in self.contextual.ledger
+
+    def choose(self, candidates: List[str], context: Optional[np.ndarray] = None,
+               rng: random.Random = random) -> str:
+        """LinUCB for this context once it has LINUCB_MIN_OBS posts, Thompson sampling before that."""
+        if context is not None and len(self.contextual) >= LINUCB_MIN_OBS:
+            return self.contextual.choose(context, candidates, rng)
+        return self.sample(candidates, rng)
+
+    def pooled(self) -> Tuple[float, float]:
+        """Mean and variance over every observation: the prior each arm shrinks towards."""
+        n = sum(a[0] for a in self.arms.values())
+        if n <= 0:
+            return 0.0, MIN_VAR
+        s = sum(a[1] for a in self.arms.values())
+        ss = sum(a[2] for a in self.arms.values())
+        mean = s / n
+        return mean, max(MIN_VAR, ss / n - mean * mean)
+
+    def posterior(self, arm: str, prior: Optional[Tuple[float, float]] = None) -> Tuple[float, float]:
+        """
+        Posterior mean and standard deviation of an arm's expected reward.
+
+        Returns:
+            Tuple of (mean, sd)
+        """
+        mu0, var0 = prior or self.pooled()
+        n, s, ss = self.arms.get(arm, [0.0, 0.0, 0.0])
+        n_post = self.prior_n + n
+        mean = (self.prior_n * mu0 + s) / n_post
+        # sample variance around the posterior mean, padded with the prior's pseudo-observations
+        var = max(MIN_VAR, (ss - 2 * mean * s + n * mean * mean + self.prior_n * var0) / n_post)
+        return mean, math.sqrt(var / n_post)
+
+    def sample(self, candidates: List[str], rng: random.Random = random) -> str:
+        """Thompson draw: sample every candidate's posterior and return the best arm."""
+        prior = self.pooled()
+        best, best_theta = candidates[0], -math.inf
+        for arm in candidates:
+            mean, sd = self.posterior(arm, prior)
+            theta = rng.gauss(mean, sd)
+            if theta > best_theta:
+                best, best_theta = arm, theta
+        return best
+
+    def win_rates(self, candidates: List[str], draws: int = WIN_RATE_DRAWS,
+                  rng: random.Random = random) -> Dict[str, float]:
+        """Share of Thompson draws each candidate wins."""
+        wins = dict.fromkeys(candidates, 0)
+        for _ in range(draws):
+            wins[self.sample(candidates, rng)] += 1
+        return {k: v / draws for k, v in wins.items()}
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Input/output hashes per build step, so scheduled jobs can exit early.
+
+Each derived-artifact step (social feeds, analytics, bandit, carousels, ...)
+records the sha1 of every input it read and every output it wrote in
+ops/build/<step>.json. On the next run, up_to_date() re-hashes the same
+files. If nothing moved and the outputs are still the ones recorded, the step
+is a no-op that costs a few milliseconds of hashing. There is one file per step
+rather than a single manifest, so workflows that commit concurrently never
+rebase-conflict on it.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Iterator, Optional
+from atomic_io import write_json
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+BUILD_DIR = os.path.join(REPO_ROOT, "ops", "build")
+MANIFEST_VERSION = 1
+READ_BLOCK = 64 * 1024
+
+
+def _files(paths: Iterable[str]) -> Iterator[str]:
+    """Expand directories (recursively, in sorted order); plain paths pass through even if missing."""
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    yield os.path.join(dirpath, name)
+        else:
+            yield path
+
+
+def file_sha1(path: str) -> str:
+    """sha1 of a file's content, or "" if it does not exist."""
+    h = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(READ_BLOCK), b""):
+                h.update(block)
+    except FileNotFoundError:
+        return ""
+    return h.hexdigest()
+
+
+def fingerprint(paths: Iterable[str], extra: str = "") -> Dict[str, str]:
+    """
+    Hash every file under paths, keyed by repo-relative path.
+
+    Args:
+        paths: Files or directories
+        extra: Non-file input (e.g. the date a report is relative to)
+
+    Returns:
+        {relative path: sha1 or "" if missing}, plus "@extra" when given
+    """
+    out = {os.path.relpath(os.path.abspath(p), REPO_ROOT).replace(os.sep, "/"): file_sha1(p)
+           for p in _files(paths)}
+    if extra:
+        out["@extra"] = extra
+    return out
+
+
+def _entry_path(step: str) -> str:
+    return os.path.join(BUILD_DIR, f"{step}.json")
+
+
+def load_entry(step: str) -> Optional[Dict]:
+    try:
+        with open(_entry_path(step), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get("version") == MANIFEST_VERSION else None
+
+
+def up_to_date(step: str, inputs: Iterable[str], outputs: Iterable[str], extra: str = "") -> bool:
+    """
+    True if the step's inputs hash as last recorded and its outputs are still the ones it wrote.
+
+    Args:
+        step: Step name (one manifest file per step)
+        inputs: Files/directories the step reads, including its own source
+        outputs: Files/directories the step writes
+        extra: Non-file input folded into the input hash
+    """
+    entry = load_entry(step)
+    if entry is None:
+        return False
+    inputs_now = fingerprint(inputs, extra)
+    if entry.get("inputs") != inputs_now:
+        changed = sorted(k for k in set(inputs_now) | set(entry.get("inputs", {}))
+                         if inputs_now.get(k) != entry.get("inputs", {}).get(k))
+        logger.info(f"{step}: inputs changed ({', '.join(changed)})")
+        return False
+    outputs_now = fingerprint(outputs)
+    return all(outputs_now.values()) and entry.get("outputs") == outputs_now
+
+
+def record(step: str, inputs: Iterable[str], outputs: Iterable[str], extra: str = "") -> None:
+    """Store the hashes of a step's inputs and of the outputs it just wrote."""
+    write_json(_entry_path(step), {
+        "version": MANIFEST_VERSION,
+        "inputs": fingerprint(inputs, extra),
+        "outputs": fingerprint(outputs),
+    }, indent=2, sort_keys=True)
@@ -10,15 +10,25 @@ Key upgrades:
 - Tags loader now accepts list/dict/string safely (coerces to list).
 
 Requires env: OPENAI_API_KEY
-Optional: BRAND, SITE_URL, MODEL
+Optional: BRAND, SITE_URL, MODEL, LLM_CACHE_MODE (see response_cache.py)
+
+Run as a script (`python build_rss.py`) or import it and call `run()`;
+importing the module does no file or network I/O.
 """
 
-import os, re, json, hashlib, random
-from datetime import datetime, timezone
-import xml.etree.ElementTree as ET
+import os, re, json, hashlib, random, asyncio, argparse
+from datetime import datetime, timedelta, timezone
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 from logger_config import get_logger
+from atomic_io import atomic_open
 from backup_manager import backup_file
+from response_cache import CacheMiss, get_response_cache
+from bandit_engine import (BANDIT_VERSION, BanditEngine, arm_key, context_from_tag, context_tag, has_number,
+                           split_arm)
+from dup_index import DupGuard, MinHashLSH, jaccard, ngrams, shingle_hash
+from feed_store import FeedStore
+from fingerprint_store import open_store
+from llm_client import get_async_client, get_client, run_async, timed_call, timing_summary
 
 logger = get_logger(__name__)
 
@@ -28,9 +38,13 @@ RULES_PATH  = "ops/rules.json"
 BANDIT_PATH = "ops/bandit.json"
 TAGS_PATH   = "content/tags.json"
 TRENDS_PATH = "content/trends.json"
-FPS_PATH    = "analytics/fingerprints.json"
+FPS_PATH    = "analytics/fingerprints.bin"
+LEGACY_FPS_PATH = "analytics/fingerprints.json"
+LSH_PATH    = "analytics/fingerprints.lsh.json"
 TOPICS_FILE = "content/seeds_topics.txt"
 FEED_FILE   = "rss.xml"
+QUEUE_PATH  = "content/queue.jsonl"
+POST_WORKFLOW = ".github/workflows/post.yml"
 
 # ---------- Branding ----------
 BRAND = os.getenv("BRAND", "Career Forge")
@@ -49,6 +63,16 @@ STYLE_CATALOG = [
     ("data_bite",        "One stat/number, why it matters, and what to do."),
     ("challenge",        "Issue a 24–48h micro-challenge with clear steps.")
 ]
+STYLE_DESCS = dict(STYLE_CATALOG)
+
+# ---------- CTA catalog (closing question shapes the bandit chooses between) ----------
+CTA_CATALOG = [
+    ("question",  "Close with one open, reflective question."),
+    ("challenge", "Close by asking whether the reader will try it in the next 48h."),
+    ("pollish",   "Close with an either/or question answerable in one word."),
+    ("tip",       "Close by asking readers to share their own tip."),
+]
+CTA_DESCS = dict(CTA_CATALOG)
 EMOJI_PALETTE = ["✅","💬","📌","✍️","🚀","🧠","💼","⏱️","📈","🤝","🔎","📣","🗂️","🧩","🎯","⚡","🔥","🌟"]
 
 DIALOGUE_PREFIX_RX = re.compile(r"\b(You|Them|Q|A):\s*", re.I)
@@ -105,6 +129,63 @@ def choose_style(weights):
         if r <= c: return key, desc
     return pool[0][0], pool[0][1]
 
+def draft_context(rules=None, now=None):
+    """
+    context_tag() to choose the arm for a post going out at `now` (default: now).
+
+    The title does not exist yet, so its number feature is predicted from the
+    require_number_in_title rule; the draft is tagged from its title afterwards.
+    """
+    return context_tag(now, bool((rules or {}).get("require_number_in_title", False)))
+
+DAILY_CRON_RE = re.compile(r'cron:\s*"(\d+) (\d+) \* \* \*"')
+
+def publish_slots(count, after=None, path=POST_WORKFLOW):
+    """
+    The next `count` times the post workflow publishes after `after` (default: now).
+
+    Read from its daily "M H * * *" crons (which scripts/optimize_times.py
+    rewrites); without any, one slot a day at `after`'s time of day.
+    """
+    after = (after or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            times = sorted({(int(h), int(m)) for m, h in DAILY_CRON_RE.findall(f.read())})
+    except OSError:
+        times = []
+    if not times:
+        return [after + timedelta(days=i) for i in range(count)]
+    slots, day = [], after.date()
+    while len(slots) < count:
+        for h, m in times:
+            slot = datetime(day.year, day.month, day.day, h, m, tzinfo=timezone.utc)
+            if slot > after and len(slots) < count:
+                slots.append(slot)
+        day += timedelta(days=1)
+    return slots
+
+def choose_arm(band, rules=None, now=None, context=None):
+    """
+    Pick (style_key, style_desc, cta) for the next post.
+
+    A v2 bandit.json picks jointly over style x CTA: by LinUCB for the posting
+    context (hour bucket, weekend, numeric title rule; a context_tag, default
+    draft_context(rules, now)) once it has seen enough posts, by Thompson
+    sampling before that. An older file falls back to the style_weights
+    lottery and leaves the CTA to the model (None).
+    """
+    if band.get("version") != BANDIT_VERSION:
+        key, desc = choose_style(band.get("style_weights", DEFAULT_STYLE_WEIGHTS))
+        return key, desc, None
+    engine = BanditEngine.from_dict(band)
+    x = context_from_tag(context or draft_context(rules, now))
+    style, cta = split_arm(engine.choose([arm_key(s, c) for s, _ in STYLE_CATALOG for c, _ in CTA_CATALOG], x))
+    return style, STYLE_DESCS[style], cta
+
+def with_cta(style_desc, cta):
+    """Style description for the prompt, extended with the sampled CTA's instruction."""
+    return f"{style_desc} {CTA_DESCS[cta]}" if cta in CTA_DESCS else style_desc
+
 def slugify(text, n=60):
     text = re.sub(r"[^\w\s-]", "", (text or "")).strip().lower()
     text = re.sub(r"[\s_-]+", "-", text)
@@ -152,16 +233,8 @@ def sanitize_xline(s: str) -> str:
     s = HASHTAG_RX.sub("", s)
     return s.strip()
 
-def ngrams(text, n=5):
-    toks = re.findall(r"[a-z0-9]+", (text or "").lower())
-    return {" ".join(toks[i:i+n]) for i in range(0, max(0, len(toks)-n+1))}
-
-def jaccard(a, b):
-    if not a or not b: return 0.0
-    inter = len(a & b); uni = len(a | b)
-    return inter / uni if uni else 0.0
-
 def dup_guard_ok(title, fps, n, thr):
+    """Exact linear-scan dup check (reference for DupGuard, which uses an LSH index)."""
     probe = ngrams(title, n)
     for fp in fps:
         if jaccard(probe, set(fp.get("ngrams", []))) >= thr:
@@ -249,17 +322,15 @@ def quality_gate(x_line: str, rules: dict) -> tuple[bool, str]:
     return True, ""
 
 # ---- OpenAI call ----
-@retry(
-    wait=wait_exponential(multiplier=1, min=4, max=60),
-    stop=stop_after_attempt(3),
-    retry=retry_if_exception_type((ConnectionError, TimeoutError)),
-    reraise=True
-)
-def call_openai(topic, style_key, style_desc, model, rules, pass_hint=""):
+MODEL_FALLBACKS = ["gpt-4o", "gpt-4o-mini"]
+DEFAULT_TEMPERATURE = 0.6
+
+def build_prompts(topic, style_key, style_desc, rules, pass_hint=""):
     """
+    Build the (system, user) prompt pair for one generation request.
+
     pass_hint: extra constraints for retries (plain text bullets).
     """
-    payload = None
     sys = (
         "You are a top-tier career coach and ex-recruiter. "
         "You write concise, concrete, **second-person** advice. "
@@ -296,101 +367,143 @@ OUTPUT RULES
 
 {pass_hint}
 """
-    # Validate API key
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        logger.error("OPENAI_API_KEY environment variable is not set")
-        raise ValueError("OPENAI_API_KEY environment variable is required")
+    return sys, user
+
+def model_attempts(model):
+    return [model or "gpt-4o"] + MODEL_FALLBACKS
+
+def parse_payload(txt, mdl):
+    """Extract the JSON object from a model reply; None if there is none."""
+    txt = (txt or "").strip()
+    start, end = txt.find("{"), txt.rfind("}")
+    if start == -1 or end == -1:
+        logger.warning(f"Model {mdl} returned non-JSON response")
+        return None
+    try:
+        return json.loads(txt[start:end+1]) or None
+    except json.JSONDecodeError as e:
+        logger.warning(f"Model {mdl} returned invalid JSON: {e}")
+        return None
+
+def fallback_payload(style_key, cta=None):
+    """Safe default content that passes quality gates, tagged with the requested arm."""
+    logger.warning("All OpenAI attempts failed, using safe fallback content")
+    return {
+        "style": style_key, "cta_type": cta or "question",
+        "x_line": 'Your update pitch, coach-style: Use: "I improved X% by doing Y so Z happened." Keep it tight. ✅📌',
+        "desc_title": "Refresh your pitch ✍️",
+        "desc_points": ["Lead with outcome 📈","Name the lever ⚙️","Give brief scope 🧠","Close with value ✅"],
+        "desc_cta": "What part of your pitch feels weakest now?",
+        "tags": ["resume","jobsearch"]
+    }
+
+def cached_payload(model, sys, user, temperature):
+    """
+    Serve a request from the response cache, trying each fallback model's key.
+
+    Returns None on a miss; in replay mode a miss raises CacheMiss instead of
+    letting the caller reach the network.
+    """
+    cache = get_response_cache()
+    if not cache.enabled:
+        return None
+    for mdl in model_attempts(model):
+        hit = cache.get(cache.key(mdl, sys, user, temperature))
+        payload = parse_payload(hit, mdl) if hit is not None else None
+        if payload:
+            logger.info(f"Serving {mdl} response from cache")
+            return payload
+    if cache.mode == "replay":
+        raise CacheMiss(f"No cached response for model {model} (replay mode)")
+    return None
 
+@retry(
+    wait=wait_exponential(multiplier=1, min=4, max=60),
+    stop=stop_after_attempt(3),
+    retry=retry_if_exception_type((ConnectionError, TimeoutError)),
+    reraise=True
+)
+def call_openai(topic, style_key, style_desc, model, rules, pass_hint="", temperature=DEFAULT_TEMPERATURE, cta=None):
+    """
+    pass_hint: extra constraints for retries (plain text bullets).
+    cta: the sampled CTA style_desc asks for, recorded on the fallback payload.
+    """
+    sys, user = build_prompts(topic, style_key, style_desc, rules, pass_hint)
+    payload = cached_payload(model, sys, user, temperature)
+    if payload:
+        return payload
+    cache = get_response_cache()
     try:
-        from openai import OpenAI
+        # one pooled client per process, shared by every attempt and fallback model
+        client = get_client()
+    except ImportError as e:
+        logger.error(f"Failed to import OpenAI library: {e}")
+        raise
 
-        # Initialize client with explicit parameters to avoid environment variable conflicts
-        # GitHub Actions may set proxy vars that the old client doesn't support
+    for mdl in model_attempts(model):
         try:
-            client = OpenAI(
-                api_key=api_key,
-                timeout=30.0,
-                max_retries=0
-            )
-        except TypeError as e:
-            # Fallback for older OpenAI library versions or environment conflicts
-            logger.warning(f"Standard client init failed ({e}), trying minimal init")
-            client = OpenAI(api_key=api_key)
-
-        attempts = [model or "gpt-4o", "gpt-4o", "gpt-4o-mini"]
-
-        for mdl in attempts:
-            try:
-                logger.info(f"Attempting content generation with model: {mdl}")
+            logger.info(f"Attempting content generation with model: {mdl}")
+            with timed_call(mdl):
                 resp = client.chat.completions.create(
-                    model=mdl, temperature=0.6,
+                    model=mdl, temperature=temperature,
                     messages=[{"role":"system","content":sys},{"role":"user","content":user}]
                 )
-                txt = (resp.choices[0].message.content or "").strip()
-                start, end = txt.find("{"), txt.rfind("}")
-                if start == -1 or end == -1:
-                    logger.warning(f"Model {mdl} returned non-JSON response")
-                    continue
-                payload = json.loads(txt[start:end+1])
-                if payload:
-                    logger.info(f"Successfully generated content with model: {mdl}")
-                    break
-            except json.JSONDecodeError as e:
-                logger.warning(f"Model {mdl} returned invalid JSON: {e}")
-            except Exception as e:
-                logger.warning(f"Model {mdl} failed: {e}")
-    except ImportError as e:
-        logger.error(f"Failed to import OpenAI library: {e}")
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error in OpenAI call: {e}")
-        raise
+            txt = resp.choices[0].message.content
+            payload = parse_payload(txt, mdl)
+            if payload:
+                logger.info(f"Successfully generated content with model: {mdl}")
+                cache.put(cache.key(mdl, sys, user, temperature), mdl, sys, user, temperature, txt)
+                break
+        except Exception as e:
+            logger.warning(f"Model {mdl} failed: {e}")
+
+    return payload or fallback_payload(style_key, cta)
+
+async def call_openai_async(client, topic, style_key, style_desc, model, rules, pass_hint="", temperature=DEFAULT_TEMPERATURE,
+                            cta=None):
+    """
+    Async twin of call_openai() for concurrent candidates.
 
-    # Fallback payload - safe default content that passes quality gates
-    if not payload:
-        logger.warning("All OpenAI attempts failed, using safe fallback content")
-        payload = {
-            "style": style_key, "cta_type": "question",
-            "x_line": 'Your update pitch, coach-style: Use: "I improved X% by doing Y so Z happened." Keep it tight. ✅📌',
-            "desc_title": "Refresh your pitch ✍️",
-            "desc_points": ["Lead with outcome 📈","Name the lever ⚙️","Give brief scope 🧠","Close with value ✅"],
-            "desc_cta": "What part of your pitch feels weakest now?",
-            "tags": ["resume","jobsearch"]
-        }
-    return payload
-
-# ---- Feed scaffold ----
-def ensure_feed_scaffold():
-    if not os.path.exists(FEED_FILE):
-        rss = ET.Element("rss", attrib={"version":"2.0"})
-        ch = ET.SubElement(rss,"channel")
-        ET.SubElement(ch,"title").text = CHANNEL_TITLE
-        ET.SubElement(ch,"link").text = SITE_URL
-        ET.SubElement(ch,"description").text = CHANNEL_DESC
-        ET.SubElement(ch,"language").text = CHANNEL_LANG
-        now = rss_now()
-        ET.SubElement(ch,"lastBuildDate").text = now
-        ET.SubElement(ch,"pubDate").text = now
-        ET.ElementTree(rss).write(FEED_FILE, encoding="utf-8", xml_declaration=True)
-    tree = ET.parse(FEED_FILE)
-    root = tree.getroot(); ch = root.find("channel") or ET.SubElement(root,"channel")
-    def ensure(tag, text=None):
-        node = ch.find(tag)
-        if node is None: node = ET.SubElement(ch, tag)
-        if text is not None and (node.text or "").strip() == "": node.text = text
-        return node
-    ensure("title", CHANNEL_TITLE); ensure("link", SITE_URL)
-    ensure("description", CHANNEL_DESC); ensure("language", CHANNEL_LANG)
-    ensure("lastBuildDate", rss_now()); ensure("pubDate", rss_now())
-    tree.write(FEED_FILE, encoding="utf-8", xml_declaration=True)
-    return tree
+    client: the shared AsyncOpenAI instance from llm_client.get_async_client().
+    """
+    sys, user = build_prompts(topic, style_key, style_desc, rules, pass_hint)
+    payload = cached_payload(model, sys, user, temperature)
+    if payload:
+        return payload
+    cache = get_response_cache()
+    for mdl in model_attempts(model):
+        try:
+            with timed_call(mdl):
+                resp = await client.chat.completions.create(
+                    model=mdl, temperature=temperature,
+                    messages=[{"role":"system","content":sys},{"role":"user","content":user}]
+                )
+            txt = resp.choices[0].message.content
+            payload = parse_payload(txt, mdl)
+            if payload:
+                cache.put(cache.key(mdl, sys, user, temperature), mdl, sys, user, temperature, txt)
+                return payload
+        except Exception as e:
+            logger.warning(f"Model {mdl} failed: {e}")
+    return fallback_payload(style_key, cta)
+
+# ---- Feed store ----
+def open_feed_store():
+    """Item log behind rss.xml; the first call migrates an existing rss.xml into it."""
+    return FeedStore().ensure(FEED_FILE, defaults={
+        "title": CHANNEL_TITLE, "link": SITE_URL,
+        "description": CHANNEL_DESC, "language": CHANNEL_LANG,
+    })
 
 # ---- Build item ----
-def make_item(payload, rules):
-    style_key = (payload.get("style") or "").strip().lower() or "unspecified"
-    cta_type  = (payload.get("cta_type") or "").strip().lower() or "question"
+def item_style(payload):
+    return (payload.get("style") or "").strip().lower() or "unspecified"
+
+def item_cta(payload):
+    return (payload.get("cta_type") or "").strip().lower() or "question"
 
+def final_xline(payload, rules):
+    """The title make_item() publishes for this payload."""
     x_line = sanitize_xline((payload.get("x_line") or "").strip())
     # emojis
     x_line = add_minimum_emojis(x_line, need_min=rules.get("min_emojis",2))
@@ -399,6 +512,19 @@ def make_item(payload, rules):
         x_line = x_line + " 📈"
     if len(x_line) > 230:
         x_line = x_line[:229].rsplit(" ", 1)[0] + "…"
+    return x_line
+
+def make_item(payload, rules, x_line=None):
+    """
+    Build the feed-log record for a payload.
+
+    x_line: an already finalized title (e.g. from the queue); computed from
+    the payload when omitted.
+    """
+    style_key = item_style(payload)
+    cta_type  = item_cta(payload)
+    if x_line is None:
+        x_line = final_xline(payload, rules)
 
     hook   = (payload.get("desc_title") or "").strip()
     points = [p.strip(" •-") for p in (payload.get("desc_points") or []) if str(p).strip()]
@@ -426,115 +552,427 @@ def make_item(payload, rules):
     guid = hashlib.sha1(base.encode("utf-8")).hexdigest()
     link = f"{SITE_URL}?p={guid}"
 
-    item = ET.Element("item")
-    ET.SubElement(item,"title").text = x_line
-    ET.SubElement(item,"description").text = description
-    ET.SubElement(item,"link").text = link
-    ET.SubElement(item,"guid", attrib={"isPermaLink":"false"}).text = guid
-    ET.SubElement(item,"pubDate").text = rss_now()
-    ET.SubElement(item,"category", attrib={"domain":"style"}).text = style_key
-    ET.SubElement(item,"category", attrib={"domain":"cta"}).text = cta_type
+    item = {
+        "title": x_line, "description": description, "link": link, "guid": guid,
+        "pubDate": rss_now(), "categories": [["style", style_key], ["cta", cta_type]],
+    }
+    if payload.get("context"):
+        item["categories"].append(["context", payload["context"]])
     return item, guid, x_line
 
-def prepend_item(tree, item):
-    ch = tree.getroot().find("channel") or ET.SubElement(tree.getroot(),"channel")
-    items = ch.findall("item")
-    if items: ch.insert(list(ch).index(items[0]), item)
-    else: ch.append(item)
-    for tag in ("lastBuildDate","pubDate"):
-        node = ch.find(tag) or ET.SubElement(ch, tag)
-        node.text = rss_now()
-    tree.write(FEED_FILE, encoding="utf-8", xml_declaration=True)
-
-# ---------- Main ----------
-cfg   = load_json(CONFIG_PATH, {})
-rules = load_json(RULES_PATH, {})
-band  = load_json(BANDIT_PATH, {})
-if cfg.get("paused"):
-    print("Paused by ops/config.json"); raise SystemExit(0)
-
-topics = read_topics(TOPICS_FILE)
-random.seed(int(datetime.now(timezone.utc).strftime("%Y%m%d%H")))
-model  = os.getenv("MODEL") or cfg.get("model") or "gpt-4o"
-
-style_weights = band.get("style_weights", {
+# ---------- Pipeline ----------
+DEFAULT_STYLE_WEIGHTS = {
     "coach_tip":1.4, "recruiter_inside":1.3, "checklist":1.1, "mistake_fix":1.1,
     "template_drop":1.0, "data_bite":0.9, "challenge":0.8
-})
-style_key, style_desc = choose_style(style_weights)
-cta_bias = band.get("cta_weights", {})
-
-topic = random.choice(topics)
+}
+DEFAULT_DUP_GUARD = {"enabled":True,"ngram":5,"threshold":0.8,"history_size":200}
+DEFAULT_FEED_RETENTION = {"max_items":200,"max_days":0}
 
 # Generate with up to 3 attempts, tightening constraints if the quality gate fails
-attempt_notes = [
+ATTEMPT_NOTES = [
     "",
     "REVISION: Fix any tense conflict; keep second-person; if using a template, prefix 'Use:' then quote the line.",
     "REVISION: Remove any first-person narration; only quote first-person inside 'Use: “...”'; add a concrete number or example if helpful."
 ]
-payload = None
-xline = ""; ok=False; reason=""
+REROLL_NOTE = "REVISION: ensure second-person; avoid first-person narration; no tense conflicts."
 
-for attempt_num, note in enumerate(attempt_notes, 1):
-    logger.info(f"Quality gate attempt {attempt_num}/{len(attempt_notes)}")
-    try:
-        p = call_openai(topic, style_key, style_desc, model, rules, pass_hint=note)
-        # assemble to see x_line and test
-        candidate = sanitize_xline((p.get("x_line") or "").strip())
-        candidate = add_minimum_emojis(candidate, need_min=rules.get("min_emojis",2))
-        if len(candidate) > 230:
-            candidate = candidate[:229].rsplit(" ", 1)[0] + "..."
-        original_candidate = candidate
-        candidate = enforce_second_person_line(candidate)
-        if candidate != original_candidate:
-            logger.debug("Auto-inserted second-person phrasing into X line to satisfy quality gate.")
-        ok, reason = quality_gate(candidate, rules)
-        if ok:
-            logger.info(f"Quality gate passed on attempt {attempt_num}")
-            payload = p; xline = candidate; break
-        else:
+def load_settings():
+    """
+    Load the ops config, quality rules and bandit weights from disk.
+
+    Returns:
+        Tuple of (config, rules, bandit) dicts
+    """
+    return load_json(CONFIG_PATH, {}), load_json(RULES_PATH, {}), load_json(BANDIT_PATH, {})
+
+def prepare_xline(payload, rules):
+    """Sanitize a payload's x_line the same way the quality gate sees it."""
+    candidate = sanitize_xline((payload.get("x_line") or "").strip())
+    candidate = add_minimum_emojis(candidate, need_min=rules.get("min_emojis",2))
+    if len(candidate) > 230:
+        candidate = candidate[:229].rsplit(" ", 1)[0] + "..."
+    original_candidate = candidate
+    candidate = enforce_second_person_line(candidate)
+    if candidate != original_candidate:
+        logger.debug("Auto-inserted second-person phrasing into X line to satisfy quality gate.")
+    return candidate
+
+def generate_payload(topic, style_key, style_desc, model, rules, notes=ATTEMPT_NOTES, cta=None):
+    """
+    Call the model until a draft passes the quality gate.
+
+    Returns:
+        Tuple of (payload, x_line), or (None, "") if every attempt failed
+    """
+    for attempt_num, note in enumerate(notes, 1):
+        logger.info(f"Quality gate attempt {attempt_num}/{len(notes)}")
+        try:
+            p = call_openai(topic, style_key, style_desc, model, rules, pass_hint=note, cta=cta)
+            candidate = prepare_xline(p, rules)
+            ok, reason = quality_gate(candidate, rules)
+            if ok:
+                logger.info(f"Quality gate passed on attempt {attempt_num}")
+                return p, candidate
             logger.warning(f"Quality gate failed on attempt {attempt_num}: {reason}")
-    except Exception as e:
-        logger.error(f"Attempt {attempt_num} raised exception: {e}")
+        except Exception as e:
+            logger.error(f"Attempt {attempt_num} raised exception: {e}")
+    return None, ""
 
-if not payload:
-    # CRITICAL: Do not publish content that failed all quality gates
-    # Instead, skip this run and let the next scheduled run try again
-    logger.error("All quality gate attempts failed. Skipping content generation for this run.")
-    logger.info("The next scheduled run will attempt content generation again.")
-    raise SystemExit(1)
+# ---- Best-of-N generation ----
+CANDIDATE_TEMPERATURES = [0.6, 0.8, 0.4, 0.9, 0.7]
 
-logger.info(f"Selected topic: {topic}, style: {style_key}")
+def plan_candidates(n, style_key, style_desc, style_weights, cta=None):
+    """
+    Spread N candidate requests across styles, revision notes and temperatures.
 
-# Backup existing feed before modification
-backup_file(FEED_FILE, keep_count=30)
+    Even slots keep the bandit's chosen style; odd slots reroll it the same way
+    the dup-guard does, so a stale style cannot sink every candidate. Every slot
+    keeps the sampled CTA's instruction.
+    """
+    plan = []
+    for i in range(n):
+        if i % 2:
+            alt_weights = {k:(1.0 if k!=style_key else 0.35) for k in style_weights} or {"checklist":1.0,"coach_tip":1.2}
+            key, desc = choose_style(alt_weights)
+            desc = with_cta(desc, cta)
+        else:
+            key, desc = style_key, style_desc
+        note = ATTEMPT_NOTES[i % len(ATTEMPT_NOTES)]
+        temperature = CANDIDATE_TEMPERATURES[i % len(CANDIDATE_TEMPERATURES)]
+        plan.append((key, desc, note, temperature))
+    return plan
+
+async def gather_candidates(plan, topic, model, rules, cta=None):
+    """Send every planned request at once over the shared async client."""
+    # replay mode never reaches the network, so it needs no real key
+    replay = get_response_cache().mode == "replay"
+    client = get_async_client(api_key="replay-only" if replay and not os.getenv("OPENAI_API_KEY") else None)
+    return await asyncio.gather(
+        *(call_openai_async(client, topic, key, desc, model, rules, pass_hint=note, temperature=temp, cta=cta)
+          for key, desc, note, temp in plan),
+        return_exceptions=True
+    )
 
-tree = ensure_feed_scaffold()
-item, guid, title = make_item(payload, rules)
+def generate_best_of_n(topic, style_key, style_desc, style_weights, model, rules, guard, dg, n, cta=None):
+    """
+    Generate N candidates concurrently and keep the best passing one.
 
-# duplicate guard
-fps = load_json(FPS_PATH, [])
-dg = cfg.get("dup_guard", {"enabled":True,"ngram":5,"threshold":0.8,"history_size":200})
-if dg.get("enabled", True):
-    if not dup_guard_ok(title, fps, dg.get("ngram",5), dg.get("threshold",0.8)):
-        # reroll style weights a bit
-        alt_weights = {k:(1.0 if k!=style_key else 0.35) for k in style_weights} or {"checklist":1.0,"coach_tip":1.2}
-        alt_style, alt_desc = choose_style(alt_weights)
-        p2 = call_openai(topic, alt_style, alt_desc, model, rules, pass_hint="REVISION: ensure second-person; avoid first-person narration; no tense conflicts.")
-        item2, guid2, title2 = make_item(p2, rules)
-        if dup_guard_ok(title2, fps, dg.get("ngram",5), dg.get("threshold",0.8)):
-            item, guid, title = item2, guid2, title2
+    Candidates must pass the quality gate; among those, ones whose published
+    title (final_xline) also passes the dup guard win, and ties go to the least
+    similar, then the earliest planned. If every candidate is a duplicate, the
+    least similar is returned and the caller's dup reroll takes over.
 
-prepend_item(tree, item)
+    Returns:
+        Tuple of (payload, title, style_key), or (None, "", style_key)
+    """
+    plan = plan_candidates(n, style_key, style_desc, style_weights, cta)
+    logger.info(f"Requesting {len(plan)} candidates concurrently")
+    results = run_async(gather_candidates(plan, topic, model, rules, cta))
+    thr = dg.get("threshold",0.8)
+    best = None
+    for idx, ((key, _desc, _note, temp), res) in enumerate(zip(plan, results)):
+        if isinstance(res, BaseException):
+            logger.error(f"Candidate {idx+1} raised exception: {res}")
+            continue
+        candidate = prepare_xline(res, rules)
+        ok, reason = quality_gate(candidate, rules)
+        if not ok:
+            logger.warning(f"Candidate {idx+1} ({key}, t={temp}) failed quality gate: {reason}")
+            continue
+        title = final_xline(res, rules)
+        sim = guard.max_similarity(title) if dg.get("enabled", True) else 0.0
+        rank = (sim >= thr, sim, idx)
+        logger.info(f"Candidate {idx+1} ({key}, t={temp}) passed; similarity={sim:.2f}")
+        if best is None or rank < best[0]:
+            best = (rank, res, title, key)
+    if best is None:
+        return None, "", style_key
+    return best[1], best[2], best[3]
+
+def open_fingerprints(dg):
+    """Open the binary fingerprint store, migrating the legacy JSON on first use."""
+    return open_store(FPS_PATH, legacy_json=LEGACY_FPS_PATH, ngram=int(dg.get("ngram",5)))
+
+def save_fingerprints(guard, guid, title, dg):
+    """Append the published title's shingle hashes, compact old history and update the LSH index."""
+    store = guard.store
+    history_size = int(dg.get("history_size",200))
+    store.append(guid, (shingle_hash(g) for g in ngrams(title, dg.get("ngram",5))))
+    # appends are O(1); rewrite the file only once the dead prefix outgrows the window
+    if len(store) > 2 * history_size:
+        store.compact(history_size)
+    guard.sync()
+    guard.save(LSH_PATH)
+
+def load_dup_guard(store, dg):
+    """DupGuard over the stored history window, reusing the persisted LSH index."""
+    lsh = dg.get("lsh", {})
+    index = MinHashLSH.load(LSH_PATH, num_perm=int(lsh.get("num_perm", 128)), bands=int(lsh.get("bands", 32)))
+    return DupGuard(store, n=dg.get("ngram",5), threshold=dg.get("threshold",0.8),
+                    index=index, history_size=int(dg.get("history_size",200)))
+
+def resolve_settings(cfg, rules, band):
+    """Fill in whichever of config/rules/bandit the caller did not pass."""
+    if cfg is None or rules is None or band is None:
+        disk_cfg, disk_rules, disk_band = load_settings()
+        cfg = disk_cfg if cfg is None else cfg
+        rules = disk_rules if rules is None else rules
+        band = disk_band if band is None else band
+    return cfg, rules, band
+
+def draft_post(cfg, rules, band, guard, model=None, candidates=None, now=None):
+    """
+    Pick a topic and style and produce one vetted draft without touching the feed.
 
-# save fingerprint
-probe = list(ngrams(title, dg.get("ngram",5)))
-fps = (fps + [{"guid":guid, "ngrams":probe}])[-int(dg.get("history_size",200)):]
-os.makedirs("analytics", exist_ok=True)
-with open(FPS_PATH, "w", encoding="utf-8") as f:
-    json.dump(fps, f, ensure_ascii=False, indent=2)
+    guard: DupGuard over fingerprints the draft must not duplicate (history
+    plus anything already drafted in this process).
+    now: when the post will go out (default: now); queued drafts pass their
+    publish slot so the arm is chosen for the context they are published in.
 
-print("Generated:", title)
+    Returns:
+        Dict with payload, title, topic, style, cta and the context_tag the arm
+        was chosen for, or None if no draft passed the quality gate
+    """
+    topics = read_topics(TOPICS_FILE)
+    model = model or os.getenv("MODEL") or cfg.get("model") or "gpt-4o"
+    candidates = int(candidates or cfg.get("generation", {}).get("candidates", 1))
+    dg = cfg.get("dup_guard", DEFAULT_DUP_GUARD)
+
+    style_weights = band.get("style_weights", DEFAULT_STYLE_WEIGHTS)
+    style_key, style_desc, cta = choose_arm(band, rules, now=now)
+    style_desc = with_cta(style_desc, cta)
+    topic = random.choice(topics)
+
+    if candidates > 1:
+        payload, xline, style_key = generate_best_of_n(
+            topic, style_key, style_desc, style_weights, model, rules, guard, dg, candidates, cta
+        )
+    else:
+        payload, xline = generate_payload(topic, style_key, style_desc, model, rules, cta=cta)
+    if not payload:
+        return None
+    title = final_xline(payload, rules)
+
+    # duplicate guard; best-of-N only returns a duplicate when every candidate was one
+    if dg.get("enabled", True):
+        if not guard.ok(title):
+            # reroll style weights a bit
+            alt_weights = {k:(1.0 if k!=style_key else 0.35) for k in style_weights} or {"checklist":1.0,"coach_tip":1.2}
+            alt_style, alt_desc = choose_style(alt_weights)
+            p2 = call_openai(topic, alt_style, with_cta(alt_desc, cta), model, rules, pass_hint=REROLL_NOTE, cta=cta)
+            title2 = final_xline(p2, rules)
+            if guard.ok(title2):
+                payload, title, style_key = p2, title2, alt_style
+
+    # credit the arm the prompt asked for (the model's own labels are not requested and
+    # mostly missing); a reroll keeps the sampled CTA, so only the style can differ
+    payload["style"] = style_key
+    if cta:
+        payload["cta_type"] = cta
+    # stored with the draft (and queued with it), so the post is credited under this context;
+    # the number feature is read from the title, as update_bandit does for untagged posts
+    context = context_tag(now, has_number(title))
+    payload["context"] = context
+    logger.info(f"Selected topic: {topic}, style: {style_key}, cta: {item_cta(payload)}")
+    return {"payload": payload, "title": title, "topic": topic,
+            "style": item_style(payload), "cta": item_cta(payload), "context": context}
+
+def publish_draft(draft, rules, dg, guard, feed_cfg=None):
+    """Append a vetted draft to the feed log, re-render rss.xml and record its fingerprint."""
+    store = open_feed_store()
+    # rss.xml is rendered from the log, so the log (and channel) is what a rollback restores
+    backup_file(store.items_path, keep_count=30)
+    backup_file(store.channel_path, keep_count=30)
+
+    item, guid, title = make_item(draft["payload"], rules, x_line=draft["title"])
+    store.append(item)
+    feed_cfg = feed_cfg or DEFAULT_FEED_RETENTION
+    store.render(FEED_FILE, max_items=int(feed_cfg.get("max_items", 0)),
+                 max_days=float(feed_cfg.get("max_days", 0)))
+    save_fingerprints(guard, guid, title, dg)
+    return {"status": "published", "guid": guid, "title": title,
+            "topic": draft.get("topic"), "style": draft.get("style")}
+
+def run(cfg=None, rules=None, band=None, model=None, candidates=None):
+    """
+    Generate one post and publish it to the feed.
 
-print("Generated:", title)
+    Settings that are not passed in are loaded from disk, so a long-lived
+    process can call this repeatedly with its own config. With candidates > 1
+    (or generation.candidates in the config) drafts are requested concurrently
+    and the best one is kept instead of retrying one at a time.
 
+    Returns:
+        Dict with a "status" of "published", "paused" or "failed"; published
+        runs also carry guid, title, topic and style.
+    """
+    cfg, rules, band = resolve_settings(cfg, rules, band)
+    if cfg.get("paused"):
+        logger.info("Paused by ops/config.json")
+        return {"status": "paused"}
+
+    random.seed(int(datetime.now(timezone.utc).strftime("%Y%m%d%H")))
+    dg = cfg.get("dup_guard", DEFAULT_DUP_GUARD)
+    guard = add_queued(load_dup_guard(open_fingerprints(dg), dg), load_queue())
+
+    draft = draft_post(cfg, rules, band, guard, model=model, candidates=candidates)
+    if not draft:
+        # CRITICAL: Do not publish content that failed all quality gates
+        # Instead, skip this run and let the next scheduled run try again
+        logger.error("All quality gate attempts failed. Skipping content generation for this run.")
+        logger.info("The next scheduled run will attempt content generation again.")
+        return {"status": "failed", "reason": "quality gate"}
+
+    return publish_draft(draft, rules, dg, guard, cfg.get("feed"))
+
+# ---------- Queue ----------
+def load_queue(path=QUEUE_PATH):
+    """Read queued drafts, oldest first."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(ln) for ln in f if ln.strip()]
+
+def add_queued(guard, queue):
+    """Let the dup guard see drafts that are queued but not yet published."""
+    for i, rec in enumerate(queue):
+        guard.add(f"queued-{i}", rec.get("ngrams", []))
+    return guard
+
+def write_queue(records, path=QUEUE_PATH):
+    with atomic_open(path) as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+def run_batch(n, cfg=None, rules=None, band=None, model=None, candidates=None):
+    """
+    Draft N vetted posts in one process and append them to the queue.
+
+    Each draft is checked by the dup guard against published history, the
+    drafts already waiting in the queue and the earlier drafts of this batch,
+    and its arm is chosen for the publish slot it will take (publish_slots()
+    after the drafts already queued).
+
+    Returns:
+        Dict with a "status" of "queued", "paused" or "failed", plus the
+        number of drafts added and the resulting queue size
+    """
+    cfg, rules, band = resolve_settings(cfg, rules, band)
+    if cfg.get("paused"):
+        logger.info("Paused by ops/config.json")
+        return {"status": "paused"}
+
+    random.seed(int(datetime.now(timezone.utc).strftime("%Y%m%d%H")))
+    dg = cfg.get("dup_guard", DEFAULT_DUP_GUARD)
+    queue = load_queue()
+    guard = add_queued(load_dup_guard(open_fingerprints(dg), dg), queue)
+
+    slots = publish_slots(len(queue) + n)[len(queue):]
+    added = []
+    for i in range(n):
+        logger.info(f"Batch draft {i+1}/{n}")
+        draft = draft_post(cfg, rules, band, guard, model=model, candidates=candidates, now=slots[len(added)])
+        if not draft:
+            logger.warning(f"Batch draft {i+1} failed all quality gates; skipping")
+            continue
+        # unlike a live post, a batch can afford to drop a draft that is still a near-duplicate
+        if dg.get("enabled", True) and not guard.ok(draft["title"]):
+            logger.warning(f"Batch draft {i+1} duplicates history or the batch; skipping")
+            continue
+        probe = sorted(ngrams(draft["title"], dg.get("ngram",5)))
+        guard.add(f"batch-{i}", probe)
+        added.append({
+            "queued_at": datetime.now(timezone.utc).isoformat(),
+            "topic": draft["topic"], "style": draft["style"], "cta": draft["cta"], "context": draft["context"],
+            "title": draft["title"], "ngrams": probe, "payload": draft["payload"],
+        })
+
+    if not added:
+        return {"status": "failed", "reason": "quality gate", "added": 0, "queue_size": len(queue)}
+    write_queue(queue + added)
+    logger.info(f"Queued {len(added)} drafts ({len(queue) + len(added)} waiting)")
+    return {"status": "queued", "added": len(added), "queue_size": len(queue) + len(added)}
+
+def publish_next_queued(cfg=None, rules=None):
+    """
+    Publish the oldest queued draft without calling the model.
+
+    The draft is popped and the queue persisted before publishing, so a crash
+    or failed push afterwards cannot publish the same draft twice; if the
+    publish itself raises, the draft is put back.
+
+    Returns:
+        The publish result dict, {"status": "empty"} if nothing is queued,
+        or {"status": "paused"}
+    """
+    if cfg is None:
+        cfg = load_json(CONFIG_PATH, {})
+    if rules is None:
+        rules = load_json(RULES_PATH, {})
+    if cfg.get("paused"):
+        logger.info("Paused by ops/config.json")
+        return {"status": "paused"}
+
+    queue = load_queue()
+    if not queue:
+        return {"status": "empty"}
+    draft, rest = queue[0], queue[1:]
+    write_queue(rest)
+    dg = cfg.get("dup_guard", DEFAULT_DUP_GUARD)
+    try:
+        result = publish_draft(draft, rules, dg, load_dup_guard(open_fingerprints(dg), dg), cfg.get("feed"))
+    except Exception:
+        write_queue(queue)
+        raise
+    logger.info(f"Published queued draft ({len(rest)} left in queue)")
+    return result
+
+def log_call_timings():
+    summary = timing_summary()
+    if summary["calls"]:
+        logger.info(
+            f"Model calls: {summary['calls']} ({summary['new_connections']} new connections); "
+            f"connect={summary['connect_ms']}ms ttfb={summary['ttfb_ms']}ms total={summary['total_ms']}ms"
+        )
+
+def positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return n
+
+def main(argv=None):
+    """CLI entry point: run the pipeline once and map the outcome to an exit code."""
+    ap = argparse.ArgumentParser(description="Generate and publish Career Forge posts.")
+    ap.add_argument("--candidates", type=int, default=None,
+                    help="request N drafts concurrently and keep the best (default: config, else 1)")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--batch", type=positive_int, metavar="N",
+                      help=f"draft N vetted posts into {QUEUE_PATH} instead of publishing")
+    mode.add_argument("--from-queue", action="store_true",
+                      help="publish the next queued draft; generate live if the queue is empty")
+    args = ap.parse_args(argv)
+
+    if args.batch is not None:
+        result = run_batch(args.batch, candidates=args.candidates)
+        log_call_timings()
+        if result["status"] == "queued":
+            print(f"Queued {result['added']} posts ({result['queue_size']} waiting)")
+        return 1 if result["status"] == "failed" else 0
+
+    result = publish_next_queued() if args.from_queue else None
+    if result is None or result["status"] == "empty":
+        if result is not None:
+            logger.info("Queue empty; generating live")
+        result = run(candidates=args.candidates)
+    log_call_timings()
+    if result["status"] == "paused":
+        print("Paused by ops/config.json")
+        return 0
+    if result["status"] != "published":
+        return 1
+    print("Generated:", result["title"])
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Single-command runner for the post and analytics pipelines.
+
+The stages form a small DAG. A stage starts as soon as the selected stages it
+comes after have finished, and independent stages run in parallel. Each stage
+is the entry point the workflows used to launch as its own interpreter. The
+selected modules are imported once up front, then every stage runs in its own
+forked worker process: it starts with those imports already loaded, but has its
+own cwd, global `random` state and module globals, so parallel stages cannot
+reseed or chdir under each other. Stages hand off only through the files they
+write. A per-stage timing report is printed at the end.
+
+There is no separate normalize stage: items are normalized when they enter the
+feed log (feed_store.normalize_record), so "generate" already writes a
+normalized rss.xml for "fanout" and "analytics" to read.
+
+Run from the repository root:
+
+    python cf.py post               # generate (next queued draft) -> social feeds
+    python cf.py analytics          # analytics -> bandit | carousel | cron, in parallel
+    python cf.py all --jobs 4       # both, with fan-out running alongside analytics
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import connection
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(ROOT, "scripts")
+DEFAULT_JOBS = 4
+
+
+class Stage(NamedTuple):
+    name: str
+    module: str                     # imported from the repo root or scripts/
+    argv: Optional[List[str]]       # None: the module's main() takes no arguments
+    after: Tuple[str, ...] = ()     # ordering among the stages selected for a run
+    optional: bool = False          # a failure is reported but does not fail the run
+
+
+STAGES: Dict[str, Stage] = {s.name: s for s in [
+    Stage("generate", "build_rss", ["--from-queue"]),
+    Stage("fanout", "social_feeds", [], after=("generate",)),
+    Stage("analytics", "build_analytics", [], after=("generate",)),
+    Stage("bandit", "update_bandit", None, after=("analytics",)),
+    Stage("carousel", "make_carousel", None, after=("analytics",), optional=True),
+    Stage("cron", "suggest_cron", None, after=("analytics",)),
+]}
+
+GROUPS: Dict[str, List[str]] = {
+    "post": ["generate", "fanout"],
+    "analytics": ["analytics", "bandit", "carousel", "cron"],
+    "all": list(STAGES),
+}
+
+
+def run_stage(stage: Stage) -> Tuple[str, float]:
+    """
+    Import a stage's module and call its main().
+
+    Returns:
+        ("ok" | "failed", seconds)
+    """
+    start = time.perf_counter()
+    try:
+        main = importlib.import_module(stage.module).main
+        rc = main() if stage.argv is None else main(list(stage.argv))
+    except SystemExit as e:
+        rc = e.code
+    except Exception as e:
+        logger.error(f"Stage {stage.name} raised: {e!r}")
+        rc = 1
+    ok = rc in (None, 0)
+    if not ok:
+        logger.error(f"Stage {stage.name} failed (exit {rc})")
+    return ("ok" if ok else "failed"), time.perf_counter() - start
+
+
+def preload(names: Sequence[str], stages: Dict[str, Stage] = STAGES) -> None:
+    """Import the stages' modules in this process so forked workers inherit them."""
+    for name in names:
+        try:
+            importlib.import_module(stages[name].module)
+        except Exception as e:
+            # run_stage imports it again in the worker and reports the failure there
+            logger.debug(f"Could not preload {stages[name].module}: {e!r}")
+
+
+def worker_context():
+    """Fork where available (workers inherit the preloaded modules), else the platform default."""
+    return multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+
+
+def resolve(targets: Sequence[str], stages: Dict[str, Stage] = STAGES) -> List[str]:
+    """Expand group names into stages, in DAG declaration order."""
+    wanted = set()
+    for target in targets:
+        if target in GROUPS:
+            wanted.update(GROUPS[target])
+        elif target in stages:
+            wanted.add(target)
+        else:
+            raise ValueError(f"unknown stage or group: {target}")
+    return [name for name in stages if name in wanted]
+
+
+def stage_worker(stage: Stage, conn) -> None:
+    """Worker process entry point: run one stage and send back its result."""
+    conn.send(run_stage(stage))
+    conn.close()
+
+
+def run(names: Sequence[str], jobs: int = DEFAULT_JOBS,
+        stages: Dict[str, Stage] = STAGES) -> Dict[str, Tuple[str, float]]:
+    """
+    Run the selected stages, each once its selected predecessors are done.
+
+    Every stage runs in a fresh worker process forked from this (thread-free)
+    one. A stage whose required predecessor failed (or was skipped) is skipped.
+
+    Args:
+        names: Stage names to run
+        jobs: Maximum stages running at the same time
+        stages: Stage table (for tests)
+
+    Returns:
+        {stage: (status, seconds)} with status "ok", "failed" or "skipped"
+    """
+    ctx = worker_context()
+    preload(names, stages)
+    selected = set(names)
+    pending = {n: {d for d in stages[n].after if d in selected} for n in names}
+    results: Dict[str, Tuple[str, float]] = {}
+    running = {}  # process sentinel -> (name, process, result pipe)
+    while pending or running:
+        for name in [n for n, deps in pending.items() if deps <= results.keys()]:
+            if any(results[d][0] != "ok" and not stages[d].optional for d in pending[name]):
+                del pending[name]
+                results[name] = ("skipped", 0.0)
+                continue
+            if len(running) >= max(1, jobs):
+                break
+            del pending[name]
+            recv, send = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=stage_worker, args=(stages[name], send), name=f"cf-{name}")
+            proc.start()
+            send.close()
+            running[proc.sentinel] = (name, proc, recv)
+        if not running:
+            continue  # only skips were resolved; re-check what they unblocked
+        for sentinel in connection.wait(list(running)):
+            name, proc, recv = running.pop(sentinel)
+            proc.join()
+            if recv.poll():
+                results[name] = recv.recv()
+            else:  # the worker died (e.g. killed) before reporting
+                logger.error(f"Stage {name} worker exited with {proc.exitcode} before reporting")
+                results[name] = ("failed", 0.0)
+            recv.close()
+    return results
+
+
+def report(results: Dict[str, Tuple[str, float]], wall: float) -> str:
+    lines = [f"{'stage':<12}{'status':<10}{'seconds':>8}"]
+    for name, (status, seconds) in results.items():
+        lines.append(f"{name:<12}{status:<10}{seconds:>8.2f}")
+    lines.append(f"{'wall':<22}{wall:>8.2f}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Run pipeline stages from one command.")
+    ap.add_argument("targets", nargs="*", help=f"stages ({', '.join(STAGES)}) or groups ({', '.join(GROUPS)})")
+    ap.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="stages allowed to run in parallel")
+    ap.add_argument("--list", action="store_true", help="print the stage graph and exit")
+    args = ap.parse_args(argv)
+
+    if args.list or not args.targets:
+        for stage in STAGES.values():
+            after = f" (after {', '.join(stage.after)})" if stage.after else ""
+            print(f"{stage.name:<12}{stage.module}{after}{' [optional]' if stage.optional else ''}")
+        return 0
+    try:
+        names = resolve(args.targets)
+    except ValueError as e:
+        ap.error(str(e))
+
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.append(SCRIPTS_DIR)
+    start = time.perf_counter()
+    results = run(names, args.jobs)
+    print(report(results, time.perf_counter() - start))
+    failed = [n for n, (status, _) in results.items() if status != "ok" and not STAGES[n].optional]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -143,7 +143,7 @@ class Paths:
     FEED_LINKEDIN_LIVE = "rss_li_live.xml"
 
     # Analytics
-    FINGERPRINTS = "analytics/fingerprints.json"
+    FINGERPRINTS = "analytics/fingerprints.bin"
     POSTS_FEATURES = "analytics/posts_features.csv"
     FEATURE_SUMMARY = "analytics/feature_summary.csv"
     ENGAGEMENT = "analytics/engagement.csv"
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Append-only item log behind the master feed.
+Items live one JSON object per line in content/items.jsonl (oldest first), so
+publishing is an O(1) append; rss.xml is rendered from the log newest-first with
+a streaming XML writer, never holding the full history as an ElementTree.
+
+rss.xml only carries a retention window (newest N items / D days). Older items
+roll into monthly shards, archive/rss-YYYY-MM.xml, listed in archive/index.json.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional
+from xml.sax.saxutils import XMLGenerator
+from atomic_io import append_lines, atomic_open, write_json
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+ITEMS_PATH = "content/items.jsonl"
+CHANNEL_PATH = "content/channel.json"
+FEED_PATH = "rss.xml"
+ARCHIVE_DIR = "archive"
+ARCHIVE_INDEX_NAME = "index.json"
+CHANNEL_FIELDS = ("title", "link", "description", "language")
+READ_BLOCK = 64 * 1024
+
+STAMP_RE = re.compile(r"""(?isx)\s*(?:—|–|-|\||:)?\s*(?:\(|\[)?\s*(?:\d{4}[-/]\d{2}[-/]\d{2}(?:[ T]\d{1,2}:\d{2}(?::\d{2})?\s?(?:AM|PM)?)?(?:\s?[A-Z]{2,4})?|\d{1,2}/\d{1,2}/\d{2,4})\s*(?:\)|\])?\s*$""")
+
+
+def rss_date(dt: Optional[datetime] = None) -> str:
+    return (dt or datetime.now(timezone.utc)).strftime("%a, %d %b %Y %H:%M:%S %z")
+
+
+def norm_entities(s: str) -> str:
+    return (s or "").replace("&nbsp;", " ") \
+        .replace("&mdash;", "—").replace("&#8212;", "—") \
+        .replace("&ndash;", "–").replace("&#8211;", "–")
+
+
+def normalize_record(record: Dict) -> Dict:
+    """
+    Strip trailing timestamps from title/description and make sure there is a GUID.
+
+    This is the normalization the post workflow used to re-apply to the whole
+    feed after every run; it now happens once, when an item enters the log.
+    """
+    rec = dict(record)
+    for field in ("title", "description"):
+        if (rec.get(field) or "").strip():
+            rec[field] = STAMP_RE.sub("", norm_entities(rec[field]))
+    if not (rec.get("guid") or "").strip():
+        base = f"{rec.get('link') or ''}|{rec.get('title') or ''}|{rec.get('pubDate') or ''}"
+        rec["guid"] = hashlib.sha1(base.encode("utf-8", errors="ignore")).hexdigest()
+    return rec
+
+
+def _reverse_lines(path: str) -> Iterator[bytes]:
+    """Yield the non-empty lines of a file last-to-first, reading fixed-size blocks from the end."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        tail = b""
+        while pos > 0:
+            step = min(READ_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + tail).split(b"\n")
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+
+class FeedStore:
+    """The item log plus the channel metadata rss.xml is rendered from."""
+
+    def __init__(self, items_path: str = ITEMS_PATH, channel_path: str = CHANNEL_PATH):
+        self.items_path = items_path
+        self.channel_path = channel_path
+
+    def channel(self) -> Dict[str, str]:
+        try:
+            with open(self.channel_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_channel(self, channel: Dict[str, str]) -> None:
+        write_json(self.channel_path, channel, ensure_ascii=False, indent=2)
+
+    def ensure(self, feed_path: str = FEED_PATH, defaults: Optional[Dict[str, str]] = None) -> "FeedStore":
+        """Migrate an existing rss.xml on first use and fill blank channel fields from defaults."""
+        if not os.path.exists(self.items_path) and os.path.exists(feed_path):
+            migrate_feed(feed_path, self)
+        channel = self.channel()
+        filled = dict(channel)
+        for key, value in (defaults or {}).items():
+            if not (filled.get(key) or "").strip():
+                filled[key] = value
+        if filled != channel or not os.path.exists(self.channel_path):
+            self.save_channel(filled)
+        return self
+
+    def append(self, record: Dict) -> Dict:
+        """Normalize one item and append it to the log."""
+        rec = normalize_record(record)
+        torn = append_lines(self.items_path, [json.dumps(rec, ensure_ascii=False) + "\n"])
+        if torn:
+            logger.warning(f"Dropped a {torn}-byte partial line from the end of {self.items_path}")
+        return rec
+
+    def newest_first(self) -> Iterator[Dict]:
+        if not os.path.exists(self.items_path):
+            return
+        for i, line in enumerate(_reverse_lines(self.items_path)):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                if i:
+                    raise
+                # a crash mid-append tears only the last line; append() cuts it off
+                logger.warning(f"Skipping partial last line of {self.items_path}")
+
+    def render(self, feed_path: str = FEED_PATH, build_date: Optional[str] = None,
+               max_items: int = 0, max_days: float = 0, archive_dir: str = ARCHIVE_DIR) -> int:
+        """
+        Stream the live window to feed_path and roll older items into archive shards.
+
+        The live feed keeps the newest max_items items, dropping any older than
+        max_days (0 disables either limit; the newest item is always kept). Items
+        past the window are read only until the newest one already archived, so
+        the cost stays proportional to the window, not the history. The window
+        also ends at that item: once archived, an item stays out of the live
+        feed even if the limits are later raised.
+
+        Returns:
+            Number of items in the live feed
+        """
+        build_date = build_date or rss_date()
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_days) if max_days else None
+        items = self.newest_first()
+        overflow: List[Dict] = []
+        archived_head = load_archive_index(archive_dir).get("archived_head")
+
+        def window() -> Iterator[Dict]:
+            for n, rec in enumerate(items):
+                if archived_head and rec.get("guid") == archived_head:
+                    return
+                if n and ((max_items and n >= max_items) or (cutoff and _published(rec) < cutoff)):
+                    overflow.append(rec)
+                    return
+                yield rec
+
+        count = _write_feed(feed_path, self.channel(), window(), build_date)
+        if overflow:
+            archive_items(itertools.chain(overflow, items), self.channel(), archive_dir, build_date)
+        return count
+
+
+def _text_element(xml: XMLGenerator, tag: str, text: Optional[str], attrs: Optional[Dict[str, str]] = None) -> None:
+    xml.startElement(tag, attrs or {})
+    if text:
+        xml.characters(text)
+    xml.endElement(tag)
+
+
+def _write_item(xml: XMLGenerator, rec: Dict) -> None:
+    xml.startElement("item", {})
+    for tag in ("title", "description", "link"):
+        if rec.get(tag) is not None:
+            _text_element(xml, tag, rec[tag])
+    _text_element(xml, "guid", rec.get("guid"), {"isPermaLink": "false"})
+    if rec.get("pubDate"):
+        _text_element(xml, "pubDate", rec["pubDate"])
+    for domain, text in rec.get("categories") or []:
+        _text_element(xml, "category", text, {"domain": domain})
+    xml.endElement("item")
+
+
+def _published(rec: Dict) -> datetime:
+    try:
+        dt = parsedate_to_datetime(rec.get("pubDate") or "")
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError, IndexError):
+        return datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _write_feed(path: str, channel: Dict[str, str], records: Iterator[Dict], build_date: str) -> int:
+    """Stream records (newest first) into an RSS file atomically; returns the item count."""
+    first = next(records, None)
+    count = 0
+    with atomic_open(path) as out:
+        xml = XMLGenerator(out, encoding="utf-8", short_empty_elements=False)
+        xml.startDocument()
+        xml.startElement("rss", {"version": "2.0"})
+        xml.startElement("channel", {})
+        for tag in CHANNEL_FIELDS:
+            if tag in channel:
+                _text_element(xml, tag, channel[tag])
+        _text_element(xml, "lastBuildDate", build_date)
+        _text_element(xml, "pubDate", (first or {}).get("pubDate") or build_date)
+        for rec in itertools.chain([first] if first else [], records):
+            _write_item(xml, rec); count += 1
+        xml.endElement("channel")
+        xml.endElement("rss")
+        out.write("\n")
+    return count
+
+
+def read_feed(path: str) -> List[Dict]:
+    """Item records of an RSS file (e.g. one archive shard), newest first."""
+    return [record_from_element(it) for it in ET.parse(path).getroot().iter("item")]
+
+
+def load_archive_index(archive_dir: str = ARCHIVE_DIR) -> Dict:
+    try:
+        with open(os.path.join(archive_dir, ARCHIVE_INDEX_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"archived": 0, "archived_head": None, "archived_head_date": None, "shards": {}}
+
+
+def archive_items(older: Iterator[Dict], channel: Dict[str, str],
+                  archive_dir: str = ARCHIVE_DIR, build_date: Optional[str] = None) -> int:
+    """
+    Move items that fell out of the live window into monthly shards.
+
+    older yields items newest first; it is consumed only up to the newest item
+    already archived. Each touched shard (one month, so bounded in size) is
+    re-rendered with the new items ahead of its existing ones.
+
+    Returns:
+        Number of newly archived items
+    """
+    index = load_archive_index(archive_dir)
+    # the archive is a contiguous run of the oldest items, so stop at its newest one
+    newest = _published({"pubDate": index["archived_head_date"]}) if index.get("archived_head_date") else None
+    fresh: Dict[str, List[Dict]] = {}
+    added = 0
+    head = None
+    for rec in older:
+        if rec.get("guid") == index.get("archived_head") or (newest and _published(rec) < newest):
+            break
+        head = head or rec
+        month = _published(rec).strftime("%Y-%m") if rec.get("pubDate") else "undated"
+        fresh.setdefault(month, []).append(rec)
+        added += 1
+    if not added:
+        return 0
+
+    build_date = build_date or rss_date()
+    shards = index.setdefault("shards", {})
+    for month, recs in fresh.items():
+        name = f"rss-{month}.xml"
+        path = os.path.join(archive_dir, name)
+        existing = read_feed(path) if os.path.exists(path) else []
+        merged = recs + existing
+        _write_feed(path, channel, iter(merged), build_date)
+        shards[month] = {"file": name, "count": len(merged),
+                         "newest": merged[0].get("pubDate"), "oldest": merged[-1].get("pubDate")}
+    index["shards"] = dict(sorted(shards.items(), reverse=True))
+    index["archived"] = sum(s["count"] for s in shards.values())
+    index["archived_head"] = head.get("guid")
+    index["archived_head_date"] = head.get("pubDate")
+    write_json(os.path.join(archive_dir, ARCHIVE_INDEX_NAME), index, indent=2)
+    logger.info(f"Archived {added} items into {len(fresh)} shard(s) under {archive_dir}/")
+    return added
+
+
+def record_from_element(item: ET.Element) -> Dict:
+    rec: Dict = {}
+    for tag in ("title", "description", "link", "guid", "pubDate"):
+        node = item.find(tag)
+        if node is not None:
+            rec[tag] = node.text or ""
+    cats = [[c.get("domain", ""), c.text or ""] for c in item.findall("category")]
+    if cats:
+        rec["categories"] = cats
+    return rec
+
+
+def migrate_feed(feed_path: str = FEED_PATH, store: Optional[FeedStore] = None) -> FeedStore:
+    """Build the item log and channel file from an existing rss.xml (one streaming pass)."""
+    store = store or FeedStore()
+    channel: Dict[str, str] = {}
+    records: List[Dict] = []
+    depth = 0
+    for event, elem in ET.iterparse(feed_path, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if elem.tag == "item":
+            records.append(normalize_record(record_from_element(elem)))
+            elem.clear()
+        elif depth == 2 and elem.tag in CHANNEL_FIELDS:  # direct child of <channel>
+            channel.setdefault(elem.tag, elem.text or "")
+    with atomic_open(store.items_path) as f:
+        for rec in reversed(records):  # the feed is newest-first, the log oldest-first
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    store.save_channel(channel)
+    logger.info(f"Migrated {len(records)} items from {feed_path} to {store.items_path}")
+    return store
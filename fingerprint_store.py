@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Compact binary store for dup-guard fingerprints.
+Fixed-size records of 64-bit shingle hashes behind a small header, memory-mapped
+for reads and appended in place, so opening the history is O(1) at any size.
+
+Layout (little-endian):
+    header  32 bytes  magic "CFFP", version, ngram, slot width, count, base
+    record  536 bytes guid (20 bytes), shingle count (u16), pad, 64 x u64 hashes
+
+`count` is the number of records ever appended and `base` the logical slot of
+the first record still on disk; logical slot numbers never change, so the LSH
+index can refer to them across compactions.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+from typing import Iterable, List, Optional, Tuple
+from atomic_io import atomic_open, write_atomic
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+STORE_PATH = "analytics/fingerprints.bin"
+MAGIC = b"CFFP"
+VERSION = 1
+SLOT_SHINGLES = 64
+HEADER = struct.Struct("<4sHHHHQQ4x")
+RECORD = struct.Struct(f"<20sHH{SLOT_SHINGLES}Q")
+HEX_GUID_RX = re.compile(r"^[0-9a-f]{40}$")
+
+
+def encode_guid(guid: str) -> bytes:
+    """20-byte form of a GUID (raw SHA-1 for hex GUIDs, else a BLAKE2b digest)."""
+    guid = (guid or "").strip().lower()
+    if HEX_GUID_RX.match(guid):
+        return bytes.fromhex(guid)
+    return hashlib.blake2b(guid.encode("utf-8"), digest_size=20).digest()
+
+
+class FingerprintStore:
+    """Append-only fingerprint records addressed by logical slot number."""
+
+    def __init__(self, path: str = STORE_PATH, ngram: int = 5):
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        if not os.path.exists(path):
+            write_atomic(path, HEADER.pack(MAGIC, VERSION, ngram, SLOT_SHINGLES, 0, 0, 0))
+        self._read_header()
+
+    def _read_header(self) -> None:
+        with open(self.path, "rb") as f:
+            raw = f.read(HEADER.size)
+        if len(raw) < HEADER.size:
+            raise ValueError(f"{self.path}: truncated header")
+        magic, version, ngram, width, _, count, base = HEADER.unpack(raw)
+        if magic != MAGIC or version != VERSION or width != SLOT_SHINGLES:
+            raise ValueError(f"{self.path}: not a v{VERSION} fingerprint store")
+        self.ngram, self.count, self.base = ngram, count, base
+
+    def _map(self) -> mmap.mmap:
+        if self._mm is None:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __len__(self) -> int:
+        """Records currently on disk."""
+        return self.count - self.base
+
+    def window(self, history_size: int) -> range:
+        """Logical slots of the most recent history_size records."""
+        return range(max(self.base, self.count - int(history_size)), self.count)
+
+    def record(self, slot: int) -> Tuple[str, Tuple[int, ...]]:
+        """
+        Read one record by logical slot.
+
+        Returns:
+            Tuple of (guid hex, shingle hashes)
+        """
+        if not self.base <= slot < self.count:
+            raise IndexError(f"slot {slot} not in [{self.base}, {self.count})")
+        offset = HEADER.size + (slot - self.base) * RECORD.size
+        guid, n, _, *hashes = RECORD.unpack_from(self._map(), offset)
+        return guid.hex(), tuple(hashes[:n])
+
+    def append(self, guid: str, hashes: Iterable[int]) -> int:
+        """
+        Append one record in place and bump the header count.
+
+        Titles with more than SLOT_SHINGLES shingles keep the smallest hashes
+        (a bottom-k sample, so Jaccard estimates stay consistent).
+
+        Returns:
+            The record's logical slot
+        """
+        hashes = sorted(set(hashes))[:SLOT_SHINGLES]
+        padded = hashes + [0] * (SLOT_SHINGLES - len(hashes))
+        self.close()
+        with open(self.path, "r+b") as f:
+            f.seek(HEADER.size + len(self) * RECORD.size)
+            f.write(RECORD.pack(encode_guid(guid), len(hashes), 0, *padded))
+            f.flush()
+            os.fsync(f.fileno())  # the record is durable before the header counts it
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, self.ngram, SLOT_SHINGLES, 0, self.count + 1, self.base))
+            f.flush()
+            os.fsync(f.fileno())
+        self.count += 1
+        return self.count - 1
+
+    def compact(self, history_size: int) -> None:
+        """Drop records older than the history window (logical slots are kept)."""
+        keep = self.window(history_size)
+        if keep.start == self.base:
+            return
+        mm = self._map()
+        start = HEADER.size + (keep.start - self.base) * RECORD.size
+        body = mm[start:HEADER.size + len(self) * RECORD.size]
+        self.close()
+        with atomic_open(self.path, "wb", skip_unchanged=False) as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.ngram, SLOT_SHINGLES, 0, self.count, keep.start))
+            f.write(body)
+        logger.info(f"Compacted {self.path}: dropped {keep.start - self.base} old fingerprints")
+        self.base = keep.start
+
+
+def migrate_json(json_path: str, store_path: str = STORE_PATH, ngram: int = 5) -> FingerprintStore:
+    """Convert a legacy fingerprints.json (list of {guid, ngrams}) into a binary store."""
+    from dup_index import shingle_hash
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        fps: List[dict] = json.load(f)
+    store = FingerprintStore(store_path, ngram=ngram)
+    for fp in fps:
+        store.append(fp.get("guid", ""), (shingle_hash(g) for g in fp.get("ngrams", [])))
+    logger.info(f"Migrated {len(fps)} fingerprints from {json_path} to {store_path}")
+    return store
+
+
+def open_store(store_path: str = STORE_PATH, legacy_json: Optional[str] = None, ngram: int = 5) -> FingerprintStore:
+    """Open the store, migrating from the legacy JSON file the first time."""
+    if not os.path.exists(store_path) and legacy_json and os.path.exists(legacy_json):
+        store = migrate_json(legacy_json, store_path, ngram=ngram)
+        os.remove(legacy_json)
+        return store
+    return FingerprintStore(store_path, ngram=ngram)
@@ -153,10 +153,11 @@ class HealthCheck:
 
         # File existence checks
         self.check_file_exists("rss.xml", "Main RSS Feed")
+        self.check_file_exists("content/items.jsonl", "Feed Item Log")
         self.check_file_exists("ops/config.json", "Configuration")
         self.check_file_exists("ops/rules.json", "Quality Rules")
         self.check_file_exists("ops/bandit.json", "Style Weights")
-        self.check_file_exists("analytics/fingerprints.json", "Fingerprints")
+        self.check_file_exists("analytics/fingerprints.bin", "Fingerprints")
         self.check_file_exists("content/seeds_topics.txt", "Topic Seeds")
 
         # RSS validation
@@ -166,7 +167,7 @@ class HealthCheck:
         self.check_recent_post("rss.xml", max_hours=24)
 
         # File size checks (prevent runaway growth)
-        self.check_file_size("analytics/fingerprints.json", max_mb=5, description="Fingerprints")
+        self.check_file_size("analytics/fingerprints.bin", max_mb=5, description="Fingerprints")
         self.check_file_size("rss.xml", max_mb=10, description="RSS Feed")
 
         # Environment checks (only in CI/CD)
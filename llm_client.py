@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Shared OpenAI clients for Career Forge.
+One lazily built client per process over a keep-alive connection pool, reused by
+every attempt and fallback model, with per-call connect / TTFB / total timings.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+REQUEST_TIMEOUT = 30.0
+MAX_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 90.0
+MAX_TIMINGS = 256  # per-call records kept for inspection; the summary covers every call
+
+_client = None
+_async_client = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_timings: Deque[Dict[str, Any]] = deque(maxlen=MAX_TIMINGS)
+_totals: Dict[str, float] = {"calls": 0, "new_connections": 0, "connect_ms": 0.0, "ttfb_ms": 0.0, "total_ms": 0.0}
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_call_timing", default=None)
+
+
+# ---------- Timing ----------
+
+def _mark(event_name: str) -> None:
+    """Record the first time each httpcore trace event fires for the current call."""
+    rec = _current.get()
+    if rec is None:
+        return
+    marks = rec["_marks"]
+    if event_name not in marks:
+        marks[event_name] = time.perf_counter()
+
+
+def _trace(event_name: str, info: Dict[str, Any]) -> None:
+    _mark(event_name)
+
+
+async def _atrace(event_name: str, info: Dict[str, Any]) -> None:
+    _mark(event_name)
+
+
+def _install_trace(request) -> None:
+    request.extensions["trace"] = _trace
+
+
+async def _ainstall_trace(request) -> None:
+    request.extensions["trace"] = _atrace
+
+
+def _span(marks: Dict[str, float], start: str, end: str) -> float:
+    a = next((t for name, t in marks.items() if name.endswith(start)), None)
+    b = next((t for name, t in marks.items() if name.endswith(end)), None)
+    return (b - a) * 1000 if a is not None and b is not None else 0.0
+
+
+@contextmanager
+def timed_call(model: str):
+    """
+    Time one model request made inside the block.
+
+    Connection setup (TCP + TLS) is 0 when a pooled connection was reused.
+    """
+    rec: Dict[str, Any] = {"model": model, "_marks": {}}
+    token = _current.set(rec)
+    start = time.perf_counter()
+    try:
+        yield rec
+    finally:
+        end = time.perf_counter()
+        _current.reset(token)
+        marks = rec.pop("_marks")
+        connect_ms = (_span(marks, "connect_tcp.started", "connect_tcp.complete")
+                      + _span(marks, "start_tls.started", "start_tls.complete"))
+        headers_at = next((t for name, t in marks.items()
+                           if name.endswith("receive_response_headers.complete")), None)
+        rec.update({
+            "connect_ms": round(connect_ms, 1),
+            "ttfb_ms": round((headers_at - start) * 1000, 1) if headers_at else 0.0,
+            "total_ms": round((end - start) * 1000, 1),
+            "reused": not any(name.endswith("connect_tcp.started") for name in marks),
+        })
+        _timings.append(rec)
+        _totals["calls"] += 1
+        _totals["new_connections"] += not rec["reused"]
+        for key in ("connect_ms", "ttfb_ms", "total_ms"):
+            _totals[key] += rec[key]
+        logger.info(
+            f"{model}: connect={rec['connect_ms']}ms ttfb={rec['ttfb_ms']}ms "
+            f"total={rec['total_ms']}ms reused={rec['reused']}"
+        )
+
+
+def call_timings() -> List[Dict[str, Any]]:
+    """Timings of the last MAX_TIMINGS model calls made by this process, oldest first."""
+    return list(_timings)
+
+
+def timing_summary() -> Dict[str, float]:
+    """Running totals over every call, e.g. to see what connection setup costs per post."""
+    return {key: round(value, 1) if key.endswith("_ms") else int(value) for key, value in _totals.items()}
+
+
+# ---------- Clients ----------
+
+def _http_client(is_async: bool):
+    import httpx
+    try:
+        from openai import DefaultAsyncHttpxClient as AsyncHttp, DefaultHttpxClient as SyncHttp
+    except ImportError:  # older openai releases
+        AsyncHttp, SyncHttp = httpx.AsyncClient, httpx.Client
+
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS,
+                          max_keepalive_connections=MAX_CONNECTIONS,
+                          keepalive_expiry=KEEPALIVE_EXPIRY)
+    if is_async:
+        return AsyncHttp(limits=limits, timeout=REQUEST_TIMEOUT,
+                         event_hooks={"request": [_ainstall_trace]})
+    return SyncHttp(limits=limits, timeout=REQUEST_TIMEOUT,
+                    event_hooks={"request": [_install_trace]})
+
+
+def _api_key(api_key: Optional[str]) -> str:
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.error("OPENAI_API_KEY environment variable is not set")
+        raise ValueError("OPENAI_API_KEY environment variable is required")
+    return api_key
+
+
+def get_client(api_key: Optional[str] = None):
+    """
+    Process-wide OpenAI client, built on first use.
+
+    base_url falls back to OPENAI_BASE_URL, so a local stand-in server works too.
+    """
+    global _client
+    if _client is None:
+        from openai import OpenAI
+
+        key = _api_key(api_key)
+        # Initialize client with explicit parameters to avoid environment variable conflicts
+        # GitHub Actions may set proxy vars that the old client doesn't support
+        try:
+            _client = OpenAI(api_key=key, timeout=REQUEST_TIMEOUT, max_retries=0,
+                             http_client=_http_client(is_async=False))
+        except TypeError as e:
+            # Fallback for older OpenAI library versions or environment conflicts
+            logger.warning(f"Standard client init failed ({e}), trying minimal init")
+            _client = OpenAI(api_key=key)
+    return _client
+
+
+def get_async_client(api_key: Optional[str] = None):
+    """Process-wide AsyncOpenAI client; use it from run_async() so its pool stays on one loop."""
+    global _async_client
+    if _async_client is None:
+        from openai import AsyncOpenAI
+
+        _async_client = AsyncOpenAI(api_key=_api_key(api_key), timeout=REQUEST_TIMEOUT,
+                                    max_retries=0, http_client=_http_client(is_async=True))
+    return _async_client
+
+
+def run_async(coro):
+    """
+    Run a coroutine on the process-wide event loop.
+
+    asyncio.run() would close the loop, and the async pool's connections with it,
+    after every call; a single long-lived loop keeps them warm between posts.
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+def close_clients() -> None:
+    """Close both clients and their pools (the next get_* call rebuilds them)."""
+    global _client, _async_client, _loop
+    if _client is not None:
+        _client.close()
+        _client = None
+    if _async_client is not None:
+        run_async(_async_client.close())
+        _async_client = None
+    if _loop is not None:
+        _loop.close()
+        _loop = None
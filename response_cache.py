@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for model responses.
+Lets reruns, retries and tests replay earlier replies instead of re-billing them.
+
+Environment:
+    LLM_CACHE_MODE    off (default) | readwrite | replay
+    LLM_CACHE_DIR     cache directory (default: .cache/llm)
+    LLM_CACHE_TTL     entry lifetime in seconds (default: 7 days)
+    LLM_CACHE_MAX_MB  size cap before oldest entries are evicted (default: 50)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, Optional
+from atomic_io import write_json
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_DIR = ".cache/llm"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+MODES = ("off", "readwrite", "replay")
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class ResponseCache:
+    """
+    Model replies stored one JSON file per request under <root>/<key[:2]>/<key>.json.
+
+    Modes:
+        off: never read or write
+        readwrite: serve fresh hits, record misses
+        replay: serve only from the cache (ignoring TTL); misses are errors
+    """
+
+    def __init__(self, root: str = CACHE_DIR, mode: str = "off",
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {MODES}")
+        self.root = root
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._bytes: Optional[int] = None  # running size, known after the first full scan
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Build a cache from the LLM_CACHE_* environment variables."""
+        return cls(
+            root=os.getenv("LLM_CACHE_DIR", CACHE_DIR),
+            mode=(os.getenv("LLM_CACHE_MODE") or "off").strip().lower(),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL") or DEFAULT_TTL_SECONDS),
+            max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB") or DEFAULT_MAX_BYTES / 1024 / 1024) * 1024 * 1024),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @staticmethod
+    def key(model: str, system: str, user: str, temperature: float) -> str:
+        """Hash everything that determines the reply."""
+        blob = json.dumps([model, system, user, round(float(temperature), 4)], ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a recorded reply.
+
+        Returns:
+            The reply text, or None on a miss (or when the cache is off)
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        if self.mode != "replay" and time.time() - record.get("created", 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+        return record.get("content")
+
+    def put(self, key: str, model: str, system: str, user: str, temperature: float, content: str) -> None:
+        """Record a reply (no-op unless the mode is readwrite)."""
+        if self.mode != "readwrite":
+            return
+        path = self._path(key)
+        record = {
+            "key": key, "model": model, "temperature": temperature,
+            "system": system, "user": user, "content": content, "created": time.time(),
+        }
+        old = self._size(path)
+        write_json(path, record, ensure_ascii=False)
+        # one directory scan per process; later writes only move the running total
+        if self._bytes is None:
+            self.prune()
+            return
+        self._bytes += self._size(path) - old
+        if self._bytes > self.max_bytes:
+            self.prune()
+
+    def _files(self) -> Iterator[str]:
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name.endswith(".json"):
+                    yield os.path.join(shard_dir, name)
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _remove(self, path: str) -> None:
+        size = self._size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        if self._bytes is not None:
+            self._bytes -= size
+
+    def prune(self) -> int:
+        """
+        Evict expired entries, then the oldest ones until under max_bytes.
+
+        This is the only full scan: put() calls it on its first write and then
+        only when the running size total goes over max_bytes.
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        live = []
+        removed = 0
+        for path in self._files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if now - st.st_mtime > self.ttl_seconds:
+                self._remove(path); removed += 1
+            else:
+                live.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in live)
+        for _, size, path in sorted(live):
+            if total <= self.max_bytes:
+                break
+            self._remove(path); removed += 1
+            total -= size
+        self._bytes = total
+        if removed:
+            logger.info(f"Evicted {removed} cached responses from {self.root}")
+        return removed
+
+    def entries(self) -> Iterator[Dict]:
+        """Yield every recorded request/response, e.g. to seed a stand-in model server."""
+        for path in self._files():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+
+_CACHE: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache configured from the environment on first use."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ResponseCache.from_env()
+    return _CACHE
+
+
+def reset_response_cache() -> None:
+    """Forget the process-wide cache so the next call re-reads the environment."""
+    global _CACHE
+    _CACHE = None
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Inspect or maintain the model response cache.")
+    ap.add_argument("command", choices=["stats", "prune", "export"])
+    ap.add_argument("--out", help="JSONL file for export (default: stdout)")
+    args = ap.parse_args(argv)
+
+    cache = ResponseCache.from_env()
+    if args.command == "stats":
+        sizes = [os.path.getsize(p) for p in cache._files()]
+        print(f"{cache.root}: {len(sizes)} entries, {sum(sizes) / 1024:.1f} KB")
+    elif args.command == "prune":
+        print(f"Removed {cache.prune()} entries")
+    else:
+        out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+        for record in cache.entries():
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if args.out:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,24 @@
 #!/usr/bin/env python3
-# Reads rss.xml, extracts features (incl. style/cta), joins engagement.csv, writes CSVs + reports.
+# Reads rss.xml (+ archive/ shards), extracts features (incl. style/cta), joins engagement.csv, writes CSVs + reports.
+# Features persist in analytics/feature_cache.json so only new/changed posts are re-featurized; engagement.csv
+# is streamed into per-GUID running totals kept in analytics/engagement_index.json, so each run only reads
+# rows appended since the last one. The feature group-bys run as vectorized NumPy operations.
+# analytics/bundle.json carries everything the HTML pages render (KPIs, feature series, top-N lists and
+# the 30-day Buffer engagement series) so they no longer download and aggregate the raw files.
 
-import os, re, csv, statistics, xml.etree.ElementTree as ET
+import os, re, sys, csv, json, hashlib, argparse, xml.etree.ElementTree as ET
+import numpy as np
+from operator import itemgetter
 from email.utils import parsedate_to_datetime
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "analytics"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from atomic_io import atomic_open, write_atomic, write_json  # noqa: E402
+from build_manifest import record, up_to_date  # noqa: E402
+from metrics_store import MetricsStore  # noqa: E402
+
 REPO_TZ = ZoneInfo("America/Phoenix")
 ROOT = os.path.dirname(os.path.abspath(__file__))
 REPO = os.path.abspath(os.path.join(ROOT, ".."))
@@ -13,32 +26,61 @@ AN_DIR = os.path.join(REPO, "analytics")
 os.makedirs(AN_DIR, exist_ok=True)
 
 RSS_MAIN = os.path.join(REPO, "rss.xml")
+ARCHIVE_DIR = os.path.join(REPO, "archive")
 ENG_CSV  = os.path.join(AN_DIR, "engagement.csv")
 
 OUT_POSTS  = os.path.join(AN_DIR, "posts_features.csv")
 OUT_SUM    = os.path.join(AN_DIR, "feature_summary.csv")
 OUT_MD     = os.path.join(AN_DIR, "latest_report.md")
 OUT_CHAT   = os.path.join(AN_DIR, "for_chatgpt.md")
+OUT_BUNDLE = os.path.join(AN_DIR, "bundle.json")
+METRICS_DIR = os.path.join(AN_DIR, "metrics")
+BUNDLE_VERSION = 1  # bump when the bundle layout changes; the pages check it
+ENG_WINDOW_DAYS = 30
+TOP_N, TOP_PER_STYLE = 20, 5
+TOP_FIELDS = ["title_sample","eng_score","style","cta","title_emoji_ct","title_len","likes","replies","reposts","clicks","saves","pubDate_local","link"]
+BUF_KEYS = ["clicks","likes","comments","shares"]
+FEATURE_CACHE = os.path.join(AN_DIR, "feature_cache.json")
+CACHE_VERSION = 3  # bump when post_features/bucket_keys change
+ENG_INDEX = os.path.join(AN_DIR, "engagement_index.json")
+ENG_INDEX_VERSION = 2
+FOLD_BATCH = 1<<16  # engagement rows parsed per numpy batch
+ENG_KEYS = ["likes","replies","reposts","impressions","clicks","saves"]
+SCORE_WEIGHTS = np.array([1.0, 2.0, 3.0, 0.0, 0.5, 1.5])  # eng_score() over ENG_KEYS
 
 def read_rss(path):
     if not os.path.exists(path): return []
     tree = ET.parse(path); ch = tree.getroot().find("channel"); items=[]
     for it in ch.findall("item"):
-        style="unknown"; cta="unknown"
+        style="unknown"; cta="unknown"; context=""
         for cat in it.findall("category"):
             dom=(cat.get("domain") or "").strip().lower(); val=(cat.text or "").strip()
             if dom=="style" and val: style=val
             elif dom=="cta" and val: cta=val
+            elif dom=="context" and val: context=val  # bandit context the arm was chosen for
         items.append({
           "title": (it.findtext("title") or "").strip(),
           "description": (it.findtext("description") or "").strip(),
           "link": (it.findtext("link") or "").strip(),
           "guid": (it.findtext("guid") or "").strip(),
           "pubDate": (it.findtext("pubDate") or "").strip(),
-          "style": style, "cta": cta
+          "style": style, "cta": cta, "arm_context": context
         })
     return items
 
+def history_sources():
+    # (name, path, signature): the live feed, then the monthly shards listed in archive/index.json.
+    # Shards only change when the feed window rolls into them, which bumps their count/newest.
+    srcs=[]
+    if os.path.exists(RSS_MAIN):
+        with open(RSS_MAIN, "rb") as f: srcs.append(("rss.xml", RSS_MAIN, hashlib.sha1(f.read()).hexdigest()))
+    idx=os.path.join(ARCHIVE_DIR, "index.json")
+    if os.path.exists(idx):
+        with open(idx, encoding="utf-8") as f: shards=json.load(f).get("shards", {})
+        for shard in shards.values():
+            srcs.append((f"archive/{shard['file']}", os.path.join(ARCHIVE_DIR, shard["file"]), f"{shard['count']}|{shard['newest']}"))
+    return srcs
+
 def count_emojis(s): 
     c=0
     for ch in s:
@@ -70,89 +112,264 @@ def hour_bucket(dt):
     if 18<=h<22: return "evening"
     return "night"
 
-def read_engagement(path):
-    rows=[]
-    if not os.path.exists(path): return rows
-    with open(path, newline="", encoding="utf-8") as f:
-        for r in csv.DictReader(f):
-            if (r.get("guid") or "").startswith("#") or not (r.get("guid") or "").strip(): continue
-            rows.append({
-                "guid": r.get("guid","").strip(),
-                "platform": (r.get("platform","") or "").strip().lower(),
-                "likes": int(r.get("likes") or 0),
-                "replies": int(r.get("replies") or 0),
-                "reposts": int(r.get("reposts") or 0),
-                "impressions": int(r.get("impressions") or 0),
-                "clicks": int(r.get("clicks") or 0),
-                "saves": int(r.get("saves") or 0)
-            })
-    return rows
+def bucketize(v, edges):
+    for e in edges:
+        if v <= e: return f"<= {e}"
+    return f"> {edges[-1]}"
 
-def build_posts():
-    items=read_rss(RSS_MAIN); posts=[]
-    for it in items:
-        dt=to_local(it["pubDate"]); title=it["title"]; desc=it["description"]
-        posts.append({
-          "guid": it["guid"], "pubDate_local": dt.isoformat() if dt else "", "hour_bucket": hour_bucket(dt),
-          "style": it["style"], "cta": it["cta"],
-          "title_len": safe_len(title), "desc_len": safe_len(desc),
-          "title_emoji_ct": count_emojis(title), "desc_emoji_ct": count_emojis(desc),
-          "has_number": has_number(title) or has_number(desc),
-          "has_question": has_question(title) or has_question(desc),
-          "quote_count": max(quote_count(title), quote_count(desc)),
-          "bullet_count": bullet_count(desc),
-          "has_hashtag": 1 if "#" in desc else 0,
-          "title_sample": title[:220], "link": it["link"]
-        })
-    return posts
+def post_key(it):
+    return hashlib.sha1("\0".join(it[k] for k in ("title","description","pubDate","style","cta","arm_context")).encode("utf-8")).hexdigest()
+
+def post_features(it):
+    dt=to_local(it["pubDate"]); title=it["title"]; desc=it["description"]
+    f={
+      "guid": it["guid"], "pubDate_local": dt.isoformat() if dt else "", "hour_bucket": hour_bucket(dt),
+      "style": it["style"], "cta": it["cta"], "arm_context": it["arm_context"],
+      "title_len": safe_len(title), "desc_len": safe_len(desc),
+      "title_emoji_ct": count_emojis(title), "desc_emoji_ct": count_emojis(desc),
+      "has_number": has_number(title) or has_number(desc),
+      "has_question": has_question(title) or has_question(desc),
+      "quote_count": max(quote_count(title), quote_count(desc)),
+      "bullet_count": bullet_count(desc),
+      "has_hashtag": 1 if "#" in desc else 0,
+      "title_sample": title[:220], "link": it["link"]
+    }
+    f["b_title_len"]=bucketize(f["title_len"], [120,160,200,240,280,320])
+    f["b_emoji"]="0" if f["title_emoji_ct"]==0 else ("1" if f["title_emoji_ct"]==1 else ("2" if f["title_emoji_ct"]==2 else "3+"))
+    return f
+
+def bucket_keys(f):
+    # the eight (feature, bucket) groups a post's score counts toward
+    return [("emoji", f["b_emoji"]), ("len", f["b_title_len"]),
+            ("number", "yes" if f["has_number"] else "no"), ("question", "yes" if f["has_question"] else "no"),
+            ("bullets", "0" if f["bullet_count"]==0 else "1+"), ("time", f["hour_bucket"] or "unknown"),
+            ("style", f["style"] or "unknown"), ("cta", f["cta"] or "unknown")]
+
+def eng_score(t):
+    return t["likes"]*1.0 + t["replies"]*2.0 + t["reposts"]*3.0 + t["clicks"]*0.5 + t["saves"]*1.5
 
 def write_csv(path, rows, fields):
-    with open(path, "w", newline="", encoding="utf-8") as f:
+    with atomic_open(path, newline="") as f:
         w=csv.DictWriter(f, fieldnames=fields); w.writeheader()
         for r in rows: w.writerow({k:r.get(k,"") for k in fields})
 
-def agg_mean(vals): 
-    vals=[v for v in vals if isinstance(v,(int,float))]
-    import statistics as S
-    return round(S.mean(vals),2) if vals else 0.0
+def empty_cache():
+    return {"version": CACHE_VERSION, "sources": {}, "posts": {}}
+
+def load_cache(path=FEATURE_CACHE):
+    try:
+        with open(path, encoding="utf-8") as f: cache=json.load(f)
+        if cache.get("version")==CACHE_VERSION: return cache
+    except (OSError, ValueError): pass
+    return empty_cache()
+
+def refresh_features(cache):
+    """
+    Bring the cached per-post features up to date.
+    A source is re-read only when its signature changed, and a post is re-featurized only when its
+    content hash differs. Returns (guids in history order, number of posts added/changed/removed).
+    """
+    posts=cache["posts"]; order=[]; seen=set(); sources={}; touched=0
+    for name, path, sig in history_sources():
+        src=cache["sources"].get(name)
+        if src and src["sig"]==sig:
+            guids=src["guids"]
+        else:
+            guids=[]
+            for it in read_rss(path):
+                g=it["guid"]; h=post_key(it); guids.append(g); ent=posts.get(g)
+                if not ent or ent["h"]!=h:
+                    posts[g]={"h": h, "f": post_features(it), "s": None}; touched+=1
+        sources[name]={"sig": sig, "guids": guids}
+        for g in guids:
+            if g not in seen: seen.add(g); order.append(g)
+    cache["sources"]=sources
+    for g in [g for g in posts if g not in seen]:
+        del posts[g]; touched+=1
+    return order, touched
+
+def empty_eng_index():
+    return {"version": ENG_INDEX_VERSION, "offset": 0, "sig": hashlib.sha1().hexdigest(), "header": [], "totals": {}, "last_day": {}}
+
+def load_eng_index(path=ENG_INDEX):
+    try:
+        with open(path, encoding="utf-8") as f: idx=json.load(f)
+        if idx.get("version")==ENG_INDEX_VERSION: return idx
+    except (OSError, ValueError): pass
+    return empty_eng_index()
+
+def save_eng_index(idx, path=ENG_INDEX):
+    write_json(path, idx, ensure_ascii=False, separators=(",",":"))
+
+def add_metrics(totals, guids, cells, cols):
+    """
+    Add one batch of rows to the running totals. cells holds each row's metric cells joined by commas in
+    `cols` order; they are parsed in one np.fromstring call and summed per guid with bincount, since
+    per-cell int() was most of the fold's time.
+    """
+    if not guids: return
+    s=f",{','.join(cells)},"
+    while ",," in s: s=s.replace(",,", ",0,")  # blank cells count as 0
+    vals=np.fromstring(s[1:-1], dtype=np.int64, sep=",").reshape(len(guids), len(cols)) if cols else None
+    keys, codes=np.unique(np.asarray(guids), return_inverse=True)
+    for g in keys.tolist(): totals.setdefault(g, [0]*len(ENG_KEYS))
+    for c,(k,_) in enumerate(cols):
+        for g,v in zip(keys.tolist(), np.bincount(codes, weights=vals[:,c], minlength=len(keys)).astype(np.int64).tolist()):
+            totals[g][k]+=v
+
+def fold_engagement(path, idx):
+    """
+    Stream rows appended to engagement.csv since the last run into per-GUID running totals.
+    idx["offset"] is the byte position already counted and idx["sig"] the sha1 of those bytes; rows
+    carrying a `day` also advance idx["last_day"][guid][platform], and a row whose day is not past
+    that mark is a re-export and is skipped (exports are appended in day order). The file is read in
+    1 MiB blocks and the metrics are summed FOLD_BATCH rows at a time, so memory stays at one batch plus
+    the totals. A file whose counted prefix changed (edited, rewritten or truncated) is folded again
+    from the start.
+    Returns the number of rows folded.
+    """
+    if not os.path.exists(path):
+        idx.clear(); idx.update(empty_eng_index()); return 0
+    folded=0; h=hashlib.sha1()
+    with open(path, "rb") as f:
+        off=idx["offset"]; left=off
+        while left>0:
+            chunk=f.read(min(left, 1<<20))
+            if not chunk: break
+            h.update(chunk); left-=len(chunk)
+        if left or h.hexdigest()!=idx.get("sig"):
+            # rewritten or hand-edited, not just appended to: count everything again
+            idx.clear(); idx.update(empty_eng_index()); h=hashlib.sha1(); f.seek(0); off=0
+        pos=[off]
+        def lines():
+            tail=b""
+            while True:
+                chunk=f.read(1<<20)
+                if not chunk: break
+                h.update(chunk); pos[0]+=len(chunk); chunk=tail+chunk; cut=chunk.rfind(b"\n")+1
+                tail=chunk[cut:]; yield from chunk[:cut].decode("utf-8").splitlines(True)
+            if tail: yield tail.decode("utf-8")
+        rd=csv.reader(lines())
+        if not idx["header"]: idx["header"]=[c.strip() for c in next(rd, [])]
+        header=idx["header"]; totals=idx["totals"]; last_day=idx["last_day"]
+        col=lambda k: header.index(k) if k in header else None
+        gi=col("guid") or 0; pi=col("platform"); di=col("day")
+        cols=[(ENG_KEYS.index(k), header.index(k)) for k in ENG_KEYS if k in header]; mj=[j for _,j in cols]
+        pick=itemgetter(*mj) if len(mj)>1 else (lambda r: tuple(r[j] for j in mj))
+        width=max([gi]+mj+[j for j in (pi, di) if j is not None])+1
+        guids=[]; cells=[]
+        for r in rd:
+            if len(r)<width: r=r+[""]*(width-len(r))
+            g=r[gi].strip()
+            if not g or g.startswith("#"): continue
+            day=r[di].strip()[:10] if di is not None else ""
+            if day:
+                seen=last_day.setdefault(g, {}); plat=r[pi].strip().lower() if pi is not None else ""
+                if day<=seen.get(plat, ""): continue  # this platform/day was already counted
+                seen[plat]=day
+            guids.append(g); cells.append(",".join(pick(r)))
+            if len(guids)>=FOLD_BATCH:
+                add_metrics(totals, guids, cells, cols); folded+=len(guids); guids=[]; cells=[]
+        add_metrics(totals, guids, cells, cols); folded+=len(guids)
+        idx["offset"]=pos[0]; idx["sig"]=h.hexdigest()
+    return folded
+
+def engagement_totals(idx, order):
+    """Per-post metric totals from the running index as an int64 array (len(order) x len(ENG_KEYS))."""
+    zero=[0]*len(ENG_KEYS); totals=idx["totals"]
+    return np.array([totals.get(g, zero) for g in order], dtype=np.int64).reshape(len(order), len(ENG_KEYS))
+
+def summarize_columnar(scores, group_labels):
+    """
+    Mean score per (feature, bucket): one bincount group-by per feature over columnar arrays.
+    group_labels maps each feature to an array of per-post bucket labels.
+    """
+    rows=[]
+    for feat, labels in group_labels.items():
+        if not len(labels): continue
+        buckets, codes=np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+        sums=np.bincount(codes, weights=scores, minlength=len(buckets)); ns=np.bincount(codes, minlength=len(buckets))
+        rows+=[{"feature":feat,"bucket":str(b),"avg_eng_score":round(float(t)/int(n),2),"n_posts":int(n)} for b,t,n in zip(buckets,sums,ns)]
+    rows.sort(key=lambda r:(r["feature"],r["bucket"]))
+    return rows
+
+def metrics_window(root, today, days=ENG_WINDOW_DAYS):
+    """
+    Buffer engagement over the `days` days before today: totals, a daily clicks/likes series and per-service
+    sums. Only partitions whose last_day reaches into the window are read.
+    """
+    store=MetricsStore(root); cutoff=(today-timedelta(days=days)).isoformat(); latest={}
+    for rel,part in sorted(store.partitions.items()):
+        if (part.get("last_day") or "")<=cutoff: continue
+        latest.update(store.read_partition(rel)[0])
+    totals=dict.fromkeys(BUF_KEYS, 0); daily={}; by_service={}
+    for r in latest.values():
+        day=str(r.get("day") or "")
+        if day<=cutoff: continue
+        v={k:int(r.get(k) or 0) for k in BUF_KEYS}
+        for k in BUF_KEYS: totals[k]+=v[k]
+        d=daily.setdefault(day, [0,0]); d[0]+=v["clicks"]; d[1]+=v["likes"]
+        svc=by_service.setdefault(str(r.get("service") or "unknown").lower(), [0,0]); svc[0]+=v["clicks"]; svc[1]+=v["likes"]
+    days_sorted=sorted(daily)
+    return {"window_days": days, "totals": totals,
+            "daily": {"days": days_sorted, "clicks": [daily[d][0] for d in days_sorted], "likes": [daily[d][1] for d in days_sorted]},
+            "by_service": {s: {"clicks": c, "likes": l} for s,(c,l) in sorted(by_service.items())}}
+
+def build_bundle(joined, rows_sum, engagement):
+    """Everything dashboard.html, leaderboard.html and index.html render, pre-aggregated."""
+    ranked=sorted(joined, key=lambda r:r["eng_score"], reverse=True)
+    features={}
+    for r in rows_sum: features.setdefault(r["feature"],[]).append({"bucket":r["bucket"],"avg":r["avg_eng_score"],"n":r["n_posts"]})
+    for rows in features.values(): rows.sort(key=lambda x:-x["avg"])
+    by_style={}
+    for r in ranked:
+        best=by_style.setdefault(r["style"], [])
+        if len(best)<TOP_PER_STYLE: best.append({"title_sample":r["title_sample"],"eng_score":r["eng_score"]})
+    n=len(joined)
+    kpi={"total_posts": n,
+         "with_metrics": sum(1 for r in joined if any(r[k]>0 for k in ("likes","replies","reposts","clicks","saves"))),
+         "avg_score": round(sum(r["eng_score"] for r in joined)/max(1,n), 2),
+         "last_post": max((r["pubDate_local"] for r in joined if r["pubDate_local"]), default="")}
+    return {"version": BUNDLE_VERSION, "generated": datetime.now(REPO_TZ).isoformat(), "kpi": kpi, "features": features,
+            "top": [{k:r[k] for k in TOP_FIELDS} for r in ranked[:TOP_N]], "top_by_style": by_style, "engagement": engagement}
+
+def save_cache(cache, path=FEATURE_CACHE):
+    write_json(path, cache, ensure_ascii=False, separators=(",",":"))
 
-def summarize(posts, eng_by_guid):
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Build analytics CSVs and reports from the feed and engagement.csv.")
+    ap.add_argument("--rebuild", action="store_true", help="ignore analytics/feature_cache.json and engagement_index.json")
+    args=ap.parse_args(argv)
+    # the engagement window moves daily and follows the Buffer metrics manifest
+    today=datetime.now(timezone.utc).date(); manifest=os.path.join(METRICS_DIR, "manifest.json")
+    step_in=[RSS_MAIN, ARCHIVE_DIR, ENG_CSV, manifest, __file__]
+    step_out=[OUT_POSTS, OUT_SUM, OUT_MD, OUT_CHAT, OUT_BUNDLE, FEATURE_CACHE, ENG_INDEX]
+    if not args.rebuild and up_to_date("analytics", step_in, step_out, today.isoformat()):
+        print("Analytics up to date."); return
+    cache=empty_cache() if args.rebuild else load_cache()
+    order, touched=refresh_features(cache)
+    posts=[cache["posts"][g] for g in order]
+    eng=empty_eng_index() if args.rebuild else load_eng_index()
+    touched+=fold_engagement(ENG_CSV, eng); save_eng_index(eng)
+    totals=engagement_totals(eng, order)
+    scores=np.round(totals @ SCORE_WEIGHTS, 2)
+    for ent,sc in zip(posts, scores.tolist()):
+        if ent["s"]!=sc: ent["s"]=sc; touched+=1
+    msig=hashlib.sha1((open(manifest,"rb").read() if os.path.exists(manifest) else b"")+today.isoformat().encode()).hexdigest()
+    if cache.get("metrics_sig")!=msig: cache["metrics_sig"]=msig; touched+=1
+    save_cache(cache)
+    if not touched and all(os.path.exists(p) for p in (OUT_POSTS, OUT_SUM, OUT_MD, OUT_CHAT, OUT_BUNDLE)):
+        record("analytics", step_in, step_out, today.isoformat()); print("Analytics unchanged."); return
+    keys=[bucket_keys(ent["f"]) for ent in posts]
+    group_labels={feat: [k[i][1] for k in keys] for i,(feat,_) in enumerate(bucket_keys(posts[0]["f"]))} if posts else {}
+    rows_sum=summarize_columnar(scores, group_labels)
     joined=[]
-    for p in posts:
-        g=p["guid"]; totals={"likes":0,"replies":0,"reposts":0,"impressions":0,"clicks":0,"saves":0}
-        for m in eng_by_guid.get(g, []):
-            for k in totals: totals[k]+=m.get(k,0)
-        score=totals["likes"]*1.0 + totals["replies"]*2.0 + totals["reposts"]*3.0 + totals["clicks"]*0.5 + totals["saves"]*1.5
-        row=dict(p); row.update(totals); row["eng_score"]=round(score,2); joined.append(row)
-    def bucketize(v, edges):
-        for e in edges:
-            if v <= e: return f"<= {e}"
-        return f"> {edges[-1]}"
-    for r in joined:
-        r["b_title_len"]=bucketize(r["title_len"], [120,160,200,240,280,320])
-        r["b_emoji"]="0" if r["title_emoji_ct"]==0 else ("1" if r["title_emoji_ct"]==1 else ("2" if r["title_emoji_ct"]==2 else "3+"))
-    agg={}
-    def add(k,val): agg.setdefault(k,[]).append(val)
-    for r in joined:
-        add(("emoji", r["b_emoji"]), r["eng_score"])
-        add(("len", r["b_title_len"]), r["eng_score"])
-        add(("number", "yes" if r["has_number"] else "no"), r["eng_score"])
-        add(("question", "yes" if r["has_question"] else "no"), r["eng_score"])
-        add(("bullets", "0" if r["bullet_count"]==0 else "1+"), r["eng_score"])
-        add(("time", r["hour_bucket"] or "unknown"), r["eng_score"])
-        add(("style", r["style"] or "unknown"), r["eng_score"])
-        add(("cta", r["cta"] or "unknown"), r["eng_score"])
-    rows_sum=[{"feature":f,"bucket":b,"avg_eng_score":agg_mean(v),"n_posts":len(v)} for (f,b),v in sorted(agg.items())]
-    return joined, rows_sum
-
-def main():
-    posts=build_posts(); eng=read_engagement(ENG_CSV)
-    eng_by_guid={}; 
-    for r in eng: eng_by_guid.setdefault(r["guid"], []).append(r)
-    joined, rows_sum=summarize(posts, eng_by_guid)
-    post_fields=["guid","pubDate_local","hour_bucket","style","cta","title_len","desc_len","title_emoji_ct","desc_emoji_ct","has_number","has_question","quote_count","bullet_count","has_hashtag","likes","replies","reposts","impressions","clicks","saves","eng_score","title_sample","link","b_title_len","b_emoji"]
+    for ent,t,sc in zip(posts, totals.tolist(), scores.tolist()):
+        row=dict(ent["f"]); row.update(zip(ENG_KEYS, t)); row["eng_score"]=sc; joined.append(row)
+    post_fields=["guid","pubDate_local","hour_bucket","style","cta","arm_context","title_len","desc_len","title_emoji_ct","desc_emoji_ct","has_number","has_question","quote_count","bullet_count","has_hashtag","likes","replies","reposts","impressions","clicks","saves","eng_score","title_sample","link","b_title_len","b_emoji"]
     write_csv(OUT_POSTS, joined, post_fields)
     write_csv(OUT_SUM, rows_sum, ["feature","bucket","avg_eng_score","n_posts"])
+    write_json(OUT_BUNDLE, build_bundle(joined, rows_sum, metrics_window(METRICS_DIR, today)), ensure_ascii=False, separators=(",",":"))
     top5=sorted(joined, key=lambda r:r.get("eng_score",0), reverse=True)[:5]
     lines=["# Career Forge — Analytics Report\n", f"_Generated: {datetime.now(REPO_TZ).isoformat()}_\n", "## Top 5 Posts (by engagement score)\n"]
     for r in top5:
@@ -163,12 +380,13 @@ def main():
         for x in rows: lines.append(f"- {x['bucket']}: avg_score={x['avg_eng_score']} (n={x['n_posts']})")
     for k,t in [("style","Performance by Style"),("cta","Performance by CTA Type"),("emoji","Emoji Count in Title"),("len","Title Length"),("number","Numbers / % / $ Present"),("question","Question Mark Present"),("bullets","Bullets Present in Description"),("time","Local Post Time Bucket")]: sec(k,t)
     lines+=["\n## Next experiments\n","- Double down on top style + top CTA next week.","- If **Numbers** bucket wins, include a % or $ in the X line.","- Bias schedule toward the best time bucket for a week."]
-    open(OUT_MD,"w",encoding="utf-8").write("\n".join(lines))
+    write_atomic(OUT_MD, "\n".join(lines))
     brief=["# Career Forge — Analytics Brief for ChatGPT\n","We generate self-contained, emoji-forward posts twice daily. Below are feature averages, including **style** and **CTA**.\n","## Feature Summary (averages)\n"]
     for r in rows_sum: brief.append(f"- {r['feature']} :: {r['bucket']} => avg_score={r['avg_eng_score']} (n={r['n_posts']})")
     brief+=["\n## Ask ChatGPT\n","Using the summary and top posts, propose 5 editing rules to maximize engagement, incl. 1 rec for **style mix** and 1 for **CTA**.","\n## Top Posts (samples)\n"]
     for r in top5: brief.append(f"- {r['title_sample']}  | score={r['eng_score']} | emojis={r['title_emoji_ct']} | len={r['title_len']} | style={r['style']} | cta={r['cta']}")
-    open(OUT_CHAT,"w",encoding="utf-8").write("\n".join(brief))
+    write_atomic(OUT_CHAT, "\n".join(brief))
+    record("analytics", step_in, step_out, today.isoformat())
     print("Analytics written.")
 
 if __name__=="__main__": main()
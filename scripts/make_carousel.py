@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 from PIL import Image, ImageDraw, ImageFont
-import csv, os, textwrap
+import csv, os, sys, textwrap
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from atomic_io import atomic_open  # noqa: E402
+from build_manifest import record, up_to_date  # noqa: E402
 IN="analytics/posts_features.csv"; OUTDIR="carousels/latest"
 def latest_title():
     if not os.path.exists(IN): return "Career Forge"
@@ -21,10 +24,13 @@ def slide(text, idx):
     y=120
     for ln in wrap(text, 32):
         d.text((80,y), ln, font=font, fill=(230,233,238)); y+=70
-    os.makedirs(OUTDIR, exist_ok=True)
-    path=f"{OUTDIR}/slide{idx}.png"; img.save(path); print("Wrote", path)
+    path=f"{OUTDIR}/slide{idx}.png"
+    with atomic_open(path, "wb") as f: img.save(f, format="PNG")
+    print("Wrote", path)
 def main():
+    if up_to_date("carousel", [IN, __file__], [OUTDIR]): print(OUTDIR, "up to date."); return
     title=latest_title()
     chunks=[ "Career Forge — Key Idea", title, "How to use it today:", "• Apply on your resume\n• Try next interview\n• Share a win", "Follow @CareerForge" ]
     for i,t in enumerate(chunks, start=1): slide(t, i)
+    record("carousel", [IN, __file__], [OUTDIR])
 if __name__=="__main__": main()
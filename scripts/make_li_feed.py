@@ -1,50 +1,7 @@
 #!/usr/bin/env python3
 # rss_li.xml (all) + rss_li_live.xml (1): description-focused copy for LinkedIn
-import xml.etree.ElementTree as ET, re, hashlib, html, os, sys
-IN_FEED="rss.xml"; OUT_ALL="rss_li.xml"; OUT_LIVE="rss_li_live.xml"
-
-# Rotating hashtags - picks one based on index
-ROTATING_HASHTAGS = [
-    "#AIAutomations",
-    "#AICopilot",
-    "#OperateSmarterGrowFaster",
-    "#AIForBusiness",
-    "#NoMoreBusywork",
-    "#AIWorkflows"
-]
-
-# Base suffix with ScalePilot hashtags (rotating tag added dynamically)
-LI_BASE_SUFFIX = "#ScalePilot #SocialPilot"
-def clean(s): s=re.sub(r"<[^>]+>","",s or ""); s=html.unescape(s); return re.sub(r"\s+"," ",s).strip()
-def li_text(title, desc, rotating_tag):
-    base = desc if desc else title
-    base = base.strip()
-    full_suffix = f"{LI_BASE_SUFFIX} {rotating_tag}"
-    # Check if hashtags already present
-    if any(tag in base.lower() for tag in [t.lower() for t in ROTATING_HASHTAGS + ["#scalepilot", "#socialpilot"]]):
-        return base
-    return (base + " " + full_suffix).strip() if base else full_suffix
-def build(items, ch_src, out_path):
-    root=ET.Element("rss",attrib={"version":"2.0"}); ch=ET.SubElement(root,"channel")
-    for t in ["title","link","description","language","lastBuildDate","pubDate"]:
-        src=ch_src.find(t); 
-        if src is not None: ET.SubElement(ch,t).text=(src.text or "")
-    for it in items: ch.append(it)
-    ET.ElementTree(root).write(out_path, encoding="utf-8", xml_declaration=True); print("Wrote", out_path)
-if not os.path.exists(IN_FEED): print("rss.xml not found"); sys.exit(1)
-t=ET.parse(IN_FEED); ch=t.getroot().find("channel")
-items=[]
-for idx, it in enumerate(ch.findall("item")):
-    title=clean(it.findtext("title")); desc=clean(it.findtext("description")); link=(it.findtext("link") or "").strip()
-    # Use index-based selection for consistent hashtag per item
-    rotating_tag = ROTATING_HASHTAGS[idx % len(ROTATING_HASHTAGS)]
-    text=li_text(title, desc, rotating_tag)
-    n=ET.Element("item"); ET.SubElement(n,"title").text=text; ET.SubElement(n,"description").text=text
-    ET.SubElement(n,"link").text=link
-    base=(it.findtext("guid") or link or title or desc).encode("utf-8","ignore")
-    ET.SubElement(n,"guid",attrib={"isPermaLink":"false"}).text=hashlib.sha1(base).hexdigest()
-    pub=it.findtext("pubDate");
-    if pub: ET.SubElement(n,"pubDate").text=pub
-    items.append(n)
-build(items, ch, OUT_ALL)
-build(items[:1], ch, OUT_LIVE)
+# Thin wrapper: social_feeds.py builds every platform from one parse (python social_feeds.py).
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from social_feeds import main
+raise SystemExit(main(["li"]))
@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
-import csv, os
+import csv, os, sys
 from datetime import date
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from atomic_io import write_atomic  # noqa: E402
+from build_manifest import record, up_to_date  # noqa: E402
 IN_FEAT="analytics/feature_summary.csv"; IN_POSTS="analytics/posts_features.csv"; OUT="newsletter.md"
 def read_csv(p): 
     if not os.path.exists(p): return []
     return list(csv.DictReader(open(p,encoding="utf-8")))
 def main():
+    step_in=[IN_FEAT, IN_POSTS, __file__]; today=date.today().isoformat()
+    if up_to_date("newsletter", step_in, [OUT], today): print(OUT, "up to date."); return
     feat=read_csv(IN_FEAT); posts=read_csv(IN_POSTS)
     top=sorted(posts, key=lambda r: float(r.get("eng_score") or 0), reverse=True)[:7]
-    lines=[f"# Career Forge — Weekly Digest ({date.today().isoformat()})","", "## Top Posts"]
+    lines=[f"# Career Forge — Weekly Digest ({today})","", "## Top Posts"]
     for r in top: lines.append(f"- **{r['title_sample']}**  \n  score={r['eng_score']} | style={r['style']} | cta={r['cta']}")
     lines+=["","## What worked (averages)"]
     def sec(key, label):
@@ -17,5 +22,5 @@ def main():
         for x in rows[:6]: lines.append(f"- {x['bucket']}: {x['avg_eng_score']}")
     for k,l in [("style","Styles"),("cta","CTAs"),("emoji","Emojis in title"),("len","Title length")]: sec(k,l)
     lines+=["","## Next tests","- Double down on top style + top CTA next week.","- Add a number (% or $) in 3 posts to validate the Numbers effect."]
-    open(OUT,"w",encoding="utf-8").write("\n".join(lines)); print("Wrote", OUT)
+    print("Wrote" if write_atomic(OUT, "\n".join(lines)) else "Unchanged", OUT); record("newsletter", step_in, [OUT], today)
 if __name__=="__main__": main()
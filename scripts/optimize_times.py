@@ -2,6 +2,8 @@
 # Suggest better cron windows from analytics/posts_features.csv buckets
 
 import csv, os, statistics, re, sys, subprocess
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from atomic_io import write_atomic  # noqa: E402
 
 POSTS = "analytics/posts_features.csv"
 WF = ".github/workflows/post.yml"
@@ -53,7 +55,7 @@ def main():
 
     # Create PR
     subprocess.run(["git","checkout","-b",BRANCH], check=False)
-    with open(WF,"w",encoding="utf-8") as f: f.write(new_y)
+    write_atomic(WF, new_y)
     subprocess.run(["git","add",WF], check=True)
     subprocess.run(["git","config","user.name","cf-bot"], check=True)
     subprocess.run(["git","config","user.email","cf-bot@users.noreply.github.com"], check=True)
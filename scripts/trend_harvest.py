@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
-import os, json, feedparser
+import os, sys, feedparser
 from datetime import datetime, timezone
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from atomic_io import write_json  # noqa: E402
 OUT="content/trends.json"; SRC="content/news_feeds.txt"
 def normalize(e): return {"title": (e.get("title") or "").strip(), "link": (e.get("link") or "").strip(), "published": e.get("published") or e.get("updated") or ""}
 def main():
@@ -19,6 +21,6 @@ def main():
         k=it["title"].lower()
         if k not in seen: uniq.append(it); seen.add(k)
     payload={"updated": datetime.now(timezone.utc).isoformat(), "count": len(uniq), "items": uniq[:30]}
-    os.makedirs("content",exist_ok=True); json.dump(payload, open(OUT,"w",encoding="utf-8"), ensure_ascii=False, indent=2)
+    write_json(OUT, payload, ensure_ascii=False, indent=2)
     print("Wrote", OUT)
 if __name__=="__main__": main()
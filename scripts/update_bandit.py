@@ -1,21 +1,45 @@
 #!/usr/bin/env python3
-import csv, json, os, math
-IN_SUM="analytics/feature_summary.csv"; OUT="ops/bandit.json"
-def load_bandit(p): 
-    try: return json.load(open(p,"r",encoding="utf-8"))
-    except: return {"style_weights":{},"cta_weights":{}}
-def rows(feature):
-    if not os.path.exists(IN_SUM): return []
-    with open(IN_SUM, newline="", encoding="utf-8") as f:
-        return [r for r in csv.DictReader(f) if r["feature"]==feature]
-def softmax(scores, temp=0.6):
-    if not scores: return {}
-    mx=max(scores.values()); ex={k: math.exp((v-mx)/max(1e-6,temp)) for k,v in scores.items()}
-    s=sum(ex.values()) or 1; return {k: round(ex[k]/s,3) for k in ex}
+# Feeds per-post engagement scores from analytics/posts_features.csv into the Thompson-sampling bandit in ops/bandit.json.
+# Rows whose guid is already in the engine's ledger with the same arm and score are skipped before their context
+# is built, so only new/updated observations are processed and touch the posteriors.
+# Each post's posting context (hour bucket, weekend, number in title) also trains the contextual LinUCB model:
+# the context its arm was chosen for (arm_context, kept with queued drafts), else the one derived from pubDate and
+# the title, the same way build_rss tags a draft.
+import csv, os, sys
+from datetime import datetime
+ROOT=os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from bandit_engine import BANDIT_PATH, CONTEXT_TZ, BanditEngine, arm_key, context_from_tag, context_vector, has_number  # noqa: E402
+from build_manifest import record, up_to_date  # noqa: E402
+from build_rss import CTA_CATALOG, STYLE_CATALOG  # noqa: E402
+
+IN_POSTS="analytics/posts_features.csv"; OUT=BANDIT_PATH
+STEP_IN=[IN_POSTS, os.path.join(ROOT,"bandit_engine.py"), os.path.join(ROOT,"build_rss.py"), __file__]
+OBS_KEYS=["likes","replies","reposts","impressions","clicks","saves"]
+
+def weekend(stamp):
+    try: return datetime.fromisoformat(stamp).astimezone(CONTEXT_TZ).weekday()>=5
+    except (TypeError, ValueError): return False
+
+def observations(path=IN_POSTS, engine=None):
+    """
+    (guid, arm, score, context) for every post that has engagement data; posts without metrics are not zeros.
+    With an engine, posts it already recorded with the same arm and score are skipped.
+    """
+    if not os.path.exists(path): return
+    with open(path, newline="", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            g=r["guid"]; arm=arm_key(r.get("style") or "unknown", r.get("cta") or "unknown"); score=float(r.get("eng_score") or 0)
+            if engine is not None and engine.recorded(g, arm, score): continue
+            if not any(float(r.get(k) or 0)>0 for k in OBS_KEYS): continue
+            ctx=context_from_tag(r.get("arm_context") or "")
+            if ctx is None: ctx=context_vector(r.get("hour_bucket") or "", weekend(r.get("pubDate_local")), has_number(r.get("title_sample")))
+            yield g, arm, score, ctx
+
 def main():
-    s={r["bucket"]: float(r["avg_eng_score"] or 0) for r in rows("style")} or {"template_drop":1,"checklist":1}
-    c={r["bucket"]: float(r["avg_eng_score"] or 0) for r in rows("cta")} or {"question":1,"challenge":1}
-    band=load_bandit(OUT); band["style_weights"].update(softmax(s,0.6)); band["cta_weights"].update(softmax(c,0.6))
-    os.makedirs("ops", exist_ok=True); json.dump(band, open(OUT,"w",encoding="utf-8"), ensure_ascii=False, indent=2)
-    print("Updated", OUT)
+    if up_to_date("bandit", STEP_IN, [OUT]): print(f"{OUT} up to date."); return
+    engine=BanditEngine.load(OUT)
+    changed=sum(engine.observe(*o) for o in observations(engine=engine))
+    engine.save(OUT, [k for k,_ in STYLE_CATALOG], [k for k,_ in CTA_CATALOG]); record("bandit", STEP_IN, [OUT])
+    print(f"Updated {OUT}: {changed} new/changed observations, {len(engine.ledger)} posts in the posterior, {len(engine.contextual)} with context")
 if __name__=="__main__": main()
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Fan-out engine for the per-platform feeds derived from rss.xml.
+The master feed is parsed once; each platform transformer turns the shared,
+normalized items into its own copy, and every output file is written in one pass.
+Items already published are not re-transformed: a manifest records what each
+output holds, and new items are spliced onto the previous output.
+
+Outputs:
+    rss_fb.xml / rss_fb_live.xml   Facebook (all items / latest item)
+    rss_li.xml / rss_li_live.xml   LinkedIn
+    rss_x.xml  / rss_x_live.xml    X (280-char, newest first)
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from atomic_io import write_atomic, write_json
+from build_manifest import record, up_to_date
+from feed_store import ARCHIVE_DIR, ARCHIVE_INDEX_NAME, STAMP_RE, load_archive_index
+from logger_config import get_logger
+
+logger = get_logger(__name__)
+
+IN_FEED = "rss.xml"
+MANIFEST_PATH = "analytics/social_feeds.json"
+MANIFEST_VERSION = 1  # bump when a transformer's output changes, to force a full rebuild
+XML_DECL = b"<?xml version='1.0' encoding='utf-8'?>\n"
+FOOTER = b"</channel></rss>"
+CHANNEL_TAGS = ["title", "link", "description", "language", "lastBuildDate", "pubDate"]
+
+# Rotating hashtags - picked by item position, counted from the oldest item
+# (see rotating_tag) so a published item keeps its tag as newer ones arrive
+ROTATING_HASHTAGS = [
+    "#AIAutomations",
+    "#AICopilot",
+    "#OperateSmarterGrowFaster",
+    "#AIForBusiness",
+    "#NoMoreBusywork",
+    "#AIWorkflows"
+]
+BASE_SUFFIX = "#ScalePilot #SocialPilot"
+KNOWN_TAGS = [t.lower() for t in ROTATING_HASHTAGS + ["#scalepilot", "#socialpilot"]]
+
+X_LIMIT = 280
+X_PREFIX = ""
+X_SUFFIX = " " + BASE_SUFFIX
+HASHTAG_RE = re.compile(r"(?<!\w)#[A-Za-z0-9_]+")
+ZWJ = "\u200d"
+
+
+class FeedItem(NamedTuple):
+    """One master-feed item, cleaned once and shared by every platform."""
+    title: str
+    description: str
+    link: str
+    source_id: str           # raw <guid>, else the link
+    pub_date: Optional[str]  # raw RFC 822 string, passed through untouched
+    published: datetime      # parsed pub_date (datetime.min when missing/bad)
+
+
+class Platform(NamedTuple):
+    """A derived feed: output files plus the transformer that produces its items."""
+    key: str
+    out_all: str
+    out_live: str
+    transform: Callable[[List[FeedItem], int], List[Tuple[str, str]]]  # (items, feed size) -> [(text, guid)]
+    newest_first: bool
+    channel_title: Callable[[str], str]
+
+
+# ---------- Normalization ----------
+
+def clean(s: Optional[str]) -> str:
+    """Strip tags, decode entities and collapse whitespace."""
+    s = re.sub(r"<[^>]+>", "", s or "")
+    s = html.unescape(s)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def parse_date(pub: str) -> datetime:
+    try:
+        dt = parsedate_to_datetime(pub)
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError, IndexError):
+        return datetime.min.replace(tzinfo=timezone.utc)
+
+
+def parse_feed(path: str = IN_FEED) -> Tuple[Dict[str, str], List[ET.Element]]:
+    """
+    Parse the master feed once, leaving items raw until a transformer needs them.
+
+    Returns:
+        Tuple of (channel fields present in the source, <item> elements in document order)
+    """
+    ch = ET.parse(path).getroot().find("channel")
+    channel = {}
+    for tag in CHANNEL_TAGS:
+        src = ch.find(tag)
+        if src is not None:
+            channel[tag] = src.text or ""
+    return channel, ch.findall("item")
+
+
+def normalize(it: ET.Element) -> FeedItem:
+    link = (it.findtext("link") or "").strip()
+    pub = it.findtext("pubDate")
+    return FeedItem(
+        title=clean(it.findtext("title")),
+        description=clean(it.findtext("description")),
+        link=link,
+        source_id=it.findtext("guid") or link,
+        pub_date=pub,
+        published=parse_date(pub or ""),
+    )
+
+
+def load_feed(path: str = IN_FEED) -> Tuple[Dict[str, str], List[FeedItem]]:
+    """Parse and normalize every item of the master feed."""
+    channel, elems = parse_feed(path)
+    return channel, [normalize(e) for e in elems]
+
+
+class LazyItems:
+    """Normalizes master-feed items on first access, once for all platforms."""
+
+    def __init__(self, elems: List[ET.Element]):
+        self.elems = elems
+        self._cache: Dict[int, FeedItem] = {}
+
+    def __len__(self) -> int:
+        return len(self.elems)
+
+    def __getitem__(self, i: int) -> FeedItem:
+        if i not in self._cache:
+            self._cache[i] = normalize(self.elems[i])
+        return self._cache[i]
+
+    def all(self) -> List[FeedItem]:
+        return [self[i] for i in range(len(self))]
+
+
+def rotating_tag(idx: int, total: int) -> str:
+    """
+    Hashtag counted from the oldest item, so an item keeps its tag as newer ones arrive.
+
+    The per-platform scripts this replaced counted from the newest item, which
+    re-tagged every published item on each post; splicing new items onto the
+    previous output needs tags that stay put, so the first build after the
+    switch re-tagged the existing items once.
+    """
+    return ROTATING_HASHTAGS[(total - 1 - idx) % len(ROTATING_HASHTAGS)]
+
+
+def stable_guid(item: FeedItem, title: str, desc: str) -> str:
+    """Platform GUID: SHA-1 of the source GUID/link, else of the platform's own title/description."""
+    return hashlib.sha1((item.source_id or title or desc).encode("utf-8", "ignore")).hexdigest()
+
+
+# ---------- Facebook / LinkedIn ----------
+
+def suffixed_text(item: FeedItem, rotating_tag: str) -> str:
+    """Description (or title) with the brand hashtags, unless it already carries them."""
+    base = (item.description or item.title).strip()
+    full_suffix = f"{BASE_SUFFIX} {rotating_tag}"
+    if any(tag in base.lower() for tag in KNOWN_TAGS):
+        return base
+    return (base + " " + full_suffix).strip() if base else full_suffix
+
+
+def transform_suffixed(items: List[FeedItem], total: int) -> List[Tuple[str, str]]:
+    return [(suffixed_text(it, rotating_tag(idx, total)),
+             stable_guid(it, it.title, it.description))
+            for idx, it in enumerate(items)]
+
+
+# ---------- X ----------
+
+def strip_stamp(s: str) -> str:
+    return STAMP_RE.sub("", s or "").strip()
+
+
+def strip_hashtags(s: str) -> str:
+    s = HASHTAG_RE.sub("", s or "")
+    return re.sub(r"\s{2,}", " ", s).strip()
+
+
+def _unsafe_tail(s: str) -> bool:
+    if s.endswith(ZWJ):
+        return True
+    o = ord(s[-1]) if s else 0
+    return (0xFE0E <= o <= 0xFE0F or 0x1F3FB <= o <= 0x1F3FF
+            or o == 0x20E3 or 0x1F1E6 <= o <= 0x1F1FF)
+
+
+def emoji_safe_truncate(text: str, limit: int) -> str:
+    """Cut at a word boundary without splitting emoji sequences, adding an ellipsis."""
+    if limit <= 0: return ""
+    if len(text) <= limit: return text
+    s = text[:max(0, limit - 1)]
+    while s and _unsafe_tail(s): s = s[:-1]
+    if " " in s: s = s.rsplit(" ", 1)[0]
+    return s + "…"
+
+
+def x_text(body: str, rotating_tag: str) -> str:
+    """Hashtag-free body truncated to leave room for the brand suffix."""
+    body = strip_hashtags(body)
+    full_suffix = f"{X_SUFFIX} {rotating_tag}"
+    txt = emoji_safe_truncate(body, max(0, X_LIMIT - len(X_PREFIX) - len(full_suffix)))
+    txt = f"{X_PREFIX}{txt}{full_suffix}"
+    if len(txt) > X_LIMIT: txt = emoji_safe_truncate(txt, X_LIMIT)
+    return txt
+
+
+def transform_x(items: List[FeedItem], total: int) -> List[Tuple[str, str]]:
+    out = []
+    for idx, it in enumerate(items):
+        title = strip_stamp(it.title)
+        desc = strip_stamp(it.description)
+        out.append((x_text(title or desc, rotating_tag(idx, total)),
+                    stable_guid(it, title, desc)))
+    return out
+
+
+PLATFORMS: Dict[str, Platform] = {
+    "fb": Platform("fb", "rss_fb.xml", "rss_fb_live.xml", transform_suffixed, False, lambda t: t),
+    "li": Platform("li", "rss_li.xml", "rss_li_live.xml", transform_suffixed, False, lambda t: t),
+    "x": Platform("x", "rss_x.xml", "rss_x_live.xml", transform_x, True,
+                  lambda t: (t or "RSS") + " (X)"),
+}
+
+
+# ---------- Output ----------
+
+def order_items(platform: Platform, items: List[FeedItem]) -> List[FeedItem]:
+    # sorted() is stable, so same-date items keep feed order
+    return sorted(items, key=lambda it: it.published, reverse=True) if platform.newest_first else list(items)
+
+
+def render_items(platform: Platform, items: List[FeedItem], total: int) -> List[bytes]:
+    """Serialized <item> elements for items already in platform order."""
+    out = []
+    for it, (text, guid) in zip(items, platform.transform(items, total)):
+        n = ET.Element("item")
+        ET.SubElement(n, "title").text = text
+        ET.SubElement(n, "description").text = text
+        ET.SubElement(n, "link").text = it.link
+        ET.SubElement(n, "guid", attrib={"isPermaLink": "false"}).text = guid
+        if it.pub_date: ET.SubElement(n, "pubDate").text = it.pub_date
+        out.append(ET.tostring(n, encoding="unicode").encode("utf-8"))
+    return out
+
+
+def render_header(platform: Platform, channel: Dict[str, str]) -> bytes:
+    parts = [XML_DECL, b'<rss version="2.0"><channel>']
+    for tag, val in channel.items():
+        node = ET.Element(tag)
+        node.text = platform.channel_title(val) if tag == "title" else val
+        parts.append(ET.tostring(node, encoding="unicode").encode("utf-8"))
+    return b"".join(parts)
+
+
+def load_manifest(path: str) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+
+def spliceable_body(path: str, entry: Optional[Dict]) -> Optional[bytes]:
+    """Item bytes of the previous output, if it is exactly what the manifest recorded."""
+    if not entry or not entry.get("count"):
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    start = data.find(b"<item>")
+    if hashlib.sha1(data).hexdigest() != entry.get("sha1") or start < 0 or not data.endswith(FOOTER):
+        return None
+    return data[start:-len(FOOTER)]
+
+
+def new_items(platform: Platform, items: LazyItems, entry: Dict) -> Optional[Tuple[List[FeedItem], int]]:
+    """
+    Items added to the master feed since the manifest entry, in platform order.
+
+    Returns:
+        Tuple of (new items, number of oldest items that left the master feed's
+        retention window), or None when the history changed and a full rebuild is needed
+    """
+    fresh = []
+    for i in range(len(items)):
+        if items[i].source_id == entry.get("source_head"):
+            break
+        fresh.append(items[i])
+    else:
+        return None
+    dropped = entry.get("count", -1) + len(fresh) - len(items)
+    if dropped < 0:
+        return None
+    fresh = order_items(platform, fresh)
+    # new items must sort ahead of everything already published on date-ordered feeds
+    if platform.newest_first and fresh and fresh[-1].published.timestamp() < entry.get("newest", 0):
+        return None
+    return fresh, dropped
+
+
+def trim_oldest(platform: Platform, body: bytes, dropped: int, oldest: FeedItem) -> Optional[bytes]:
+    """Cut the last `dropped` serialized items; None unless what remains ends with `oldest`."""
+    for _ in range(dropped):
+        cut = body.rfind(b"<item>")
+        if cut < 0:
+            return None
+        body = body[:cut]
+    guid = platform.transform([oldest], 1)[0][1]
+    return body if f">{guid}</guid>".encode() in body[body.rfind(b"<item>"):] else None
+
+
+def build_platform(platform: Platform, channel: Dict[str, str], items: LazyItems,
+                   out_all: str, entry: Optional[Dict], archived: int = 0) -> Tuple[bytes, bytes, Dict]:
+    """
+    Render one platform's outputs, splicing new items onto the previous output when possible.
+
+    Hashtags are counted over the whole history (archived + live items), so
+    items keep their tag as the master feed's window slides.
+
+    Returns:
+        Tuple of (all-items feed bytes, live feed bytes, manifest entry)
+    """
+    header = render_header(platform, channel)
+    total = len(items) + archived
+    body = spliceable_body(out_all, entry)
+    plan = new_items(platform, items, entry) if body is not None else None
+    if plan is not None and plan[1]:
+        body = trim_oldest(platform, body, plan[1], items[len(items) - 1]) if len(plan[0]) < len(items) else None
+        plan = plan if body is not None else None
+    if plan is None:
+        ordered = order_items(platform, items.all())
+        rendered = render_items(platform, ordered, total)
+        head, body, mode = ordered[:1], b"".join(rendered), "full"
+    else:
+        rendered = render_items(platform, plan[0], total)
+        head, body, mode = plan[0][:1], b"".join(rendered) + body, "incremental"
+    logger.info(f"{platform.key}: transformed {len(rendered)} of {len(items)} items ({mode})")
+
+    live = body[:body.find(b"</item>") + len(b"</item>")] if body else b""
+    all_bytes = header + body + FOOTER
+    if head:
+        newest = head[0].published.timestamp()
+    else:
+        newest = entry.get("newest", 0) if entry else 0
+    return all_bytes, header + live + FOOTER, {
+        "source_head": items[0].source_id if len(items) else None,
+        "count": len(items),
+        "newest": newest,
+        "sha1": hashlib.sha1(all_bytes).hexdigest(),
+    }
+
+
+def write_bytes(path: str, data: bytes) -> str:
+    print("Wrote" if write_atomic(path, data) else "Unchanged", path)
+    return path
+
+
+def build_feeds(keys: Optional[List[str]] = None, in_feed: str = IN_FEED, out_dir: str = ".",
+                workers: int = 1, manifest_path: str = MANIFEST_PATH, full: bool = False,
+                archive_dir: str = ARCHIVE_DIR) -> List[str]:
+    """
+    Build the derived feeds from a single parse of the master feed.
+
+    Only items added since the last build are transformed; they are spliced onto
+    the previous outputs recorded in the manifest. Anything unexpected (edited
+    outputs, removed or reordered history) falls back to a full rebuild.
+
+    Args:
+        keys: Platform keys to build (default: all)
+        in_feed: Master feed path
+        out_dir: Directory for the output files
+        workers: Threads used to write the outputs (1 = sequential)
+        manifest_path: Build manifest (per-platform head, item count and output hash)
+        full: Ignore the manifest and rebuild everything
+        archive_dir: Master-feed archive, whose item count offsets the hashtag rotation
+
+    Returns:
+        Paths written, in platform order
+    """
+    channel, elems = parse_feed(in_feed)
+    items = LazyItems(elems)
+    archived = load_archive_index(archive_dir).get("archived", 0)
+    manifest = {} if full else load_manifest(manifest_path)
+    entries = dict(manifest.get("platforms", {}))
+    jobs = []
+    for key in keys or list(PLATFORMS):
+        platform = PLATFORMS[key]
+        out_all = os.path.normpath(os.path.join(out_dir, platform.out_all))
+        all_bytes, live_bytes, entries[key] = build_platform(platform, channel, items, out_all,
+                                                             entries.get(key), archived)
+        jobs.append((out_all, all_bytes))
+        jobs.append((os.path.normpath(os.path.join(out_dir, platform.out_live)), live_bytes))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(lambda job: write_bytes(*job), jobs))
+    else:
+        written = [write_bytes(path, data) for path, data in jobs]
+
+    write_json(manifest_path, {"version": MANIFEST_VERSION, "platforms": entries}, indent=2, sort_keys=True)
+    return written
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Build the per-platform feeds from rss.xml in one pass.")
+    ap.add_argument("platforms", nargs="*", help=f"any of {', '.join(PLATFORMS)} (default: all)")
+    ap.add_argument("--in", dest="in_feed", default=IN_FEED)
+    ap.add_argument("--out-dir", default=".")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--manifest", default=MANIFEST_PATH)
+    ap.add_argument("--full", action="store_true", help="ignore the manifest and rebuild everything")
+    args = ap.parse_args(argv)
+    unknown = [p for p in args.platforms if p not in PLATFORMS]
+    if unknown:
+        ap.error(f"unknown platform(s): {', '.join(unknown)}")
+
+    if not os.path.exists(args.in_feed):
+        print(f"{args.in_feed} not found", file=sys.stderr)
+        return 1
+    keys = args.platforms or list(PLATFORMS)
+    inputs = [args.in_feed, os.path.join(ARCHIVE_DIR, ARCHIVE_INDEX_NAME), __file__]
+    outputs = [os.path.join(args.out_dir, out) for key in keys
+               for out in (PLATFORMS[key].out_all, PLATFORMS[key].out_live)] + [args.manifest]
+    step = "social_feeds" if not args.platforms else f"social_feeds-{'-'.join(keys)}"
+    if not args.full and up_to_date(step, inputs, outputs):
+        print("Social feeds up to date.")
+        return 0
+    build_feeds(keys, args.in_feed, args.out_dir, args.workers,
+                manifest_path=args.manifest, full=args.full)
+    record(step, inputs, outputs)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+"""Tests for the atomic, skip-if-unchanged writers."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from atomic_io import append_lines, atomic_open, write_atomic, write_json
+
+
+class TestAtomicWrites:
+    """Test replace-on-success and unchanged-content skips."""
+
+    def test_skips_identical_content(self, tmp_path):
+        """Should not rewrite (or touch the mtime of) a file that already holds the bytes."""
+        path = str(tmp_path / "out" / "a.json")
+        assert write_json(path, {"a": 1}, indent=2)
+        os.utime(path, (1, 1))
+
+        assert not write_json(path, {"a": 1}, indent=2)
+        assert os.stat(path).st_mtime == 1
+        assert write_json(path, {"a": 2}, indent=2)
+        assert open(path, encoding="utf-8").read() == '{\n  "a": 2\n}'
+
+    def test_failed_stream_keeps_old_file(self, tmp_path):
+        """Should leave the previous file and no temp file behind when the writer raises."""
+        path = str(tmp_path / "feed.xml")
+        write_atomic(path, "<rss/>")
+        with pytest.raises(RuntimeError):
+            with atomic_open(path) as f:
+                f.write("<rss><channel>")
+                raise RuntimeError("cancelled")
+
+        assert open(path, encoding="utf-8").read() == "<rss/>"
+        assert os.listdir(tmp_path) == ["feed.xml"]
+
+    def test_stream_replaces_only_on_change(self, tmp_path):
+        """Should swap in streamed content, and keep the old inode when nothing changed."""
+        path = str(tmp_path / "rows.csv")
+        with atomic_open(path, newline="") as f:
+            f.write("a,b\r\n")
+        inode = os.stat(path).st_ino
+        with atomic_open(path, newline="") as f:
+            f.write("a,b\r\n")
+        assert os.stat(path).st_ino == inode
+
+        with atomic_open(path, "wb") as f:
+            f.write(b"c\n")
+        assert open(path, "rb").read() == b"c\n"
+
+
+class TestAppendLines:
+    """Test durable appends to line logs."""
+
+    def test_appends_and_creates(self, tmp_path):
+        """Should create the log and add complete lines."""
+        path = str(tmp_path / "log" / "items.jsonl")
+        assert append_lines(path, ["a\n"]) == 0
+        assert append_lines(path, ["b\n", "c\n"]) == 0
+        assert open(path, encoding="utf-8").read() == "a\nb\nc\n"
+
+    def test_cuts_torn_tail(self, tmp_path):
+        """Should drop a partial last line before appending."""
+        path = tmp_path / "items.jsonl"
+        path.write_bytes(b'{"a": 1}\n{"b": ')
+        assert append_lines(str(path), ['{"c": 3}\n']) == 6
+        assert path.read_bytes() == b'{"a": 1}\n{"c": 3}\n'
+
+        path.write_bytes(b'{"torn')
+        assert append_lines(str(path), ["x\n"]) == 6
+        assert path.read_bytes() == b"x\n"
@@ -0,0 +1,106 @@
+"""Tests for the content-addressed backup store."""
+
+import glob
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backup_manager
+from backup_manager import backup_file, get_latest_backup, list_backups, load_catalog, restore_backup, split_chunks
+
+
+def feed(n):
+    items = "".join(f"<item><title>Tip {i}</title><guid>g{i}</guid></item>" for i in range(n, 0, -1))
+    return f'<?xml version="1.0"?><rss><channel><title>CF</title>{items}</channel></rss>'.encode()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_manager, "BACKUP_DIR", str(tmp_path / "backups"))
+    return tmp_path
+
+
+def objects(root):
+    return glob.glob(str(root / "backups" / "objects" / "*" / "*.gz"))
+
+
+class TestBackupStore:
+    """Test chunked snapshots, dedup and restore."""
+
+    def test_chunks_rejoin_at_item_boundaries(self):
+        """Should cut before every <item> and reassemble byte for byte."""
+        data = feed(3)
+        chunks = list(split_chunks(data))
+        assert b"".join(chunks) == data
+        assert len(chunks) == 4 and all(c.startswith(b"<item>") for c in chunks[1:])
+
+    def test_new_item_adds_only_changed_chunks(self, store):
+        """Should store only the new item, not a second copy of the feed."""
+        path = store / "rss.xml"
+        path.write_bytes(feed(20))
+        backup_file(str(path))
+        before = len(objects(store))
+        path.write_bytes(feed(21))
+        backup_file(str(path))
+
+        assert before == 21 and len(objects(store)) == before + 1
+
+    def test_restore_round_trip(self, store):
+        """Should rebuild any snapshot exactly and snapshot the file it replaces."""
+        path = store / "rss.xml"
+        path.write_bytes(feed(5))
+        first = backup_file(str(path))
+        path.write_bytes(feed(6))
+
+        assert restore_backup(first, str(path))
+        assert path.read_bytes() == feed(5)
+        assert len(list_backups("rss.xml")) == 2
+
+    def test_prunes_snapshots_and_orphan_chunks(self, store):
+        """Should keep the newest snapshots and drop chunks only they no longer share."""
+        path = store / "rss.xml"
+        for n in range(1, 6):
+            path.write_bytes(feed(n))
+            backup_file(str(path), keep_count=2)
+
+        kept = list_backups("rss.xml")
+        assert len(kept) == 2
+        assert restore_backup(kept[-1], str(store / "out.xml"))
+        assert (store / "out.xml").read_bytes() == feed(4)
+        assert len(objects(store)) == 1 + 5  # header and items 1-5; nothing else was pruned away
+
+    def test_restores_legacy_copy(self, store):
+        """Should fold plain copies from the old backup format into the catalog and restore them."""
+        os.makedirs(backup_manager.BACKUP_DIR)
+        legacy = os.path.join(backup_manager.BACKUP_DIR, "rss_20240101_000000.xml")
+        with open(legacy, "wb") as fh:
+            fh.write(b"<rss/>")
+
+        assert list_backups("rss.xml") == [legacy]
+        assert restore_backup(legacy, str(store / "rss.xml"))
+        assert (store / "rss.xml").read_bytes() == b"<rss/>"
+
+    def test_same_second_backups_keep_order(self, store):
+        """Should give each snapshot its own sequence number, newest last."""
+        path = store / "rss.xml"
+        ids = []
+        for n in range(1, 4):
+            path.write_bytes(feed(n))
+            ids.append(backup_file(str(path)))
+
+        assert len(set(ids)) == 3 and list_backups("rss.xml") == ids[::-1]
+        assert [s["seq"] for s in load_catalog()["files"]["rss.xml"]["snapshots"]] == [1, 2, 3]
+
+    def test_queries_do_not_scan_directory(self, store, monkeypatch):
+        """Should answer list, latest and prune from the catalog alone."""
+        path = store / "rss.xml"
+        path.write_bytes(feed(2))
+        backup_file(str(path))
+        monkeypatch.setattr(backup_manager.glob, "glob", lambda *a, **k: pytest.fail("scanned backups/"))
+        latest = backup_file(str(path), keep_count=1)
+
+        assert get_latest_backup("rss.xml") == latest and list_backups("rss.xml") == [latest]
+        assert get_latest_backup("other.xml") is None
@@ -0,0 +1,192 @@
+"""Tests for the Thompson-sampling bandit engine."""
+
+import os
+import random
+import sys
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts')))
+
+import build_rss
+import update_bandit
+from bandit_engine import (BANDIT_VERSION, CONTEXT_TZ, LINUCB_MIN_OBS, BanditEngine, LinUCB, arm_key,
+                           context_at, context_from_tag, context_tag, context_vector)
+
+
+class TestBanditEngine:
+    """Test incremental posterior updates and sampling."""
+
+    def test_revised_score_replaces_observation(self):
+        """Should swap a post's old reward for its new one instead of adding both."""
+        engine = BanditEngine()
+        assert engine.observe("g1", "a|q", 2.0)
+        assert engine.observe("g1", "a|q", 5.0)
+        assert not engine.observe("g1", "a|q", 5.0)
+
+        assert engine.arms["a|q"] == [1.0, 5.0, 25.0]
+
+    def test_moved_post_changes_arm(self):
+        """Should move a post's observation when its arm changes."""
+        engine = BanditEngine()
+        engine.observe("g1", "a|q", 3.0)
+        engine.observe("g1", "b|q", 3.0)
+
+        assert engine.arms["a|q"][0] == 0 and engine.arms["b|q"][0] == 1
+
+    def test_converges_to_best_arm(self):
+        """Should concentrate draws on the arm with the highest mean reward."""
+        rng = random.Random(7)
+        means = {"a|q": 1.0, "b|q": 4.0, "c|q": 2.0}
+        engine = BanditEngine()
+        for i in range(200):
+            arm = engine.sample(list(means), rng)
+            engine.observe(f"g{i}", arm, rng.gauss(means[arm], 1.5))
+
+        rates = engine.win_rates(list(means), rng=rng)
+        assert max(rates, key=rates.get) == "b|q" and rates["b|q"] > 0.9
+
+    def test_round_trip(self, tmp_path):
+        """Should persist arms and ledger and publish marginal weights."""
+        engine = BanditEngine()
+        engine.observe("g1", "coach_tip|question", 4.0)
+        path = str(tmp_path / "bandit.json")
+        engine.save(path, ["coach_tip", "checklist"], ["question"])
+
+        loaded = BanditEngine.load(path)
+        assert loaded.ledger == {"g1": ["coach_tip|question", 4.0]}
+        assert loaded.arms == engine.arms
+        data = loaded.to_dict(["coach_tip", "checklist"], ["question"])
+        assert abs(sum(data["style_weights"].values()) - 1.0) < 0.01
+
+    def test_v1_file_starts_empty(self):
+        """Should ignore the old softmax-only bandit.json."""
+        assert BanditEngine.from_dict({"style_weights": {"coach_tip": 1}}).arms == {}
+
+
+class TestLinUCB:
+    """Test the contextual model's incremental updates and choices."""
+
+    def test_inverse_tracks_design_matrix(self):
+        """Should keep A_inv equal to inv(A) through adds, revisions and moves."""
+        model = LinUCB()
+        rng = random.Random(3)
+        for i in range(60):
+            x = context_vector(rng.choice(["morning", "evening"]), i % 3 == 0, i % 2 == 0)
+            model.observe(f"g{i % 25}", rng.choice(["a|q", "b|q"]), rng.random(), x)
+
+        assert np.allclose(model.A_inv, np.linalg.inv(model.A))
+        assert np.allclose(model.A.sum(axis=0), len(model.arms) * np.eye(9) + sum(
+            np.outer(p[2], p[2]) for p in model.ledger.values()))
+
+    def test_revised_reward_keeps_design(self):
+        """Should only move b when a post's reward changes under the same context."""
+        model = LinUCB()
+        x = context_vector("morning", False, True)
+        model.observe("g1", "a|q", 1.0, x)
+        A = model.A.copy()
+        assert model.observe("g1", "a|q", 3.0, x)
+        assert not model.observe("g1", "a|q", 3.0, x)
+
+        assert np.array_equal(model.A, A) and np.allclose(model.b[0], 3.0 * x)
+
+    def test_picks_best_arm_per_context(self):
+        """Should learn that the best arm depends on the hour bucket."""
+        model = LinUCB(alpha=0.1)
+        morning, evening = context_vector("morning", False, False), context_vector("evening", False, False)
+        for i in range(40):
+            model.observe(f"m{i}a", "a|q", 5.0, morning)
+            model.observe(f"m{i}b", "b|q", 1.0, morning)
+            model.observe(f"e{i}a", "a|q", 1.0, evening)
+            model.observe(f"e{i}b", "b|q", 5.0, evening)
+
+        assert model.choose(morning, ["a|q", "b|q"]) == "a|q"
+        assert model.choose(evening, ["a|q", "b|q"]) == "b|q"
+
+    def test_context_at_buckets_local_time(self):
+        """Should bucket by Phoenix time and flag weekends."""
+        x = context_at(datetime(2026, 10, 17, 10, 30, tzinfo=CONTEXT_TZ), has_number=True)
+        assert x.tolist() == context_vector("morning", True, True).tolist()
+
+    def test_context_tag_round_trip(self):
+        """Should label a context compactly and read the same vector back."""
+        saturday = datetime(2026, 10, 17, 10, 30, tzinfo=CONTEXT_TZ)
+        tag = context_tag(saturday, has_number=True)
+        assert tag == "morning/weekend/number"
+        assert context_from_tag(tag).tolist() == context_at(saturday, has_number=True).tolist()
+        assert context_from_tag("") is None and context_from_tag("noon/weekday") is None
+
+    def test_round_trip(self, tmp_path):
+        """Should persist the contextual model with the engine."""
+        engine = BanditEngine()
+        engine.observe("g1", "a|q", 2.0, context_vector("night", False, False))
+        path = str(tmp_path / "bandit.json")
+        engine.save(path, ["a"], ["q"])
+
+        loaded = BanditEngine.load(path).contextual
+        assert len(loaded) == 1 and np.allclose(loaded.A_inv, engine.contextual.A_inv)
+
+
+class TestChooseArm:
+    """Test how build_rss samples style and CTA."""
+
+    def test_samples_catalog_pair(self):
+        """Should return a catalog style with its description and a catalog CTA."""
+        band = BanditEngine().to_dict()
+        assert band["version"] == BANDIT_VERSION
+        style, desc, cta = build_rss.choose_arm(band)
+
+        assert build_rss.STYLE_DESCS[style] == desc
+        assert cta in build_rss.CTA_DESCS
+        assert build_rss.with_cta(desc, cta).endswith(build_rss.CTA_DESCS[cta])
+
+    def test_prefers_winning_arm(self):
+        """Should pick the arm whose posterior clearly dominates."""
+        engine = BanditEngine()
+        arms = [arm_key(s, c) for s, _ in build_rss.STYLE_CATALOG for c, _ in build_rss.CTA_CATALOG]
+        for arm in arms:
+            for i in range(5):
+                engine.observe(f"{arm}-{i}", arm, 50.0 if arm == "checklist|pollish" else 1.0 + i)
+        picks = {build_rss.choose_arm(engine.to_dict())[::2] for _ in range(20)}
+
+        assert picks == {("checklist", "pollish")}
+
+    def test_legacy_weights_leave_cta_to_model(self):
+        """Should fall back to the style lottery for a v1 bandit.json."""
+        style, _, cta = build_rss.choose_arm({"style_weights": {"checklist": 1.0}})
+        assert style in build_rss.STYLE_DESCS and cta is None
+
+    def test_contextual_model_takes_over(self):
+        """Should follow LinUCB for today's context once it has enough posts."""
+        engine = BanditEngine()
+        noon = datetime(2026, 10, 14, 12, 0, tzinfo=CONTEXT_TZ)
+        x = context_at(noon)
+        arms = [arm_key(s, c) for s, _ in build_rss.STYLE_CATALOG for c, _ in build_rss.CTA_CATALOG]
+        for i in range(LINUCB_MIN_OBS):
+            for arm in arms:
+                engine.observe(f"{arm}-{i}", arm, 20.0 if arm == "checklist|tip" else 0.0, x)
+
+        assert build_rss.choose_arm(engine.to_dict(), now=noon)[::2] == ("checklist", "tip")
+
+
+class TestUpdateBandit:
+    """Test feeding posts_features.csv into the engine."""
+
+    def test_skips_posts_already_recorded(self, tmp_path, monkeypatch):
+        """Should only build observations for posts whose arm or score moved since the ledger entry."""
+        path = tmp_path / "posts.csv"
+        path.write_text("guid,style,cta,arm_context,hour_bucket,pubDate_local,has_number,likes,eng_score\n"
+                        "g1,coach_tip,question,morning/weekday/plain,,,0,2,2.0\n"
+                        "g2,checklist,save,morning/weekday/plain,,,0,3,3.0\n"
+                        "g3,checklist,save,morning/weekday/plain,,,0,4,4.0\n", encoding="utf-8")
+        engine = BanditEngine()
+        x = context_from_tag("morning/weekday/plain")
+        engine.observe("g1", "coach_tip|question", 2.0, x)
+        engine.observe("g2", "checklist|save", 1.0, x)
+        built = []
+        monkeypatch.setattr(update_bandit, "context_from_tag", lambda tag: built.append(tag) or x)
+
+        assert [o[0] for o in update_bandit.observations(str(path), engine)] == ["g2", "g3"]
+        assert len(built) == 2
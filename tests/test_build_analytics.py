@@ -0,0 +1,196 @@
+"""Tests for incremental feature extraction in scripts/build_analytics.py."""
+
+import os
+import sys
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+import bench_analytics
+import build_analytics
+import build_manifest
+from metrics_store import MetricsStore
+
+ITEM = """<item><title>{title}</title><description>• Point one
+Which one? #career</description><link>https://x/{i}</link><guid>g{i}</guid>
+<pubDate>Mon, 0{i} Jan 2024 16:00:00 +0000</pubDate>
+<category domain="style">coach_tip</category><category domain="cta">question</category></item>"""
+
+
+def write_feed(path, titles):
+    items = "".join(ITEM.format(i=i, title=t) for i, t in enumerate(titles, 1))
+    path.write_text(f"<rss version='2.0'><channel><title>CF</title>{items}</channel></rss>", encoding="utf-8")
+
+
+@pytest.fixture
+def an(tmp_path, monkeypatch):
+    """Point the script at a scratch feed, engagement file and outputs."""
+    for name, file in [("RSS_MAIN", "rss.xml"), ("ENG_CSV", "engagement.csv"), ("OUT_POSTS", "posts.csv"),
+                       ("OUT_SUM", "summary.csv"), ("OUT_MD", "report.md"), ("OUT_CHAT", "chat.md"),
+                       ("FEATURE_CACHE", "cache.json"), ("ENG_INDEX", "eng_index.json"), ("ARCHIVE_DIR", "archive"),
+                       ("OUT_BUNDLE", "bundle.json"), ("METRICS_DIR", "metrics")]:
+        monkeypatch.setattr(build_analytics, name, str(tmp_path / file))
+    monkeypatch.setattr(build_analytics.load_cache, "__defaults__", (str(tmp_path / "cache.json"),))
+    monkeypatch.setattr(build_analytics.save_cache, "__defaults__", (str(tmp_path / "cache.json"),))
+    monkeypatch.setattr(build_analytics.load_eng_index, "__defaults__", (str(tmp_path / "eng_index.json"),))
+    monkeypatch.setattr(build_analytics.save_eng_index, "__defaults__", (str(tmp_path / "eng_index.json"),))
+    monkeypatch.setattr(build_manifest, "BUILD_DIR", str(tmp_path / "build"))
+    write_feed(tmp_path / "rss.xml", ["Lead with 3 numbers 📈", "Ask better questions 💡"])
+    (tmp_path / "engagement.csv").write_text("guid,platform,likes,replies,reposts,impressions,clicks,saves\n"
+                                             "g1,x,4,1,0,100,2,0\n", encoding="utf-8")
+    return tmp_path
+
+
+def outputs(tmp_path):
+    return [(tmp_path / f).read_text(encoding="utf-8") for f in ("posts.csv", "summary.csv")]
+
+
+class TestIncremental:
+    """Test the feature cache."""
+
+    def test_matches_full_rebuild(self, an, monkeypatch):
+        """Should match a cold rebuild after posts and engagement change."""
+        build_analytics.main([])
+        write_feed(an / "rss.xml", ["Lead with 3 numbers 📈", "Ask better questions today", "New post 🚀"])
+        with open(an / "engagement.csv", "a", encoding="utf-8") as f:
+            f.write("g2,li,10,0,1,50,0,2\n")
+
+        calls = []
+        real = build_analytics.post_features
+        monkeypatch.setattr(build_analytics, "post_features", lambda it: calls.append(it["guid"]) or real(it))
+        build_analytics.main([])
+        incremental = outputs(an)
+        monkeypatch.setattr(build_analytics, "post_features", real)
+        build_analytics.main(["--rebuild"])
+
+        assert calls == ["g2", "g3"]
+        assert incremental == outputs(an)
+
+    def test_unchanged_inputs_skip_outputs(self, an, capsys):
+        """Should exit on the build manifest, or on the caches without it, when nothing changed."""
+        build_analytics.main([])
+        build_analytics.main([])
+        assert capsys.readouterr().out.strip().endswith("Analytics up to date.")
+        os.remove(an / "build" / "analytics.json")
+        build_analytics.main([])
+        assert capsys.readouterr().out.strip().endswith("Analytics unchanged.")
+
+
+class TestColumnar:
+    """Test the vectorized aggregation."""
+
+    def test_matches_row_loop(self, an):
+        """Should produce the same summary rows as the per-row loop."""
+        posts = [build_analytics.post_features(it) for it in build_analytics.read_rss(str(an / "rss.xml"))]
+        eng = bench_analytics.read_engagement(str(an / "engagement.csv"))
+        expected = bench_analytics.summarize(posts, {e["guid"]: [e] for e in eng})
+
+        idx = build_analytics.empty_eng_index()
+        build_analytics.fold_engagement(str(an / "engagement.csv"), idx)
+        totals = build_analytics.engagement_totals(idx, [p["guid"] for p in posts])
+        scores = np.round(totals @ build_analytics.SCORE_WEIGHTS, 2)
+        labels = {}
+        for p in posts:
+            for feat, bucket in build_analytics.bucket_keys(p):
+                labels.setdefault(feat, []).append(bucket)
+        assert build_analytics.summarize_columnar(scores, labels) == expected
+
+    def test_blank_metrics_count_as_zero(self, an, monkeypatch):
+        """Should sum repeated rows per post across batches and treat blank cells as 0."""
+        monkeypatch.setattr(build_analytics, "FOLD_BATCH", 2)
+        (an / "engagement.csv").write_text("guid,platform,likes,replies,reposts,impressions,clicks,saves\n"
+                                           "g1,x,4,,0,100,2,0\n# note\ng1,li,1,2,,,,\nzz,x,9,9,9,9,9,9\n",
+                                           encoding="utf-8")
+        idx = build_analytics.empty_eng_index()
+        build_analytics.fold_engagement(str(an / "engagement.csv"), idx)
+        totals = build_analytics.engagement_totals(idx, ["g1", "g2"])
+        assert totals.tolist() == [[5, 2, 0, 100, 2, 0], [0, 0, 0, 0, 0, 0]]
+
+
+def fold(path, idx):
+    build_analytics.fold_engagement(str(path), idx)
+    return idx["totals"]
+
+
+class TestEngagementIndex:
+    """Test streaming engagement.csv into running totals."""
+
+    HEADER = "guid,platform,day,likes,replies,reposts,impressions,clicks,saves\n"
+
+    def test_appended_rows_fold_incrementally(self, tmp_path):
+        """Should count only rows appended since the last fold."""
+        csv_path = tmp_path / "engagement.csv"
+        csv_path.write_text(self.HEADER + "g1,x,2024-01-01,1,0,0,10,0,0\n", encoding="utf-8")
+        idx = build_analytics.empty_eng_index()
+        fold(csv_path, idx)
+        with open(csv_path, "a", encoding="utf-8") as f:
+            f.write("g1,x,2024-01-02,2,0,0,20,0,0\ng2,li,2024-01-02,5,1,0,0,0,0\n")
+
+        assert build_analytics.fold_engagement(str(csv_path), idx) == 2
+        assert idx["totals"] == {"g1": [3, 0, 0, 30, 0, 0], "g2": [5, 1, 0, 0, 0, 0]}
+
+    def test_reexported_day_is_skipped(self, tmp_path):
+        """Should not double count a guid/platform/day that was already folded."""
+        csv_path = tmp_path / "engagement.csv"
+        csv_path.write_text(self.HEADER + "g1,x,2024-01-01,1,0,0,10,0,0\n", encoding="utf-8")
+        idx = build_analytics.empty_eng_index()
+        fold(csv_path, idx)
+        with open(csv_path, "a", encoding="utf-8") as f:
+            f.write("g1,x,2024-01-01,1,0,0,10,0,0\ng1,li,2024-01-01,4,0,0,0,0,0\n")
+
+        assert fold(csv_path, idx) == {"g1": [5, 0, 0, 10, 0, 0]}
+
+    def test_index_keeps_one_day_per_platform(self, tmp_path):
+        """Should keep only the last counted day per guid/platform, not every day seen."""
+        csv_path = tmp_path / "engagement.csv"
+        rows = "".join(f"g1,x,2024-01-{d:02d},1,0,0,0,0,0\n" for d in range(1, 29))
+        csv_path.write_text(self.HEADER + rows + "g1,x,2024-01-05,1,0,0,0,0,0\n", encoding="utf-8")
+        idx = build_analytics.empty_eng_index()
+
+        assert fold(csv_path, idx) == {"g1": [28, 0, 0, 0, 0, 0]}
+        assert idx["last_day"] == {"g1": {"x": "2024-01-28"}}
+
+    def test_edited_file_refolds_from_scratch(self, tmp_path):
+        """Should recount everything when already-counted rows were edited."""
+        csv_path = tmp_path / "engagement.csv"
+        csv_path.write_text(self.HEADER + "g1,x,,1,0,0,10,0,0\n", encoding="utf-8")
+        idx = build_analytics.empty_eng_index()
+        fold(csv_path, idx)
+        csv_path.write_text(self.HEADER + "g1,x,,7,0,0,10,0,0\ng1,x,,1,0,0,0,0,0\n", encoding="utf-8")
+
+        assert fold(csv_path, idx) == {"g1": [8, 0, 0, 10, 0, 0]}
+
+
+class TestBundle:
+    """Test the pre-aggregated page bundle."""
+
+    def test_bundle_matches_outputs(self, an):
+        """Should carry KPIs, ranked top posts and feature series consistent with the CSVs."""
+        build_analytics.main([])
+        bundle = json.loads((an / "bundle.json").read_text(encoding="utf-8"))
+
+        assert bundle["version"] == build_analytics.BUNDLE_VERSION
+        assert bundle["kpi"]["total_posts"] == 2 and bundle["kpi"]["with_metrics"] == 1
+        assert [t["eng_score"] for t in bundle["top"]] == [7.0, 0.0]
+        assert bundle["features"]["style"] == [{"bucket": "coach_tip", "avg": 3.5, "n": 2}]
+        assert bundle["top_by_style"]["coach_tip"][0]["eng_score"] == 7.0
+
+    def test_engagement_window(self, an):
+        """Should sum only Buffer metrics inside the window, once per id."""
+        today = datetime.now(timezone.utc).date()
+        recent, old = (today - timedelta(days=2)).isoformat(), (today - timedelta(days=40)).isoformat()
+        store = MetricsStore(str(an / "metrics"))
+        store.upsert([{"id": "a", "day": recent, "service": "linkedin", "clicks": 1, "likes": 2},
+                      {"id": "b", "day": old, "service": "linkedin", "clicks": 5, "likes": 5}])
+        store.upsert([{"id": "a", "day": recent, "service": "linkedin", "clicks": 3, "likes": 2}])
+
+        eng = build_analytics.metrics_window(str(an / "metrics"), today)
+        assert eng["totals"] == {"clicks": 3, "likes": 2, "comments": 0, "shares": 0}
+        assert eng["daily"] == {"days": [recent], "clicks": [3], "likes": [2]}
+        assert eng["by_service"] == {"linkedin": {"clicks": 3, "likes": 2}}
@@ -0,0 +1,52 @@
+"""Tests for the per-step input/output hash manifest."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import build_manifest
+from build_manifest import fingerprint, record, up_to_date
+
+
+@pytest.fixture
+def step(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_manifest, "BUILD_DIR", str(tmp_path / "build"))
+    src, out = tmp_path / "rss.xml", tmp_path / "out"
+    src.write_text("<rss/>")
+    out.mkdir()
+    (out / "a.xml").write_text("a")
+    return str(src), str(out)
+
+
+class TestBuildManifest:
+    """Test when a step may skip its rebuild."""
+
+    def test_unchanged_step_is_up_to_date(self, step):
+        """Should skip once recorded, and not before."""
+        src, out = step
+        assert not up_to_date("feeds", [src], [out])
+        record("feeds", [src], [out])
+        assert up_to_date("feeds", [src], [out])
+
+    def test_changed_input_or_extra_reruns(self, step):
+        """Should rerun when an input's bytes or the extra key change."""
+        src, out = step
+        record("feeds", [src], [out], extra="2026-10-18")
+        assert not up_to_date("feeds", [src], [out], extra="2026-10-19")
+        with open(src, "w") as f:
+            f.write("<rss><item/></rss>")
+        assert not up_to_date("feeds", [src], [out], extra="2026-10-18")
+
+    def test_edited_or_missing_output_reruns(self, step):
+        """Should rerun when an output was edited, removed or added to."""
+        src, out = step
+        record("feeds", [src], [out])
+        os.remove(os.path.join(out, "a.xml"))
+        assert not up_to_date("feeds", [src], [out])
+
+    def test_missing_input_hashes_empty(self, tmp_path):
+        """Should treat a missing input as an empty hash rather than fail."""
+        assert list(fingerprint([str(tmp_path / "nope.csv")]).values()) == [""]
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Tests for the build_rss library entry points (run the pipeline without the network).
+"""
+
+import json
+import os
+import sys
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts')))
+
+import build_analytics
+import build_rss
+import llm_client
+import update_bandit
+from backup_manager import list_backups
+from bandit_engine import BanditEngine, arm_key
+from dup_index import DupGuard
+
+GOOD_PAYLOAD = {
+    "style": "coach_tip",
+    "cta_type": "question",
+    "x_line": "Lead your resume bullets with a number so your impact lands in 5 seconds ✅📈",
+    "desc_title": "Numbers first 📈",
+    "desc_points": ["Open with the metric", "Name the lever", "Close with scope"],
+    "desc_cta": "Which bullet could use a number today?",
+    "tags": ["resume", "jobsearch"],
+}
+
+RULES = {"min_emojis": 2, "enforce_second_person": True, "banned_phrases": []}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the pipeline inside an empty repo-shaped directory."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class TestRun:
+    """Test the run() entry point."""
+
+    def test_publishes_item(self, workdir, monkeypatch):
+        """Should prepend one item and record its fingerprint."""
+        monkeypatch.setattr(build_rss, "call_openai", lambda *a, **k: dict(GOOD_PAYLOAD))
+
+        result = build_rss.run(cfg={}, rules=RULES, band={})
+
+        assert result["status"] == "published"
+        items = ET.parse(workdir / "rss.xml").getroot().find("channel").findall("item")
+        assert len(items) == 1
+        assert items[0].findtext("guid") == result["guid"]
+        assert (workdir / "analytics" / "fingerprints.bin").exists()
+
+    def test_backs_up_item_log(self, workdir, monkeypatch):
+        """Should back up the item log rss.xml is rendered from, not rss.xml itself."""
+        lines = iter([GOOD_PAYLOAD["x_line"], "Send a two-line follow-up within 24 hours of every interview you take 💬📌"])
+        monkeypatch.setattr(build_rss, "call_openai", lambda *a, **k: dict(GOOD_PAYLOAD, x_line=next(lines)))
+
+        build_rss.run(cfg={}, rules=RULES, band={})
+        build_rss.run(cfg={}, rules=RULES, band={})
+
+        assert len(list_backups("items.jsonl")) == 1
+        assert list_backups("rss.xml") == []
+
+    def test_paused(self, workdir, monkeypatch):
+        """Should not call the model or touch the feed when paused."""
+        def boom(*a, **k):
+            raise AssertionError("model called while paused")
+        monkeypatch.setattr(build_rss, "call_openai", boom)
+
+        assert build_rss.run(cfg={"paused": True}, rules=RULES, band={})["status"] == "paused"
+        assert not (workdir / "rss.xml").exists()
+
+    def test_fails_closed_when_gate_never_passes(self, workdir, monkeypatch):
+        """Should skip publishing if every attempt fails the quality gate."""
+        bad = dict(GOOD_PAYLOAD, x_line="I think the resume needs metrics.")
+        monkeypatch.setattr(build_rss, "call_openai", lambda *a, **k: dict(bad))
+
+        rules = dict(RULES, allow_first_person_in_quotes_only=True, enforce_second_person=False)
+        assert build_rss.run(cfg={}, rules=rules, band={})["status"] == "failed"
+        assert not (workdir / "rss.xml").exists()
+
+
+class TestBanditCredit:
+    """Test that published posts credit the arm the bandit sampled."""
+
+    def test_item_and_update_use_sampled_arm(self, workdir, monkeypatch):
+        """Should tag the item with the sampled style and CTA, and train that arm, whatever the model labels."""
+        monkeypatch.setattr(BanditEngine, "choose", lambda self, candidates, context=None: arm_key("checklist", "tip"))
+        monkeypatch.setattr(build_rss, "call_openai", lambda *a, **k: dict(GOOD_PAYLOAD))
+
+        build_rss.run(cfg={}, rules=RULES, band=BanditEngine().to_dict())
+
+        items = build_analytics.read_rss("rss.xml")
+        assert (items[0]["style"], items[0]["cta"]) == ("checklist", "tip")
+        row = dict(build_analytics.post_features(items[0]), likes=3, eng_score=3.0)
+        build_analytics.write_csv("posts.csv", [row], list(row))
+        engine = BanditEngine()
+        for obs in update_bandit.observations("posts.csv"):
+            engine.observe(*obs)
+        assert list(engine.arms) == [arm_key("checklist", "tip")]
+
+    def test_fallback_carries_sampled_arm(self):
+        """Should not credit a fixed CTA when the fallback post stands in for a sampled arm."""
+        payload = build_rss.fallback_payload("checklist", "tip")
+        assert (build_rss.item_style(payload), build_rss.item_cta(payload)) == ("checklist", "tip")
+
+
+@pytest.fixture
+def stub_openai(monkeypatch):
+    """Serve chat completions from a local stand-in server, one reply per request."""
+    replies = [
+        dict(GOOD_PAYLOAD, x_line="I achieved great things when pitching."),
+        dict(GOOD_PAYLOAD, x_line="Open your next cover letter with the result you drove for the team ✅📌"),
+    ]
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            seen.append(body)
+            reply = replies[(len(seen) - 1) % len(replies)]
+            out = json.dumps({
+                "id": "cmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": json.dumps(reply)}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    llm_client.close_clients()
+    yield seen
+    llm_client.close_clients()
+    server.shutdown()
+
+
+class TestSharedClient:
+    """Test the pooled client used by call_openai."""
+
+    def test_reuses_client_and_connection(self, stub_openai):
+        """Should build one client and reuse its pooled connection across calls."""
+        before = len(llm_client.call_timings())
+        rules = {"banned_phrases": []}
+
+        build_rss.call_openai("resumes", "coach_tip", "desc", "gpt-4o", rules)
+        client = llm_client.get_client()
+        build_rss.call_openai("resumes", "coach_tip", "desc", "gpt-4o", rules)
+
+        assert llm_client.get_client() is client
+        timings = llm_client.call_timings()[before:]
+        assert len(timings) == 2
+        assert not timings[0]["reused"] and timings[1]["reused"]
+        assert timings[1]["connect_ms"] == 0.0
+        assert all(t["total_ms"] >= t["ttfb_ms"] > 0 for t in timings)
+
+
+    def test_timings_are_bounded(self):
+        """Should keep a bounded window of call records while the summary counts every call."""
+        calls = llm_client.timing_summary()["calls"]
+        for _ in range(llm_client.MAX_TIMINGS + 5):
+            with llm_client.timed_call("gpt-4o"):
+                pass
+
+        assert len(llm_client.call_timings()) == llm_client.MAX_TIMINGS
+        assert llm_client.timing_summary()["calls"] == calls + llm_client.MAX_TIMINGS + 5
+
+
+class TestBestOfN:
+    """Test concurrent candidate generation."""
+
+    def test_plan_varies_requests(self):
+        """Should vary notes and temperatures across candidates."""
+        plan = build_rss.plan_candidates(3, "coach_tip", "desc", build_rss.DEFAULT_STYLE_WEIGHTS)
+        assert len(plan) == 3
+        assert plan[0][0] == "coach_tip"
+        assert len({temp for _, _, _, temp in plan}) == 3
+        assert len({note for _, _, note, _ in plan}) == 3
+
+    def test_plan_keeps_cta_in_every_slot(self):
+        """Should carry the sampled CTA's instruction into rerolled styles too."""
+        desc = build_rss.with_cta("desc", "tip")
+        plan = build_rss.plan_candidates(4, "coach_tip", desc, build_rss.DEFAULT_STYLE_WEIGHTS, "tip")
+        assert all(d.endswith(build_rss.CTA_DESCS["tip"]) for _, d, _, _ in plan)
+
+    def test_picks_passing_candidate_from_stub_server(self, stub_openai):
+        """Should send all candidates and keep the one that passes the gate."""
+        rules = dict(RULES, allow_first_person_in_quotes_only=True)
+        dg = dict(build_rss.DEFAULT_DUP_GUARD)
+
+        payload, xline, _ = build_rss.generate_best_of_n(
+            "cover letters", "coach_tip", "desc", build_rss.DEFAULT_STYLE_WEIGHTS,
+            "gpt-4o", rules, DupGuard.from_fps([]), dg, 2
+        )
+
+        assert len(stub_openai) == 2
+        assert payload is not None
+        assert "cover letter" in xline
+        assert xline == build_rss.final_xline(payload, rules)
+
+    def test_rerolls_when_every_candidate_is_a_duplicate(self, workdir, monkeypatch):
+        """Should fall back to the dup reroll instead of publishing the least-similar duplicate."""
+        title = build_rss.final_xline(GOOD_PAYLOAD, RULES)
+        build_rss.write_queue([{"title": title, "ngrams": sorted(build_rss.ngrams(title, 5))}])
+        monkeypatch.setattr(build_rss, "generate_best_of_n",
+                            lambda *a, **k: (dict(GOOD_PAYLOAD), title, "coach_tip"))
+        rerolled = "Send a two-line follow-up within 24 hours of every interview you take 💬📌"
+        monkeypatch.setattr(build_rss, "call_openai", lambda *a, **k: dict(GOOD_PAYLOAD, x_line=rerolled))
+
+        result = build_rss.run(cfg={"generation": {"candidates": 2}}, rules=RULES, band={})
+
+        assert result["title"] == rerolled
+
+    def test_prefers_novel_candidate(self, stub_openai):
+        """Should rank a candidate that trips the dup guard below a fresh one."""
+        stale = "Open your next cover letter with the result you drove for the team"
+        fps = [{"guid": "old", "ngrams": list(build_rss.ngrams(stale, 5))}]
+        dg = dict(build_rss.DEFAULT_DUP_GUARD)
+
+        _, xline, _ = build_rss.generate_best_of_n(
+            "cover letters", "coach_tip", "desc", build_rss.DEFAULT_STYLE_WEIGHTS,
+            "gpt-4o", RULES, DupGuard.from_fps(fps), dg, 2
+        )
+
+        assert "pitching" in xline
+
+
+class TestQueue:
+    """Test batch drafting and queued publishing."""
+
+    def test_batch_then_publish_from_queue(self, workdir, monkeypatch):
+        """Should queue vetted drafts and publish them without calling the model."""
+        lines = iter([
+            "Lead your resume bullets with a number so your impact lands fast ✅📈",
+            "Send a two-line follow-up within 24 hours of every interview you take 💬📌",
+        ])
+        monkeypatch.setattr(build_rss, "call_openai",
+                            lambda *a, **k: dict(GOOD_PAYLOAD, x_line=next(lines)))
+        monkeypatch.setattr(build_rss, "choose_style", lambda w: ("checklist", build_rss.STYLE_DESCS["checklist"]))
+
+        result = build_rss.run_batch(2, cfg={}, rules=RULES, band={})
+        assert result == {"status": "queued", "added": 2, "queue_size": 2}
+        queued = build_rss.load_queue()
+        assert [q["style"] for q in queued] == ["checklist", "checklist"]
+        assert all(q["ngrams"] for q in queued)
+
+        def boom(*a, **k):
+            raise AssertionError("model called while publishing from queue")
+        monkeypatch.setattr(build_rss, "call_openai", boom)
+
+        published = build_rss.publish_next_queued(cfg={}, rules=RULES)
+        assert published["status"] == "published"
+        assert published["title"] == queued[0]["title"]
+        assert len(build_rss.load_queue()) == 1
+        items = ET.parse(workdir / "rss.xml").getroot().find("channel").findall("item")
+        assert items[0].findtext("title") == queued[0]["title"]
+
+    def test_queued_draft_credited_under_its_publish_slot(self, workdir, monkeypatch):
+        """Should choose and credit a queued draft under its publish slot and its title's number."""
+        (workdir / ".github" / "workflows").mkdir(parents=True)
+        (workdir / ".github" / "workflows" / "post.yml").write_text('    - cron: "0 13 * * *"\n', encoding="utf-8")
+        slots = build_rss.publish_slots(2)
+        chosen = []
+        monkeypatch.setattr(build_rss, "choose_arm", lambda band, rules=None, now=None, context=None:
+                            chosen.append(now) or ("coach_tip", build_rss.STYLE_DESCS["coach_tip"], "question"))
+        monkeypatch.setattr(build_rss, "call_openai", lambda *a, **k: dict(GOOD_PAYLOAD))
+        build_rss.write_queue([{"title": "waiting", "payload": dict(GOOD_PAYLOAD)}])
+
+        build_rss.run_batch(1, cfg={}, rules=RULES, band=BanditEngine().to_dict())
+        tagged = build_rss.context_tag(slots[1], True)
+        assert chosen == [slots[1]] and build_rss.load_queue()[1]["context"] == tagged
+        build_rss.publish_next_queued(cfg={}, rules=RULES)
+        build_rss.publish_next_queued(cfg={}, rules=RULES)
+
+        row = dict(build_analytics.post_features(build_analytics.read_rss("rss.xml")[0]), likes=3, eng_score=3.0)
+        build_analytics.write_csv("posts.csv", [row], list(row))
+        (_, _, _, x), = update_bandit.observations("posts.csv")
+        assert x.tolist() == build_rss.context_from_tag(tagged).tolist()
+
+    def test_publish_slots_follow_daily_crons(self, workdir):
+        """Should list the workflow's daily slots in order, starting after the given time."""
+        (workdir / ".github" / "workflows").mkdir(parents=True)
+        (workdir / ".github" / "workflows" / "post.yml").write_text(
+            '    - cron: "35 21 * * *"\n    - cron: "5 15 * * *"\n', encoding="utf-8")
+        after = datetime(2026, 10, 17, 16, 0, tzinfo=timezone.utc)
+
+        assert build_rss.publish_slots(3, after) == [datetime(2026, 10, 17, 21, 35, tzinfo=timezone.utc),
+                                                     datetime(2026, 10, 18, 15, 5, tzinfo=timezone.utc),
+                                                     datetime(2026, 10, 18, 21, 35, tzinfo=timezone.utc)]
+
+    def test_batch_drops_duplicates_within_batch(self, workdir, monkeypatch):
+        """Should compare drafts against each other, not just published history."""
+        monkeypatch.setattr(build_rss, "call_openai", lambda *a, **k: dict(GOOD_PAYLOAD))
+
+        result = build_rss.run_batch(3, cfg={}, rules=RULES, band={})
+
+        assert result["added"] == 1
+
+    def test_queue_persisted_before_publish(self, workdir, monkeypatch):
+        """Should drop the draft from the queue before publishing, and put it back if publishing raises."""
+        build_rss.write_queue([{"title": "a", "payload": dict(GOOD_PAYLOAD)}, {"title": "b"}])
+
+        def publish(draft, *a, **k):
+            assert [q["title"] for q in build_rss.load_queue()] == ["b"]
+            raise OSError("disk full")
+        monkeypatch.setattr(build_rss, "publish_draft", publish)
+
+        with pytest.raises(OSError):
+            build_rss.publish_next_queued(cfg={}, rules=RULES)
+        assert [q["title"] for q in build_rss.load_queue()] == ["a", "b"]
+
+    def test_live_run_avoids_queued_drafts(self, workdir, monkeypatch):
+        """Should treat queued drafts as history when generating live."""
+        title = build_rss.final_xline(GOOD_PAYLOAD, RULES)
+        build_rss.write_queue([{"title": title, "ngrams": sorted(build_rss.ngrams(title, 5))}])
+        rerolled = "Send a two-line follow-up within 24 hours of every interview you take 💬📌"
+        monkeypatch.setattr(build_rss, "call_openai", lambda *a, **k: dict(
+            GOOD_PAYLOAD, x_line=rerolled if k.get("pass_hint") == build_rss.REROLL_NOTE else GOOD_PAYLOAD["x_line"]))
+
+        assert build_rss.run(cfg={}, rules=RULES, band={})["title"] == rerolled
+
+    def test_batch_must_be_positive(self, workdir):
+        """Should reject --batch 0 instead of falling through to a live publish."""
+        with pytest.raises(SystemExit) as exc:
+            build_rss.main(["--batch", "0"])
+        assert exc.value.code == 2
+
+    def test_empty_queue(self, workdir):
+        """Should report an empty queue instead of failing."""
+        assert build_rss.publish_next_queued(cfg={}, rules=RULES) == {"status": "empty"}
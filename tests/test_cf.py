@@ -0,0 +1,115 @@
+"""Tests for the pipeline runner."""
+
+import json
+import multiprocessing
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cf
+from cf import Stage
+
+
+@pytest.fixture
+def fake(tmp_path, monkeypatch):
+    """Register in-memory stage modules (inherited by the forked workers) that log their calls to a file."""
+    log = tmp_path / "calls.jsonl"
+
+    def record(*entry):
+        with open(log, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def calls():
+        if not log.exists():
+            return []
+        return [tuple(json.loads(ln)) for ln in log.read_text(encoding="utf-8").splitlines()]
+
+    def module(name, rc=0, barrier=None, body=None):
+        def main(argv=None):
+            if barrier is not None:
+                barrier.wait()  # returns only once every party is running at the same time
+            if body is not None:
+                body(record)
+            record(name, argv)
+            return rc
+        monkeypatch.setitem(sys.modules, f"fake_{name}", types.SimpleNamespace(main=main))
+        return f"fake_{name}"
+    return calls, module
+
+
+class TestRunner:
+    """Test DAG ordering, parallelism and failure handling."""
+
+    def test_runs_in_dependency_order_with_parallel_branches(self, fake):
+        """Should run independent stages concurrently and respect 'after'."""
+        calls, module = fake
+        both = multiprocessing.get_context("fork").Barrier(2, timeout=5)
+        stages = {s.name: s for s in [
+            Stage("gen", module("gen"), ["--from-queue"]),
+            Stage("fan", module("fan", barrier=both), [], after=("gen",)),
+            Stage("an", module("an", barrier=both), [], after=("gen",)),
+            Stage("bandit", module("bandit"), None, after=("an",)),
+        ]}
+        results = cf.run(list(stages), jobs=4, stages=stages)
+
+        calls = calls()
+        order = [name for name, _ in calls]
+        assert all(status == "ok" for status, _ in results.values())
+        assert order[0] == "gen" and order.index("an") < order.index("bandit")
+        assert ("gen", ["--from-queue"]) in calls and ("bandit", None) in calls
+
+    def test_failure_skips_dependents_only(self, fake):
+        """Should skip what needs a failed stage, run the other branch and tolerate optional failures."""
+        _, module = fake
+        stages = {s.name: s for s in [
+            Stage("gen", module("gen"), []),
+            Stage("fan", module("fan", rc=2), [], after=("gen",)),
+            Stage("tail", module("tail"), None, after=("fan",)),
+            Stage("art", module("art", rc=1), None, after=("gen",), optional=True),
+            Stage("after_art", module("after_art"), None, after=("art",)),
+        ]}
+        results = cf.run(list(stages), stages=stages)
+
+        assert results["fan"][0] == "failed" and results["tail"][0] == "skipped"
+        assert results["art"][0] == "failed" and results["after_art"][0] == "ok"
+
+    def test_selected_subset_ignores_unselected_predecessors(self, fake):
+        """Should run an 'analytics'-style group without its upstream stages."""
+        calls, module = fake
+        stages = {s.name: s for s in [
+            Stage("gen", module("gen"), []),
+            Stage("an", module("an"), [], after=("gen",)),
+        ]}
+        results = cf.run(["an"], stages=stages)
+
+        assert list(results) == ["an"] and calls() == [("an", [])]
+
+    def test_stages_do_not_share_process_state(self, fake, tmp_path):
+        """Should keep a stage's chdir and module globals away from the stages after it."""
+        calls, module = fake
+        (tmp_path / "elsewhere").mkdir()
+
+        def move(record):
+            os.chdir(tmp_path / "elsewhere")
+            cf.DEFAULT_JOBS = 0
+
+        stages = {s.name: s for s in [
+            Stage("move", module("move", body=move), None),
+            Stage("check", module("check", body=lambda record: record(os.getcwd(), cf.DEFAULT_JOBS)), None,
+                  after=("move",)),
+        ]}
+        cwd = os.getcwd()
+        results = cf.run(list(stages), jobs=1, stages=stages)
+
+        assert all(status == "ok" for status, _ in results.values())
+        assert (cwd, 4) in calls() and os.getcwd() == cwd and cf.DEFAULT_JOBS == 4
+
+    def test_resolves_groups(self):
+        """Should expand group names in DAG order and reject unknown names."""
+        assert cf.resolve(["cron", "post"]) == ["generate", "fanout", "cron"]
+        with pytest.raises(ValueError):
+            cf.resolve(["deploy"])
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the MinHash/LSH duplicate guard.
+"""
+
+import json
+import os
+import random
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from build_rss import dup_guard_ok
+from dup_index import DupGuard, MinHashLSH, ngrams, shingle_hash
+from fingerprint_store import HEADER, RECORD, FingerprintStore, open_store
+
+WORDS = ("resume interview offer salary recruiter network pitch metric manager team "
+         "role skill project impact result story hiring process career growth").split()
+
+
+def random_title(rng, length=18):
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def make_fps(titles):
+    return [{"guid": f"g{i}", "ngrams": sorted(ngrams(t, 5))} for i, t in enumerate(titles)]
+
+
+class TestMinHashLSH:
+    """Test the LSH index itself."""
+
+    def test_identical_sets_are_candidates(self):
+        """Should always bucket identical shingle sets together."""
+        index = MinHashLSH()
+        grams = ngrams("lead every resume bullet with a measurable result", 5)
+        index.add("a", map(shingle_hash, grams))
+        assert index.candidates(map(shingle_hash, grams)) == {"a"}
+
+    def test_remove(self):
+        """Should drop a GUID from every bucket."""
+        index = MinHashLSH()
+        grams = ngrams("lead every resume bullet with a measurable result", 5)
+        index.add("a", map(shingle_hash, grams))
+        index.remove("a")
+        assert not index.candidates(map(shingle_hash, grams))
+        assert not index.buckets
+
+    def test_save_load_roundtrip(self, tmp_path):
+        """Should reload the same buckets, and rebuild when params change."""
+        path = str(tmp_path / "lsh.json")
+        index = MinHashLSH()
+        index.add("a", map(shingle_hash, ngrams("send a follow up note within one day", 5)))
+        index.save(path)
+
+        assert MinHashLSH.load(path).keys_by_id == index.keys_by_id
+        assert len(MinHashLSH.load(path, num_perm=64, bands=16)) == 0
+
+
+class TestDupGuard:
+    """Test DupGuard against the exact linear scan."""
+
+    def test_matches_linear_scan(self):
+        """Should agree with dup_guard_ok on near-duplicates and fresh titles."""
+        rng = random.Random(7)
+        titles = [random_title(rng) for _ in range(300)]
+        fps = make_fps(titles)
+        guard = DupGuard.from_fps(fps, n=5, threshold=0.8)
+
+        probes = [titles[10], titles[20] + " today", random_title(rng), random_title(rng)]
+        for probe in probes:
+            assert guard.ok(probe) == dup_guard_ok(probe, fps, 5, 0.8), probe
+        assert not guard.ok(titles[10])
+
+    def test_sync_follows_history_window(self, tmp_path):
+        """Should forget store records that fall out of the history window."""
+        titles = ["lead every resume bullet with a measurable result for the team",
+                  "send a short follow up note within one day of the interview"]
+        store = FingerprintStore(str(tmp_path / "fps.bin"))
+        store.append("a" * 40, map(shingle_hash, ngrams(titles[0], 5)))
+        guard = DupGuard(store, history_size=1)
+        assert not guard.ok(titles[0])
+
+        store.append("b" * 40, map(shingle_hash, ngrams(titles[1], 5)))
+        guard.sync()
+
+        assert guard.ok(titles[0])
+        assert not guard.ok(titles[1])
+
+
+class TestFingerprintStore:
+    """Test the binary fingerprint store."""
+
+    def test_append_and_read(self, tmp_path):
+        """Should round-trip GUIDs and hashes through the mmap reader."""
+        store = FingerprintStore(str(tmp_path / "fps.bin"))
+        slot = store.append("f24e0dd41bc65a7e043bc843bc95bd9f70fbb1ab", [3, 1, 2])
+
+        reopened = FingerprintStore(str(tmp_path / "fps.bin"))
+        assert len(reopened) == 1
+        assert reopened.record(slot) == ("f24e0dd41bc65a7e043bc843bc95bd9f70fbb1ab", (1, 2, 3))
+
+    def test_compact_keeps_logical_slots(self, tmp_path):
+        """Should drop old records without renumbering the live ones."""
+        store = FingerprintStore(str(tmp_path / "fps.bin"))
+        for i in range(5):
+            store.append(f"{i:040x}", [i])
+        store.compact(2)
+
+        assert len(store) == 2
+        assert list(store.window(10)) == [3, 4]
+        assert store.record(4) == (f"{4:040x}", (4,))
+        assert os.path.getsize(tmp_path / "fps.bin") == HEADER.size + 2 * RECORD.size
+
+    def test_migrates_legacy_json(self, tmp_path):
+        """Should convert fingerprints.json and remove it."""
+        legacy = tmp_path / "fingerprints.json"
+        grams = sorted(ngrams("lead every resume bullet with a measurable result", 5))
+        legacy.write_text(json.dumps([{"guid": "a" * 40, "ngrams": grams}]))
+
+        store = open_store(str(tmp_path / "fps.bin"), legacy_json=str(legacy))
+
+        assert not legacy.exists()
+        assert store.record(0) == ("a" * 40, tuple(sorted(shingle_hash(g) for g in grams)))
@@ -0,0 +1,145 @@
+"""Tests for the append-only feed item log."""
+
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import feed_store
+from feed_store import FeedStore, load_archive_index, migrate_feed, normalize_record, read_feed
+
+
+def make_store(tmp_path):
+    return FeedStore(str(tmp_path / "items.jsonl"), str(tmp_path / "channel.json"))
+
+
+def item(i, month=1):
+    return {"title": f"Tip {i}", "description": f"Body {i} <b>&</b>", "link": f"https://x/{i}",
+            "guid": f"g{i}", "pubDate": f"{i:02d} {['Jan', 'Feb'][month - 1]} 2024 09:00:00 +0000",
+            "categories": [["style", "coach_tip"], ["cta", "question"]]}
+
+
+class TestRender:
+    """Test rendering rss.xml from the log."""
+
+    def test_renders_newest_first(self, tmp_path, monkeypatch):
+        """Should stream appended items newest-first, across read blocks."""
+        monkeypatch.setattr(feed_store, "READ_BLOCK", 64)
+        store = make_store(tmp_path).ensure(str(tmp_path / "rss.xml"), defaults={"title": "CF"})
+        for i in range(1, 6):
+            store.append(item(i))
+
+        assert store.render(str(tmp_path / "rss.xml"), build_date="now") == 5
+
+        ch = ET.parse(tmp_path / "rss.xml").getroot().find("channel")
+        assert ch.findtext("title") == "CF"
+        assert ch.findtext("pubDate") == item(5)["pubDate"]
+        items = ch.findall("item")
+        assert [i.findtext("guid") for i in items] == ["g5", "g4", "g3", "g2", "g1"]
+        assert items[0].findtext("description") == "Body 5 <b>&</b>"
+        assert [c.get("domain") for c in items[0].findall("category")] == ["style", "cta"]
+        assert not (tmp_path / "archive").exists()
+
+    def test_truncated_last_line(self, tmp_path):
+        """Should render past a torn last line and drop it on the next append."""
+        store = make_store(tmp_path).ensure(str(tmp_path / "rss.xml"), defaults={"title": "CF"})
+        for i in range(1, 3):
+            store.append(item(i))
+        with open(store.items_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(item(3))[:40])
+
+        assert [r["guid"] for r in store.newest_first()] == ["g2", "g1"]
+        assert store.render(str(tmp_path / "rss.xml"), build_date="now") == 2
+        store.append(item(4))
+        assert [r["guid"] for r in store.newest_first()] == ["g4", "g2", "g1"]
+
+    def test_empty_log(self, tmp_path):
+        """Should render a valid feed with no items."""
+        store = make_store(tmp_path).ensure(str(tmp_path / "rss.xml"), defaults={"title": "CF"})
+
+        assert store.render(str(tmp_path / "rss.xml")) == 0
+        assert ET.parse(tmp_path / "rss.xml").getroot().find("channel").findall("item") == []
+
+
+class TestRetention:
+    """Test the live window and archive shards."""
+
+    def test_rolls_old_items_into_monthly_shards(self, tmp_path):
+        """Should keep max_items live and shard the rest by month, once."""
+        archive = str(tmp_path / "archive")
+        store = make_store(tmp_path)
+        for i in range(1, 4):
+            store.append(item(i, month=1))
+        for i in range(1, 4):
+            store.append(item(i + 3, month=2))
+
+        assert store.render(str(tmp_path / "rss.xml"), max_items=2, archive_dir=archive) == 2
+        index = load_archive_index(archive)
+        assert index["archived"] == 4
+        assert {k: v["count"] for k, v in index["shards"].items()} == {"2024-02": 1, "2024-01": 3}
+        assert [r["guid"] for r in read_feed(os.path.join(archive, "rss-2024-01.xml"))] == ["g3", "g2", "g1"]
+
+        store.append(item(7, month=2))
+        store.render(str(tmp_path / "rss.xml"), max_items=2, archive_dir=archive)
+
+        index = load_archive_index(archive)
+        assert index["archived"] == 5
+        assert [r["guid"] for r in read_feed(os.path.join(archive, "rss-2024-02.xml"))] == ["g5", "g4"]
+        live = ET.parse(tmp_path / "rss.xml").getroot().iter("item")
+        assert [i.findtext("guid") for i in live] == ["g7", "g6"]
+
+    def test_archived_items_stay_out_when_limit_grows(self, tmp_path):
+        """Should not bring archived items back into the live feed after max_items is raised."""
+        archive = str(tmp_path / "archive")
+        store = make_store(tmp_path)
+        for i in range(1, 6):
+            store.append(item(i))
+        store.render(str(tmp_path / "rss.xml"), max_items=2, archive_dir=archive)
+
+        assert store.render(str(tmp_path / "rss.xml"), max_items=10, archive_dir=archive) == 2
+        live = ET.parse(tmp_path / "rss.xml").getroot().iter("item")
+        assert [i.findtext("guid") for i in live] == ["g5", "g4"]
+        assert load_archive_index(archive)["archived"] == 3
+
+    def test_max_days_keeps_newest(self, tmp_path):
+        """Should drop items older than max_days but never empty the feed."""
+        store = make_store(tmp_path)
+        for i in range(1, 3):
+            store.append(item(i))
+
+        assert store.render(str(tmp_path / "rss.xml"), max_days=30, archive_dir=str(tmp_path / "a")) == 1
+        assert load_archive_index(str(tmp_path / "a"))["archived"] == 1
+
+
+class TestNormalize:
+    """Test normalization on append."""
+
+    def test_strips_stamps_and_fills_guid(self):
+        """Should drop trailing timestamps and derive a missing GUID."""
+        rec = normalize_record({"title": "Tip &mdash; 2024-01-02 09:00", "link": "https://x/1"})
+        assert rec["title"] == "Tip"
+        assert len(rec["guid"]) == 40
+
+
+class TestMigrate:
+    """Test migrating an existing rss.xml."""
+
+    def test_roundtrip(self, tmp_path):
+        """Should keep channel fields and items, ignoring duplicated channel dates."""
+        store = make_store(tmp_path)
+        for i in range(1, 4):
+            store.append(item(i))
+        store.save_channel({"title": "CF", "link": "https://x/"})
+        store.render(str(tmp_path / "old.xml"))
+        feed = (tmp_path / "old.xml").read_text(encoding="utf-8")
+        (tmp_path / "old.xml").write_text(feed.replace("</channel>", "<lastBuildDate>x</lastBuildDate></channel>"),
+                                          encoding="utf-8")
+
+        migrated = migrate_feed(str(tmp_path / "old.xml"), FeedStore(str(tmp_path / "m.jsonl"),
+                                                                       str(tmp_path / "m.json")))
+
+        assert migrated.channel() == {"title": "CF", "link": "https://x/"}
+        with open(tmp_path / "m.jsonl", encoding="utf-8") as f:
+            assert [json.loads(line) for line in f] == [item(i) for i in range(1, 4)]
@@ -0,0 +1,191 @@
+"""Tests for the concurrent Buffer fetcher in analytics/fetch_metrics.py, run against a local stub server."""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+pytest.importorskip("requests")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'analytics')))
+
+import fetch_metrics
+from fetch_metrics import RateLimiter, fetch_all
+from metrics_store import MetricsStore
+
+
+class StubBuffer(BaseHTTPRequestHandler):
+    """Serves /profiles/<id>/updates/sent.json from the server's `profiles` table."""
+
+    def do_GET(self):
+        srv = self.server
+        url = urlsplit(self.path)
+        profile_id = re.match(r"/profiles/([^/]+)/updates/sent.json", url.path).group(1)
+        query = parse_qs(url.query)
+        page, since = int(query["page"][0]), int(query["since"][0])
+        with srv.lock:
+            srv.calls.append((profile_id, page))
+            srv.since[profile_id] = since
+            hiccup = srv.hiccups.get(profile_id, 0)
+            if hiccup:
+                srv.hiccups[profile_id] = hiccup - 1
+        if hiccup:
+            return self.reply(429, {"error": "slow down"}, {"Retry-After": "0"})
+        if profile_id in srv.forbidden:
+            return self.reply(403, {"error": "forbidden"})
+        # newest first, one post an hour back from srv.now
+        sent = [u for u in ({"id": f"{profile_id}-{i}", "sent_at": srv.now - i * 3600,
+                             "statistics": {"likes": i + srv.bump.get(f"{profile_id}-{i}", 0)}}
+                            for i in range(srv.profiles[profile_id])) if u["sent_at"] >= since]
+        updates = sent[(page - 1) * 100:page * 100]
+        body = updates if srv.bare else {"total": len(sent), "updates": updates}
+        self.reply(200, body)
+
+    def reply(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StubBuffer)
+    srv.lock = threading.Lock()
+    srv.calls, srv.since, srv.hiccups, srv.forbidden, srv.bare, srv.bump = [], {}, {}, set(), False, {}
+    srv.now = int(time.time())
+    srv.profiles = {"p1": 250, "p2": 40, "p3": 100}
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(fetch_metrics, "API_ROOT", f"http://127.0.0.1:{srv.server_port}")
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def ids(updates):
+    return [u["id"] for u in updates]
+
+
+class TestFetchAll:
+    """Test fetching every profile and page concurrently."""
+
+    def test_fetches_every_page_in_order(self, buffer):
+        """Should return all updates per profile in page order."""
+        updates, errors = fetch_all("t", ["p1", "p2", "p3"], 0, limiter=RateLimiter(0))
+
+        assert errors == {}
+        assert ids(updates["p1"]) == [f"p1-{i}" for i in range(250)]
+        assert ids(updates["p2"]) == [f"p2-{i}" for i in range(40)]
+        # p3 fills exactly one page, so the total stops it from asking for page 2
+        assert sorted(buffer.calls) == [("p1", 1), ("p1", 2), ("p1", 3), ("p2", 1), ("p3", 1)]
+
+    def test_pages_serially_without_total(self, buffer):
+        """Should keep paging until a short page when Buffer returns a bare list."""
+        buffer.bare = True
+        updates, _ = fetch_all("t", ["p1", "p3"], 0, limiter=RateLimiter(0))
+
+        assert len(updates["p1"]) == 250
+        assert sorted(buffer.calls) == [("p1", 1), ("p1", 2), ("p1", 3), ("p3", 1), ("p3", 2)]
+
+    def test_retries_after_429(self, buffer):
+        """Should honor Retry-After and still fetch everything."""
+        buffer.hiccups = {"p2": 2}
+        updates, errors = fetch_all("t", ["p2"], 0, limiter=RateLimiter(0))
+
+        assert errors == {}
+        assert len(updates["p2"]) == 40
+        assert buffer.calls == [("p2", 1)] * 3
+
+    def test_failed_profile_does_not_stop_others(self, buffer):
+        """Should report a failing profile and keep the rest."""
+        buffer.forbidden = {"p2"}
+        updates, errors = fetch_all("t", ["p1", "p2"], 0, limiter=RateLimiter(0))
+
+        assert list(errors) == ["p2"] and "403" in errors["p2"]
+        assert len(updates["p1"]) == 250 and updates["p2"] == []
+
+
+@pytest.fixture
+def sync(buffer, tmp_path, monkeypatch):
+    """Run main() against the stub with scratch log/cursor paths."""
+    monkeypatch.setattr(fetch_metrics, "STORE_DIR", str(tmp_path / "metrics"))
+    monkeypatch.setattr(fetch_metrics, "CURSOR_PATH", str(tmp_path / "metrics_cursor.json"))
+    monkeypatch.setattr(fetch_metrics, "LEGACY_PATHS", (str(tmp_path / "metrics.jsonl"), str(tmp_path / "metrics.json")))
+    monkeypatch.setenv("BUFFER_TOKEN", "t")
+    monkeypatch.setenv("PROFILE_IDS", "p1,p2")
+    monkeypatch.setattr(fetch_metrics, "RateLimiter", lambda: RateLimiter(0))
+    return buffer
+
+
+def stored(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics"))
+    return {r["id"]: r for r in store.records()}, sum(p["lines"] for p in store.partitions.values())
+
+
+class TestIncrementalSync:
+    """Test the per-profile sync cursor and the partitioned metrics store."""
+
+    def test_second_run_fetches_refresh_window(self, sync, tmp_path):
+        """Should start from the cursor and only refetch the trailing window."""
+        fetch_metrics.main([])
+        cursor = json.loads((tmp_path / "metrics_cursor.json").read_text(encoding="utf-8"))
+        assert cursor["p1"]["last_sent_at"] == sync.now
+        assert sync.since["p1"] == sync.now - 30 * 86400
+
+        fetch_metrics.main([])
+        assert sync.since["p1"] == sync.now - fetch_metrics.REFRESH_DAYS * 86400
+
+    def test_appends_only_changed_records(self, sync, tmp_path):
+        """Should append only changed records and keep the last line per id."""
+        fetch_metrics.main([])
+        _, first = stored(tmp_path)
+        sync.bump = {"p2-3": 10}
+        fetch_metrics.main([])
+
+        records, lines = stored(tmp_path)
+        assert lines == first + 1
+        assert len(records) == 290 and records["p2-3"]["likes"] == 13
+
+    def test_migrates_legacy_metrics_json(self, sync, tmp_path):
+        """Should seed the store from an old metrics.json array."""
+        legacy = [{"id": "old-1", "service": "twitter", "day": "2024-01-05", "likes": 1}]
+        (tmp_path / "metrics.json").write_text(json.dumps(legacy), encoding="utf-8")
+        fetch_metrics.main([])
+
+        records, _ = stored(tmp_path)
+        assert records["old-1"] == legacy[0] and len(records) == 291
+
+    def test_failed_profile_keeps_cursor(self, sync, tmp_path):
+        """Should not advance the cursor of a profile whose fetch failed."""
+        sync.forbidden = {"p2"}
+        fetch_metrics.main([])
+
+        cursor = json.loads((tmp_path / "metrics_cursor.json").read_text(encoding="utf-8"))
+        assert "p1" in cursor and "p2" not in cursor
+
+
+class TestRateLimiter:
+    """Test the per-host token bucket."""
+
+    def test_limits_after_burst(self):
+        """Should let a burst through and then pace requests at the refill rate."""
+        limiter = RateLimiter(rate=50, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire("api")
+        limiter.acquire("other")  # separate host, separate bucket
+
+        assert time.monotonic() - start >= 4 / 50 * 0.9
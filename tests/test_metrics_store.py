@@ -0,0 +1,76 @@
+"""Tests for the month/service partitioned metrics store."""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'analytics')))
+
+from metrics_store import MetricsStore, partition_of
+
+
+def rec(i, day="2024-03-05", service="linkedin", likes=0):
+    return {"id": f"u{i}", "day": day, "service": service, "likes": likes}
+
+
+def lines(store, rel):
+    with open(os.path.join(store.root, rel), encoding="utf-8") as fh:
+        return fh.read().splitlines()
+
+
+class TestMetricsStore:
+    """Test partitioned upserts, compaction and the manifest."""
+
+    def test_partitions_by_month_and_service(self, tmp_path):
+        """Should write each record to its month/service partition and list it in the manifest."""
+        store = MetricsStore(str(tmp_path))
+        store.upsert([rec(1), rec(2, day="2024-04-01"), rec(3, service="Twitter")])
+
+        manifest = json.loads((tmp_path / "manifest.json").read_text(encoding="utf-8"))
+        assert [p["path"] for p in manifest["partitions"]] == [
+            "2024-03/linkedin.jsonl", "2024-03/twitter.jsonl", "2024-04/linkedin.jsonl"]
+        assert manifest["partitions"][0]["first_day"] == "2024-03-05"
+        assert partition_of({"id": "x"}) == "unknown/unknown.jsonl"
+
+    def test_upsert_touches_only_changed_partitions(self, tmp_path):
+        """Should append changed records and leave other partitions alone."""
+        store = MetricsStore(str(tmp_path))
+        store.upsert([rec(1), rec(2), rec(3, day="2024-04-01")])
+        before = (tmp_path / "2024-04" / "linkedin.jsonl").stat().st_mtime_ns
+
+        assert store.upsert([rec(1), rec(2, likes=5), rec(3, day="2024-04-01")]) == 1
+        assert len(lines(store, "2024-03/linkedin.jsonl")) == 3
+        assert (tmp_path / "2024-04" / "linkedin.jsonl").stat().st_mtime_ns == before
+        assert {r["id"]: r["likes"] for r in MetricsStore(str(tmp_path)).records()} == {"u1": 0, "u2": 5, "u3": 0}
+
+    def test_compacts_when_superseded_lines_dominate(self, tmp_path):
+        """Should rewrite a partition once superseded lines outnumber live records."""
+        store = MetricsStore(str(tmp_path))
+        store.upsert([rec(i) for i in range(4)])
+        store.upsert([rec(i, likes=1) for i in range(4)])
+        assert len(lines(store, "2024-03/linkedin.jsonl")) == 8
+
+        store.upsert([rec(0, likes=2)])
+        assert len(lines(store, "2024-03/linkedin.jsonl")) == 4
+        assert store.partitions["2024-03/linkedin.jsonl"]["lines"] == 4
+
+    def test_compact_all(self, tmp_path):
+        """Should drop superseded lines from every partition on demand."""
+        store = MetricsStore(str(tmp_path))
+        store.upsert([rec(1), rec(2, service="twitter")])
+        store.upsert([rec(1, likes=1), rec(2, service="twitter", likes=1)])
+
+        assert store.compact() == 2
+        assert all(p["lines"] == p["records"] == 1 for p in store.partitions.values())
+
+    def test_survives_torn_append(self, tmp_path):
+        """Should ignore a partial last line and cut it off on the next append."""
+        store = MetricsStore(str(tmp_path))
+        store.upsert([rec(1)])
+        rel = partition_of(rec(1))
+        with open(os.path.join(store.root, rel), "a", encoding="utf-8") as fh:
+            fh.write('{"id": "u2", "da')
+
+        assert list(store.read_partition(rel)[0]) == ["u1"]
+        store.upsert([rec(2)])
+        assert [json.loads(ln)["id"] for ln in lines(store, rel)] == ["u1", "u2"]
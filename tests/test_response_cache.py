@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the model response cache.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import build_rss
+import response_cache
+from response_cache import CacheMiss, ResponseCache
+
+REPLY = '{"style": "coach_tip", "x_line": "Your resume needs one number per bullet ✅📈"}'
+
+
+class TestResponseCache:
+    """Test cache keys, TTL and eviction."""
+
+    def test_key_covers_every_input(self):
+        """Should change when any part of the request changes."""
+        base = ResponseCache.key("gpt-4o", "sys", "user", 0.6)
+        assert base == ResponseCache.key("gpt-4o", "sys", "user", 0.6)
+        assert base != ResponseCache.key("gpt-4o-mini", "sys", "user", 0.6)
+        assert base != ResponseCache.key("gpt-4o", "sys2", "user", 0.6)
+        assert base != ResponseCache.key("gpt-4o", "sys", "user2", 0.6)
+        assert base != ResponseCache.key("gpt-4o", "sys", "user", 0.7)
+
+    def test_roundtrip_and_ttl(self, tmp_path):
+        """Should serve fresh entries and drop expired ones outside replay."""
+        cache = ResponseCache(str(tmp_path), mode="readwrite", ttl_seconds=60)
+        key = cache.key("gpt-4o", "sys", "user", 0.6)
+        cache.put(key, "gpt-4o", "sys", "user", 0.6, REPLY)
+        assert cache.get(key) == REPLY
+
+        cache.ttl_seconds = -1
+        assert ResponseCache(str(tmp_path), mode="replay", ttl_seconds=-1).get(key) == REPLY
+        assert cache.get(key) is None
+
+    def test_size_eviction_drops_oldest(self, tmp_path):
+        """Should evict the oldest entries once over the size cap."""
+        cache = ResponseCache(str(tmp_path), mode="readwrite", max_bytes=10**9)
+        keys = []
+        for i in range(3):
+            key = cache.key("gpt-4o", "sys", f"user {i}", 0.6)
+            cache.put(key, "gpt-4o", "sys", f"user {i}", 0.6, REPLY)
+            os.utime(cache._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+            keys.append(key)
+
+        cache.max_bytes = sum(os.path.getsize(cache._path(k)) for k in keys[1:])
+        cache.prune()
+
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[2]) == REPLY
+        assert len(list(cache.entries())) == 2
+
+
+    def test_put_scans_once_until_over_cap(self, tmp_path, monkeypatch):
+        """Should keep a running size instead of scanning the cache on every write."""
+        cache = ResponseCache(str(tmp_path), mode="readwrite", max_bytes=10**9)
+        scans = []
+        files = cache._files
+        monkeypatch.setattr(cache, "_files", lambda: scans.append(1) or files())
+        for i in range(5):
+            cache.put(cache.key("gpt-4o", "sys", f"user {i}", 0.6), "gpt-4o", "sys", f"user {i}", 0.6, REPLY)
+        assert len(scans) == 1
+        assert cache._bytes == sum(os.path.getsize(p) for p in files())
+
+        cache.max_bytes = cache._bytes
+        cache.put(cache.key("gpt-4o", "sys", "user 5", 0.6), "gpt-4o", "sys", "user 5", 0.6, REPLY)
+        assert len(scans) == 2
+        assert cache._bytes <= cache.max_bytes
+        assert len(list(files())) < 6
+
+
+class TestCallOpenAICache:
+    """Test the cache wiring inside build_rss.call_openai."""
+
+    @pytest.fixture
+    def replay_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+        monkeypatch.setenv("LLM_CACHE_MODE", "replay")
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        response_cache.reset_response_cache()
+        yield ResponseCache(str(tmp_path), mode="readwrite")
+        response_cache.reset_response_cache()
+
+    def test_replay_serves_without_api_key(self, replay_cache):
+        """Should answer from the cache with no key and no network."""
+        rules = {"banned_phrases": []}
+        sys_p, user_p = build_rss.build_prompts("resumes", "coach_tip", "desc", rules)
+        key = replay_cache.key("gpt-4o", sys_p, user_p, build_rss.DEFAULT_TEMPERATURE)
+        replay_cache.put(key, "gpt-4o", sys_p, user_p, build_rss.DEFAULT_TEMPERATURE, REPLY)
+
+        payload = build_rss.call_openai("resumes", "coach_tip", "desc", "gpt-4o", rules)
+
+        assert payload["x_line"].startswith("Your resume")
+
+    def test_replay_miss_raises(self, replay_cache):
+        """Should refuse to reach the network in replay mode."""
+        with pytest.raises(CacheMiss):
+            build_rss.call_openai("resumes", "coach_tip", "desc", "gpt-4o", {"banned_phrases": []})
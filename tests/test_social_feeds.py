@@ -0,0 +1,154 @@
+"""Tests for the single-parse social feed fan-out."""
+
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import social_feeds
+from social_feeds import PLATFORMS, build_feeds, load_feed, x_text
+
+FEED = """<?xml version='1.0' encoding='utf-8'?>
+<rss version="2.0"><channel>
+<title>Career Forge</title><link>https://example.com</link><description>Tips</description>
+<item><title>Older tip</title><description>Older &amp; wiser &lt;b&gt;tip&lt;/b&gt;</description>
+<link>https://example.com/1</link><guid>g1</guid><pubDate>Mon, 01 Jan 2024 09:00:00 +0000</pubDate></item>
+<item><title>Newer tip #Hashtag</title><description>Already tagged #ScalePilot</description>
+<link>https://example.com/2</link><guid>g2</guid><pubDate>Tue, 02 Jan 2024 09:00:00 +0000</pubDate></item>
+</channel></rss>
+"""
+
+
+@pytest.fixture
+def feed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # no archive/ index from the real repo
+    path = tmp_path / "rss.xml"
+    path.write_text(FEED, encoding="utf-8")
+    return path
+
+
+def titles(path):
+    return [it.findtext("title") for it in ET.parse(path).getroot().iter("item")]
+
+
+class TestBuildFeeds:
+    """Test the fan-out build."""
+
+    def test_writes_all_outputs_from_one_parse(self, feed, tmp_path, monkeypatch):
+        """Should parse rss.xml once and write six files."""
+        calls = []
+        real = social_feeds.parse_feed
+        monkeypatch.setattr(social_feeds, "parse_feed", lambda p: calls.append(p) or real(p))
+
+        written = build_feeds(in_feed=str(feed), out_dir=str(tmp_path), workers=3,
+                              manifest_path=str(tmp_path / "manifest.json"))
+
+        assert len(calls) == 1
+        assert sorted(os.path.basename(p) for p in written) == sorted(
+            name for p in PLATFORMS.values() for name in (p.out_all, p.out_live))
+
+    def test_platform_copy(self, feed, tmp_path):
+        """Should suffix FB copy, keep existing tags and order X newest first."""
+        build_feeds(["fb", "x"], in_feed=str(feed), out_dir=str(tmp_path),
+                    manifest_path=str(tmp_path / "manifest.json"))
+
+        fb = titles(tmp_path / "rss_fb.xml")
+        assert fb == ["Older & wiser tip #ScalePilot #SocialPilot #AICopilot",
+                      "Already tagged #ScalePilot"]
+        x = titles(tmp_path / "rss_x.xml")
+        assert x[0] == "Newer tip #ScalePilot #SocialPilot #AICopilot"
+        assert titles(tmp_path / "rss_x_live.xml") == x[:1]
+        assert ET.parse(tmp_path / "rss_x.xml").getroot().findtext("channel/title") == "Career Forge (X)"
+
+    def test_guids_match_across_platforms(self, feed):
+        """Should derive the same GUID from the source GUID on every platform."""
+        _, items = load_feed(str(feed))
+        fb = PLATFORMS["fb"].transform(items, len(items))
+        x = PLATFORMS["x"].transform(items, len(items))
+        assert [g for _, g in fb] == [g for _, g in x]
+
+
+class TestIncrementalBuild:
+    """Test manifest-driven incremental builds."""
+
+    NEW_ITEM = """<item><title>Newest tip</title><description>Fresh advice</description>
+<link>https://example.com/3</link><guid>g3</guid><pubDate>Wed, 03 Jan 2024 09:00:00 +0000</pubDate></item>
+"""
+
+    def prepend(self, feed):
+        text = feed.read_text(encoding="utf-8")
+        feed.write_text(text.replace("<item>", self.NEW_ITEM + "<item>", 1), encoding="utf-8")
+
+    def outputs(self, out_dir):
+        return {name: (out_dir / name).read_bytes()
+                for p in PLATFORMS.values() for name in (p.out_all, p.out_live)}
+
+    def test_only_new_items_are_transformed(self, feed, tmp_path, monkeypatch):
+        """Should transform just the prepended item and match a full rebuild."""
+        inc, full = tmp_path / "inc", tmp_path / "full"
+        inc.mkdir(); full.mkdir()
+        build_feeds(in_feed=str(feed), out_dir=str(inc), manifest_path=str(inc / "m.json"))
+        self.prepend(feed)
+
+        calls = []
+        real = social_feeds.normalize
+        monkeypatch.setattr(social_feeds, "normalize", lambda e: calls.append(e) or real(e))
+        build_feeds(in_feed=str(feed), out_dir=str(inc), manifest_path=str(inc / "m.json"))
+        monkeypatch.setattr(social_feeds, "normalize", real)
+        build_feeds(in_feed=str(feed), out_dir=str(full), manifest_path=str(full / "m.json"), full=True)
+
+        assert len(calls) == 2  # the new item, plus the old head to find where to stop
+        assert self.outputs(inc) == self.outputs(full)
+
+    def test_edited_output_forces_full_rebuild(self, feed, tmp_path):
+        """Should not splice onto an output the manifest did not write."""
+        manifest = str(tmp_path / "m.json")
+        build_feeds(["fb"], in_feed=str(feed), out_dir=str(tmp_path), manifest_path=manifest)
+        (tmp_path / "rss_fb.xml").write_text("<rss/>", encoding="utf-8")
+        self.prepend(feed)
+
+        build_feeds(["fb"], in_feed=str(feed), out_dir=str(tmp_path), manifest_path=manifest)
+
+        assert len(titles(tmp_path / "rss_fb.xml")) == 3
+
+    def test_tags_stay_with_their_items(self, feed, tmp_path):
+        """Should keep each item's rotating hashtag when newer items arrive."""
+        build_feeds(["fb"], in_feed=str(feed), out_dir=str(tmp_path), manifest_path=str(tmp_path / "m.json"))
+        before = titles(tmp_path / "rss_fb.xml")
+        self.prepend(feed)
+        build_feeds(["fb"], in_feed=str(feed), out_dir=str(tmp_path), manifest_path=str(tmp_path / "m.json"),
+                    full=True)
+
+        assert titles(tmp_path / "rss_fb.xml")[1:] == before
+
+    def test_sliding_window_trims_oldest(self, feed, tmp_path, caplog):
+        """Should drop items that left the master window and still match a full rebuild."""
+        inc, full = tmp_path / "inc", tmp_path / "full"
+        inc.mkdir(); full.mkdir()
+        build_feeds(in_feed=str(feed), out_dir=str(inc), manifest_path=str(inc / "m.json"))
+        text = feed.read_text(encoding="utf-8")
+        oldest = text[text.rindex("<item>"):text.rindex("</item>") + len("</item>")]
+        feed.write_text(text.replace(oldest, "").replace("<item>", self.NEW_ITEM + "<item>", 1), encoding="utf-8")
+        (tmp_path / "archive").mkdir()
+        (tmp_path / "archive" / "index.json").write_text(json.dumps({"archived": 1, "shards": {}}))
+
+        build_feeds(in_feed=str(feed), out_dir=str(inc), manifest_path=str(inc / "m.json"))
+        build_feeds(in_feed=str(feed), out_dir=str(full), manifest_path=str(full / "m.json"), full=True)
+
+        assert self.outputs(inc) == self.outputs(full)
+        assert len(titles(inc / "rss_fb.xml")) == 2
+        assert "(incremental)" in caplog.text
+
+
+class TestXText:
+    """Test X truncation."""
+
+    def test_fits_limit_with_suffix(self):
+        """Should truncate long bodies and still end with the hashtags."""
+        text = x_text("word " * 100, "#AICopilot")
+        assert len(text) <= 280
+        assert text.endswith("… #ScalePilot #SocialPilot #AICopilot")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Compare the row-by-row analytics summary against the streaming, columnar NumPy path.
+
+Usage: python tools/bench_analytics.py [--posts 2000] [--rows 10000,100000,1000000]
+"""
+
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "scripts")))
+
+import build_analytics as ba  # noqa: E402
+
+STYLES = ["coach_tip", "recruiter_inside", "checklist", "mistake_fix", "template_drop"]
+CTAS = ["question", "save", "share"]
+
+
+def synth_posts(rng: random.Random, count: int):
+    posts = []
+    for i in range(count):
+        title = " ".join(rng.choice(["Lead", "with", "3", "numbers", "📈", "ask?", "💡", "$50"])
+                         for _ in range(rng.randint(4, 30)))
+        posts.append(ba.post_features({
+            "guid": f"g{i}", "title": title, "description": "• one\n• two" if i % 2 else "plain",
+            "link": "", "pubDate": f"Mon, 01 Jan 2024 {rng.randint(0, 23):02d}:00:00 +0000",
+            "style": rng.choice(STYLES), "cta": rng.choice(CTAS), "arm_context": "",
+        }))
+    return posts
+
+
+def write_engagement(rng: random.Random, path: str, posts: int, rows: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["guid", "platform"] + ba.ENG_KEYS)
+        for _ in range(rows):
+            w.writerow([f"g{rng.randrange(posts)}", "x"] + [rng.randint(0, 20) for _ in ba.ENG_KEYS])
+
+
+def read_engagement(path: str):
+    """Reference loader: every engagement row as a dict of ints."""
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            guid = (r.get("guid") or "").strip()
+            if not guid or guid.startswith("#"):
+                continue
+            rows.append({"guid": guid, **{k: int(r.get(k) or 0) for k in ba.ENG_KEYS}})
+    return rows
+
+
+def summarize(posts, eng_by_guid):
+    """Reference row-by-row join and per-(feature, bucket) mean that summarize_columnar replaced."""
+    agg = {}
+    for p in posts:
+        totals = dict.fromkeys(ba.ENG_KEYS, 0)
+        for m in eng_by_guid.get(p["guid"], []):
+            for k in totals:
+                totals[k] += m[k]
+        score = round(ba.eng_score(totals), 2)
+        for key in ba.bucket_keys(p):
+            agg.setdefault(key, []).append(score)
+    return [{"feature": f, "bucket": b, "avg_eng_score": round(statistics.mean(v), 2), "n_posts": len(v)}
+            for (f, b), v in sorted(agg.items())]
+
+
+def bench(posts, path: str, rows: int):
+    t0 = time.perf_counter()
+    eng_by_guid = {}
+    for r in read_engagement(path):
+        eng_by_guid.setdefault(r["guid"], []).append(r)
+    loop_rows = summarize(posts, eng_by_guid)
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    idx = ba.empty_eng_index()
+    ba.fold_engagement(path, idx)
+    totals = ba.engagement_totals(idx, [p["guid"] for p in posts])
+    scores = ba.np.round(totals @ ba.SCORE_WEIGHTS, 2)
+    keys = [ba.bucket_keys(p) for p in posts]
+    labels = {feat: [k[i][1] for k in keys] for i, (feat, _) in enumerate(keys[0])}
+    col_rows = ba.summarize_columnar(scores, labels)
+    t_col = time.perf_counter() - t0
+
+    # a day's worth of new rows (1%) folded into the existing running totals
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        for i in range(max(1, rows // 100)):
+            w.writerow([f"g{i % len(posts)}", "x"] + [1] * len(ba.ENG_KEYS))
+    t0 = time.perf_counter()
+    ba.fold_engagement(path, idx)
+    t_inc = time.perf_counter() - t0
+    return t_loop, t_col, t_inc, loop_rows == col_rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--posts", type=int, default=2000)
+    ap.add_argument("--rows", default="10000,100000,1000000")
+    args = ap.parse_args(argv)
+
+    rng = random.Random(1)
+    posts = synth_posts(rng, args.posts)
+    print(f"{'rows':>9} {'loop':>9} {'columnar':>9} {'speedup':>8} {'+1% rows':>9} {'same':>5}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (int(r) for r in args.rows.split(",")):
+            path = os.path.join(tmp, "engagement.csv")
+            write_engagement(rng, path, args.posts, rows)
+            t_loop, t_col, t_inc, same = bench(posts, path, rows)
+            print(f"{rows:>9} {t_loop:>8.2f}s {t_col:>8.2f}s {t_loop / t_col:>7.1f}x {t_inc:>8.2f}s {str(same):>5}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
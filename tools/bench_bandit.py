@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Time the contextual bandit's incremental update and per-decision scoring.
+
+Usage: python tools/bench_bandit.py [--posts 5000] [--choices 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bandit_engine import HOUR_BUCKETS, BanditEngine, arm_key, context_vector  # noqa: E402
+from build_rss import CTA_CATALOG, STYLE_CATALOG  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--posts", type=int, default=5000)
+    ap.add_argument("--choices", type=int, default=2000)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    arms = [arm_key(s, c) for s, _ in STYLE_CATALOG for c, _ in CTA_CATALOG]
+    contexts = [context_vector(rng.choice(HOUR_BUCKETS), rng.random() < 2 / 7, rng.random() < 0.5)
+                for _ in range(64)]
+    engine = BanditEngine()
+
+    t0 = time.perf_counter()
+    for i in range(args.posts):
+        engine.observe(f"g{i}", rng.choice(arms), rng.gauss(5, 2), rng.choice(contexts))
+    t_obs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(args.posts):
+        arm, reward, _ = engine.contextual.ledger[f"g{i}"]
+        engine.observe(f"g{i}", arm, reward + 1.0, contexts[i % len(contexts)])
+    t_rev = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(args.choices):
+        engine.choose(arms, contexts[i % len(contexts)], rng)
+    t_choose = time.perf_counter() - t0
+
+    print(f"{len(arms)} arms x {len(contexts[0])} features")
+    print(f"observe (new)      {t_obs / args.posts * 1e6:8.1f} µs/op")
+    print(f"observe (revised)  {t_rev / args.posts * 1e6:8.1f} µs/op")
+    print(f"choose             {t_choose / args.choices * 1e6:8.1f} µs/op")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Compare the linear Jaccard dup guard against the MinHash/LSH index.
+
+Usage: python tools/bench_dup_guard.py [--sizes 200,2000,20000] [--queries 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from build_rss import dup_guard_ok  # noqa: E402
+from dup_index import DupGuard, ngrams  # noqa: E402
+
+VOCAB = [f"w{i}" for i in range(2000)]
+
+
+def synth_titles(rng: random.Random, count: int):
+    return [" ".join(rng.choice(VOCAB) for _ in range(rng.randint(14, 30))) for _ in range(count)]
+
+
+def bench(history: int, queries: int, seed: int = 1):
+    rng = random.Random(seed)
+    titles = synth_titles(rng, history)
+    fps = [{"guid": f"g{i}", "ngrams": sorted(ngrams(t, 5))} for i, t in enumerate(titles)]
+    # half fresh titles, half lightly edited copies of history
+    probes = synth_titles(rng, queries // 2) + [t + " today" for t in rng.sample(titles, queries - queries // 2)]
+
+    t0 = time.perf_counter()
+    linear = [dup_guard_ok(p, fps, 5, 0.8) for p in probes]
+    t_linear = (time.perf_counter() - t0) / len(probes)
+
+    t0 = time.perf_counter()
+    guard = DupGuard.from_fps(fps, n=5, threshold=0.8)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lsh = [guard.ok(p) for p in probes]
+    t_lsh = (time.perf_counter() - t0) / len(probes)
+
+    agree = sum(a == b for a, b in zip(linear, lsh)) / len(probes)
+    return t_linear, t_build, t_lsh, agree
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="200,2000,20000")
+    ap.add_argument("--queries", type=int, default=50)
+    args = ap.parse_args(argv)
+
+    print(f"{'history':>8} {'linear/query':>14} {'lsh build':>11} {'lsh/query':>11} {'agree':>6}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        t_linear, t_build, t_lsh, agree = bench(size, args.queries)
+        print(f"{size:>8} {t_linear * 1000:>12.2f}ms {t_build:>10.2f}s {t_lsh * 1000:>9.2f}ms {agree:>6.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())